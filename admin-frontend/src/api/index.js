@@ -168,6 +168,9 @@ export const resetUserPassword = (id, data) =>
 export const changeUserBalance = (id, data) =>
   api.post(`/admin/users/${id}/balance`, data)
 
+export const bulkChangeUserBalance = (data) =>
+  api.post('/admin/users/balance/bulk', data)
+
 export const getUserDetail = (id) =>
   api.get(`/admin/users/${id}`)
 
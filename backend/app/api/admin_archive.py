@@ -0,0 +1,85 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.api.auth import get_current_super_admin
+from app.schemas.schemas import ResponseData
+from app.services.archive_service import ARCHIVE_TABLES, archive_service
+from app.services.export_service import export_service
+
+router = APIRouter(prefix="/admin/archive", tags=["历史归档"])
+
+
+def _get_table(table: str):
+    try:
+        return archive_service.get_table(table)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+
+@router.get("", response_model=ResponseData)
+async def list_archive_partitions(
+    table: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_admin=Depends(get_current_super_admin),
+):
+    """列出已归档的分区（仅超级管理员）"""
+    if table:
+        _get_table(table)
+    start_dt, end_dt = export_service.parse_date_range(start_date, end_date)
+    partitions = archive_service.list_partitions(
+        table,
+        start_dt.date() if start_dt else None,
+        end_dt.date() if end_dt else None,
+    )
+    return ResponseData(
+        code=200,
+        message="success",
+        data={
+            "tables": {
+                name: {"retention_days": archive_service.retention_days(name)}
+                for name in ARCHIVE_TABLES
+            },
+            "partitions": [
+                {
+                    "table": item["table"],
+                    "day": item["day"],
+                    "file": item["file"],
+                    "rows": item["rollup"]["rows"],
+                    "size_bytes": item["size_bytes"],
+                    "archived_at": item["archived_at"],
+                }
+                for item in partitions
+            ],
+        },
+    )
+
+
+@router.get("/{table}/export")
+async def export_archived_rows(
+    table: str,
+    export_format: str = Query("ndjson", alias="format"),
+    gzip: bool = False,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_admin=Depends(get_current_super_admin),
+):
+    """流式导出已归档的历史记录（按归档日期范围，含首尾，仅超级管理员）"""
+    spec = _get_table(table)
+    export_format = export_service.validate_format(export_format)
+    start_dt, end_dt = export_service.parse_date_range(start_date, end_date)
+
+    return export_service.build_response(
+        archive_service.iter_rows(
+            spec.name,
+            start_dt.date() if start_dt else None,
+            end_dt.date() if end_dt else None,
+        ),
+        spec.columns,
+        export_format,
+        lambda rows: rows,
+        filename=f"{spec.name}_archive_{datetime.utcnow():%Y%m%d%H%M%S}",
+        use_gzip=gzip,
+    )
@@ -1,63 +1,56 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, func, or_, and_
+from sqlalchemy.orm import aliased
 from typing import Optional
 
 from app.db.database import get_db
 from app.api.auth import get_current_admin
 from app.schemas.schemas import ResponseData
+from app.services.export_service import export_service
 from app.models.models import BalanceLog, User, Admin
 
 router = APIRouter(prefix="/admin/balance-logs", tags=["余额日志管理"])
 
-
-@router.get("", response_model=ResponseData)
-async def get_balance_logs(
-    page: int = 1,
-    page_size: int = 20,
+BALANCE_LOG_EXPORT_COLUMNS = [
+    "id",
+    "account_type",
+    "account_id",
+    "account_name",
+    "change_type",
+    "amount",
+    "balance_before",
+    "balance_after",
+    "source",
+    "related_id",
+    "remark",
+    "operator_name",
+    "created_at",
+]
+
+
+def _apply_balance_log_filters(
+    query,
+    current_admin,
     account_type: Optional[str] = None,
     change_type: Optional[str] = None,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    current_admin=Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db),
+    start_dt: Optional[datetime] = None,
+    end_dt: Optional[datetime] = None,
 ):
-    """获取余额变动日志列表"""
-    # 获取所有超级管理员的ID
-    super_admin_result = await db.execute(
-        select(Admin.id).where(Admin.role == "super_admin")
-    )
-    super_admin_ids = [row[0] for row in super_admin_result.all()]
-
-    # 构建基础查询，排除超级管理员的扣费日志
-    query = select(BalanceLog).where(
-        or_(
-            BalanceLog.account_type != "admin",
-            (BalanceLog.account_type == "admin")
-            & (BalanceLog.account_id.notin_(super_admin_ids)),
-        )
-    )
-
-    # 超级管理员可以看到所有账户的日志，普通管理员只能看到自己用户和管理员的日志
-    if current_admin.role != "super_admin":
-        # 获取该管理员创建的所有用户ID列表
-        user_result = await db.execute(
-            select(User.id).where(User.created_by == current_admin.id)
-        )
-        created_user_ids = [row[0] for row in user_result.all()]
-
-        # 普通管理员只能看到：
-        # 1. 自己的余额变动
-        # 2. 自己创建的用户的余额变动
+    """应用余额日志的权限范围与筛选条件"""
+    if current_admin.role == "super_admin":
+        # 超级管理员可以看到所有账户的日志，但排除超级管理员自身的余额变动
+        super_admin_ids = select(Admin.id).where(Admin.role == "super_admin")
         query = query.where(
             or_(
-                (BalanceLog.account_type == "admin")
-                & (BalanceLog.account_id == current_admin.id),
-                (BalanceLog.account_type == "user")
-                & (BalanceLog.account_id.in_(created_user_ids)),
+                BalanceLog.account_type != "admin",
+                BalanceLog.account_id.notin_(super_admin_ids),
             )
         )
+    else:
+        # 普通管理员只能看到自己及自己创建的用户的余额变动（按归属代理索引过滤）
+        query = query.where(BalanceLog.owner_admin_id == current_admin.id)
 
     # 账户类型筛选
     if account_type:
@@ -68,14 +61,36 @@ async def get_balance_logs(
         query = query.where(BalanceLog.change_type == change_type)
 
     # 日期筛选
-    if start_date:
-        start_dt = datetime.fromisoformat(start_date)
+    if start_dt:
         query = query.where(BalanceLog.created_at >= start_dt)
 
-    if end_date:
-        end_dt = datetime.fromisoformat(end_date)
+    if end_dt:
         query = query.where(BalanceLog.created_at <= end_dt)
 
+    return query
+
+
+@router.get("", response_model=ResponseData)
+async def get_balance_logs(
+    page: int = 1,
+    page_size: int = 20,
+    account_type: Optional[str] = None,
+    change_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_admin=Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    """获取余额变动日志列表"""
+    query = _apply_balance_log_filters(
+        select(BalanceLog),
+        current_admin,
+        account_type=account_type,
+        change_type=change_type,
+        start_dt=datetime.fromisoformat(start_date) if start_date else None,
+        end_dt=datetime.fromisoformat(end_date) if end_date else None,
+    )
+
     # 获取总数
     count_query = select(func.count()).select_from(query.subquery())
     total = await db.scalar(count_query)
@@ -147,3 +162,74 @@ async def get_balance_logs(
             "items": items,
         },
     )
+
+
+@router.get("/export")
+async def export_balance_logs(
+    export_format: str = Query("csv", alias="format"),
+    gzip: bool = False,
+    account_type: Optional[str] = None,
+    change_type: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_admin=Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    """流式导出余额变动日志（CSV / NDJSON）"""
+    export_format = export_service.validate_format(export_format)
+    start_dt, end_dt = export_service.parse_date_range(start_date, end_date)
+
+    account_admin = aliased(Admin)
+    operator = aliased(Admin)
+    query = (
+        select(
+            BalanceLog.id,
+            BalanceLog.account_type,
+            BalanceLog.account_id,
+            func.coalesce(account_admin.username, User.company_name).label(
+                "account_name"
+            ),
+            BalanceLog.change_type,
+            BalanceLog.amount,
+            BalanceLog.balance_before,
+            BalanceLog.balance_after,
+            BalanceLog.source,
+            BalanceLog.related_id,
+            BalanceLog.remark,
+            operator.username.label("operator_name"),
+            BalanceLog.created_at,
+        )
+        .outerjoin(
+            account_admin,
+            and_(
+                BalanceLog.account_type == "admin",
+                BalanceLog.account_id == account_admin.id,
+            ),
+        )
+        .outerjoin(
+            User,
+            and_(
+                BalanceLog.account_type == "user",
+                BalanceLog.account_id == User.id,
+            ),
+        )
+        .outerjoin(operator, BalanceLog.operator_id == operator.id)
+    )
+    query = _apply_balance_log_filters(
+        query,
+        current_admin,
+        account_type=account_type,
+        change_type=change_type,
+        start_dt=start_dt,
+        end_dt=end_dt,
+    )
+    query = query.order_by(BalanceLog.id.asc())
+
+    return export_service.build_response(
+        export_service.iter_query_rows(query),
+        BALANCE_LOG_EXPORT_COLUMNS,
+        export_format,
+        lambda rows: (row._asdict() for row in rows),
+        filename=f"balance_logs_{datetime.utcnow():%Y%m%d%H%M%S}",
+        use_gzip=gzip,
+    )
@@ -1,12 +1,20 @@
 import json
 
-from fastapi import APIRouter, Body, Depends
+from fastapi import APIRouter, Body, Depends, HTTPException, status
+from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.auth import get_current_admin, get_current_super_admin
+from app.core.profiler import request_profiler
 from app.db.database import get_db
-from app.schemas.schemas import ResponseData, SystemConfigInfo, SystemConfigUpdate
+from app.schemas.schemas import (
+    ProfilingWindowCreate,
+    ResponseData,
+    SystemConfigInfo,
+    SystemConfigUpdate,
+)
 from app.services.crud_service import config_service, log_service
+from app.services.ucloud_service import ucloud_service
 
 router = APIRouter(prefix="/admin/config", tags=["系统配置"])
 
@@ -120,3 +128,82 @@ async def update_price(
             "note": "价格更新只影响新创建的实例，已创建实例保持创建时的价格",
         },
     )
+
+
+# ==================== 采样分析 ====================
+
+
+def _profiling_status() -> dict:
+    window = request_profiler.active_window()
+    return {
+        "window": window.to_dict() if window else None,
+        "profiles": request_profiler.store.list(),
+    }
+
+
+@router.get("/ucloud", response_model=ResponseData)
+async def get_ucloud_guard_status(current_admin=Depends(get_current_super_admin)):
+    """获取 UCloud 熔断器详细状态（仅超级管理员）
+
+    包括连续失败次数、距离半开重试的秒数与最近一次错误信息；
+    熔断器按进程维护，返回的是处理本请求的 worker 的状态。
+    """
+    return ResponseData(code=200, message="success", data=ucloud_service.guard.status())
+
+
+@router.get("/profiling", response_model=ResponseData)
+async def get_profiling_status(current_admin=Depends(get_current_super_admin)):
+    """获取采样分析窗口状态与已保存的分析结果（仅超级管理员）"""
+    return ResponseData(code=200, message="success", data=_profiling_status())
+
+
+@router.post("/profiling", response_model=ResponseData)
+async def open_profiling_window(
+    window_data: ProfilingWindowCreate,
+    current_admin=Depends(get_current_super_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    """开启限时采样分析窗口（仅超级管理员）
+
+    窗口内匹配路径前缀的请求（未指定前缀时为全部请求）都会被采样，
+    include_billing 为 true 时同时采样每分钟扣费任务。
+    """
+    window = request_profiler.open_window(
+        window_data.duration_seconds,
+        path_prefix=window_data.path_prefix,
+        include_billing=window_data.include_billing,
+        created_by=current_admin.id,
+    )
+
+    await log_service.create_admin_operation_log(
+        db,
+        current_admin.id,
+        "open_profiling_window",
+        "config",
+        None,
+        new_value=json.dumps(window.to_dict(), ensure_ascii=False),
+        description=f"开启采样分析窗口 {window_data.duration_seconds} 秒",
+    )
+
+    return ResponseData(code=200, message="采样分析窗口已开启", data=_profiling_status())
+
+
+@router.delete("/profiling", response_model=ResponseData)
+async def close_profiling_window(current_admin=Depends(get_current_super_admin)):
+    """提前关闭采样分析窗口（仅超级管理员）"""
+    request_profiler.close_window()
+    return ResponseData(code=200, message="采样分析窗口已关闭", data=_profiling_status())
+
+
+@router.get("/profiling/{profile_name}")
+async def download_profile(
+    profile_name: str,
+    current_admin=Depends(get_current_super_admin),
+):
+    """下载分析结果（folded stacks 格式，可用 flamegraph.pl / speedscope 打开）"""
+    path = request_profiler.store.path_for(profile_name)
+    if not path:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="分析结果不存在"
+        )
+    return FileResponse(path, media_type="text/plain", filename=profile_name)
@@ -6,6 +6,7 @@ from sqlalchemy import select, and_, func
 from app.db.database import get_db
 from app.api.auth import get_current_admin
 from app.schemas.schemas import ResponseData
+from app.services.crud_service import billing_summary_service
 from app.models.models import User, ContainerRecord, BillingChargeRecord
 
 router = APIRouter(prefix="/admin/dashboard", tags=["仪表盘"])
@@ -49,18 +50,10 @@ async def get_dashboard(
     max_users = current_admin.max_users or 10
     remaining_users = max(0, max_users - total_users)
 
-    # 今日收入（仅当前管理员用户的消费）
+    # 今日/本月收入与运行分钟数（读取当前管理员的扣费汇总）
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_income_query = (
-        select(func.sum(BillingChargeRecord.amount))
-        .join(User, BillingChargeRecord.user_id == User.id)
-        .where(
-            and_(
-                User.created_by == admin_id, BillingChargeRecord.charge_minute >= today
-            )
-        )
-    )
-    today_income = await db.scalar(today_income_query) or 0
+    summary = await billing_summary_service.get_statistics(db, "admin", admin_id)
+    today_income = summary["today_cost"]
 
     # 2. 今日统计
     # 今日新用户（仅当前管理员创建的）
@@ -81,17 +74,7 @@ async def get_dashboard(
     today_new_containers = await db.scalar(today_new_containers_query) or 0
 
     # 今日运行分钟数（仅当前管理员用户的消费记录）
-    today_minutes_query = (
-        select(func.count())
-        .select_from(BillingChargeRecord)
-        .join(User, BillingChargeRecord.user_id == User.id)
-        .where(
-            and_(
-                User.created_by == admin_id, BillingChargeRecord.charge_minute >= today
-            )
-        )
-    )
-    today_running_minutes = await db.scalar(today_minutes_query) or 0
+    today_running_minutes = summary["today_minutes"]
 
     # 3. 本月统计
     this_month = today.replace(day=1)
@@ -102,17 +85,7 @@ async def get_dashboard(
     )
     this_month_new_users = await db.scalar(this_month_new_users_query) or 0
 
-    this_month_income_query = (
-        select(func.sum(BillingChargeRecord.amount))
-        .join(User, BillingChargeRecord.user_id == User.id)
-        .where(
-            and_(
-                User.created_by == admin_id,
-                BillingChargeRecord.charge_minute >= this_month,
-            )
-        )
-    )
-    this_month_income = await db.scalar(this_month_income_query) or 0
+    this_month_income = summary["this_month_cost"]
 
     # 4. 图表数据
     # 近7天收入趋势（仅当前管理员用户的消费）
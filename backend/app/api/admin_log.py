@@ -1,37 +1,47 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, or_
 from typing import Optional
 
 from app.db.database import get_db
+from app.db.search_index import keyword_filter
 from app.api.auth import get_current_admin
 from app.schemas.schemas import ResponseData
+from app.services.export_service import export_service
 from app.models.models import ContainerLog, User, Admin, UserLoginLog
 
 router = APIRouter(prefix="/admin/logs", tags=["日志管理"])
 
+CONTAINER_LOG_EXPORT_COLUMNS = [
+    "id",
+    "user_id",
+    "user_name",
+    "admin_id",
+    "admin_name",
+    "container_id",
+    "action",
+    "action_status",
+    "started_at",
+    "stopped_at",
+    "duration_minutes",
+    "cost",
+    "ip_address",
+    "error_message",
+    "created_at",
+]
 
-@router.get("/container", response_model=ResponseData)
-async def get_container_logs(
-    page: int = 1,
-    page_size: int = 20,
+
+def _apply_container_log_filters(
+    query,
+    current_admin,
     user_id: Optional[int] = None,
     admin_id: Optional[int] = None,
     action: Optional[str] = None,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    current_admin=Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db),
+    start_dt: Optional[datetime] = None,
+    end_dt: Optional[datetime] = None,
 ):
-    """获取容器操作日志列表"""
-    # 构建基础查询，关联用户表和管理员表
-    query = (
-        select(ContainerLog, User.company_name, Admin.username)
-        .join(User, ContainerLog.user_id == User.id)
-        .join(Admin, ContainerLog.admin_id == Admin.id)
-    )
-
+    """应用容器操作日志的权限范围与筛选条件"""
     # 超级管理员可以看到所有日志，普通管理员只能看到自己用户的日志
     if current_admin.role != "super_admin":
         query = query.where(ContainerLog.admin_id == current_admin.id)
@@ -48,14 +58,45 @@ async def get_container_logs(
         query = query.where(ContainerLog.action == action)
 
     # 日期筛选
-    if start_date:
-        start_dt = datetime.fromisoformat(start_date)
+    if start_dt:
         query = query.where(ContainerLog.created_at >= start_dt)
 
-    if end_date:
-        end_dt = datetime.fromisoformat(end_date)
+    if end_dt:
         query = query.where(ContainerLog.created_at <= end_dt)
 
+    return query
+
+
+@router.get("/container", response_model=ResponseData)
+async def get_container_logs(
+    page: int = 1,
+    page_size: int = 20,
+    user_id: Optional[int] = None,
+    admin_id: Optional[int] = None,
+    action: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_admin=Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    """获取容器操作日志列表"""
+    # 构建基础查询，关联用户表和管理员表
+    query = (
+        select(ContainerLog, User.company_name, Admin.username)
+        .join(User, ContainerLog.user_id == User.id)
+        .join(Admin, ContainerLog.admin_id == Admin.id)
+    )
+
+    query = _apply_container_log_filters(
+        query,
+        current_admin,
+        user_id=user_id,
+        admin_id=admin_id,
+        action=action,
+        start_dt=datetime.fromisoformat(start_date) if start_date else None,
+        end_dt=datetime.fromisoformat(end_date) if end_date else None,
+    )
+
     # 获取总数
     count_query = select(func.count()).select_from(query.subquery())
     total = await db.scalar(count_query)
@@ -98,6 +139,63 @@ async def get_container_logs(
     )
 
 
+@router.get("/container/export")
+async def export_container_logs(
+    export_format: str = Query("csv", alias="format"),
+    gzip: bool = False,
+    user_id: Optional[int] = None,
+    admin_id: Optional[int] = None,
+    action: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_admin=Depends(get_current_admin),
+):
+    """流式导出容器操作日志（CSV / NDJSON）"""
+    export_format = export_service.validate_format(export_format)
+    start_dt, end_dt = export_service.parse_date_range(start_date, end_date)
+
+    query = (
+        select(
+            ContainerLog.id,
+            ContainerLog.user_id,
+            User.company_name.label("user_name"),
+            ContainerLog.admin_id,
+            Admin.username.label("admin_name"),
+            ContainerLog.container_id,
+            ContainerLog.action,
+            ContainerLog.action_status,
+            ContainerLog.started_at,
+            ContainerLog.stopped_at,
+            ContainerLog.duration_minutes,
+            ContainerLog.cost,
+            ContainerLog.ip_address,
+            ContainerLog.error_message,
+            ContainerLog.created_at,
+        )
+        .join(User, ContainerLog.user_id == User.id)
+        .join(Admin, ContainerLog.admin_id == Admin.id)
+    )
+    query = _apply_container_log_filters(
+        query,
+        current_admin,
+        user_id=user_id,
+        admin_id=admin_id,
+        action=action,
+        start_dt=start_dt,
+        end_dt=end_dt,
+    )
+    query = query.order_by(ContainerLog.id.asc())
+
+    return export_service.build_response(
+        export_service.iter_query_rows(query),
+        CONTAINER_LOG_EXPORT_COLUMNS,
+        export_format,
+        lambda rows: (row._asdict() for row in rows),
+        filename=f"container_logs_{datetime.utcnow():%Y%m%d%H%M%S}",
+        use_gzip=gzip,
+    )
+
+
 @router.get("/login", response_model=ResponseData)
 async def get_user_login_logs(
     page: int = 1,
@@ -129,9 +227,10 @@ async def get_user_login_logs(
     if keyword:
         query = query.where(
             or_(
-                UserLoginLog.phone.contains(keyword),
-                User.company_name.contains(keyword),
-                User.phone.contains(keyword),
+                keyword_filter(UserLoginLog, keyword),
+                UserLoginLog.user_id.in_(
+                    select(User.id).where(keyword_filter(User, keyword))
+                ),
             )
         )
 
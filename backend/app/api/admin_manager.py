@@ -1,3 +1,5 @@
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -21,6 +23,7 @@ router = APIRouter(prefix="/admin/admins", tags=["管理员管理"])
 async def list_admins(
     page: int = 1,
     page_size: int = 20,
+    keyword: Optional[str] = None,
     current_admin=Depends(get_current_super_admin),
     db: AsyncSession = Depends(get_db),
 ):
@@ -28,7 +31,7 @@ async def list_admins(
     from app.services.crud_service import user_service
 
     skip = (page - 1) * page_size
-    total, admins = await admin_service.list_admins(db, skip, page_size)
+    total, admins = await admin_service.list_admins(db, skip, page_size, keyword)
 
     items = []
     for admin in admins:
@@ -278,6 +281,7 @@ async def recharge_admin_balance(
     balance_log = BalanceLog(
         account_type="admin",
         account_id=admin_id,
+        owner_admin_id=admin_id,
         change_type=recharge_data.type,
         amount=amount,
         balance_before=balance_before,
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends
+
+from app.api.auth import get_current_super_admin
+from app.core.config import get_settings
+from app.schemas.schemas import ResponseData
+from app.tasks.job_monitor import job_monitor
+
+settings = get_settings()
+
+router = APIRouter(prefix="/admin/scheduler", tags=["定时任务"])
+
+
+@router.get("", response_model=ResponseData)
+async def get_scheduler_status(current_admin=Depends(get_current_super_admin)):
+    """获取定时任务运行状态（仅超级管理员）
+
+    包括当前调度间隔（删除补偿任务积压时会自动退避）、是否正在执行、下次执行时间、
+    累计执行/失败/超时/跳过次数以及最近的执行历史。
+    定时任务运行在独立进程时，返回该进程最近写入的状态快照。
+    """
+    if job_monitor.scheduler is None:
+        snapshot = job_monitor.load_status(settings.SCHEDULER_STATUS_FILE)
+        if snapshot is None:
+            return ResponseData(
+                code=200,
+                message="定时任务未在运行",
+                data={"jobs": [], "process": "external", "updated_at": None},
+            )
+        return ResponseData(
+            code=200,
+            message="success",
+            data={
+                "jobs": snapshot["jobs"],
+                "process": "external",
+                "pid": snapshot.get("pid"),
+                "updated_at": snapshot.get("updated_at"),
+            },
+        )
+    return ResponseData(
+        code=200, message="success", data={"jobs": job_monitor.status(), "process": "local"}
+    )
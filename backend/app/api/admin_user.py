@@ -1,7 +1,5 @@
-from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
 from typing import Optional
 
 from app.db.database import get_db
@@ -10,16 +8,22 @@ from app.schemas.schemas import (
     UserCreate,
     UserUpdate,
     UserBalanceChange,
+    UserBalanceBulkChange,
     UserResetPassword,
     ResponseData,
 )
 from app.services.crud_service import (
     user_service,
     container_service,
+    billing_summary_service,
     log_service,
 )
+from app.services.session_meter import session_meter
+from app.core.config import get_settings
 from app.core.security import get_password_hash
-from app.models.models import BillingChargeRecord, BalanceLog
+from app.models.models import BalanceLog
+
+settings = get_settings()
 
 router = APIRouter(prefix="/admin/users", tags=["用户管理"])
 
@@ -159,6 +163,7 @@ async def create_user(
         admin_balance_log = BalanceLog(
             account_type="admin",
             account_id=current_admin.id,
+            owner_admin_id=current_admin.id,
             change_type="deduct",
             amount=-initial_balance,
             balance_before=admin_balance_before,
@@ -174,6 +179,7 @@ async def create_user(
         user_balance_log = BalanceLog(
             account_type="user",
             account_id=user.id,
+            owner_admin_id=user.created_by,
             change_type="recharge",
             amount=initial_balance,
             balance_before=0,
@@ -217,24 +223,8 @@ async def get_user_detail(
 
     container = await container_service.get_by_user_id(db, user_id)
 
-    # 统计信息
-    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_query = select(func.sum(BillingChargeRecord.amount)).where(
-        and_(
-            BillingChargeRecord.user_id == user_id,
-            BillingChargeRecord.charge_minute >= today,
-        )
-    )
-    today_cost = await db.scalar(today_query) or 0
-
-    this_month = today.replace(day=1)
-    month_query = select(func.sum(BillingChargeRecord.amount)).where(
-        and_(
-            BillingChargeRecord.user_id == user_id,
-            BillingChargeRecord.charge_minute >= this_month,
-        )
-    )
-    this_month_cost = await db.scalar(month_query) or 0
+    # 统计信息（读取扣费汇总）
+    summary = await billing_summary_service.get_statistics(db, "user", user_id)
 
     return ResponseData(
         code=200,
@@ -262,8 +252,8 @@ async def get_user_detail(
             if container
             else None,
             "statistics": {
-                "today_cost": today_cost,
-                "this_month_cost": this_month_cost,
+                "today_cost": summary["today_cost"],
+                "this_month_cost": summary["this_month_cost"],
                 "total_cost": container.total_cost if container else 0,
             },
         },
@@ -294,6 +284,9 @@ async def update_user(
         },
     )
 
+    if user.status != 1:
+        session_meter.remove(user_id)
+
     new_value = f"{{company_name: {user.company_name}, contact_name: {user.contact_name}, status: {user.status}}}"
 
     # 记录日志
@@ -389,6 +382,7 @@ async def change_user_balance(
             admin_balance_log = BalanceLog(
                 account_type="admin",
                 account_id=current_admin.id,
+                owner_admin_id=current_admin.id,
                 change_type="deduct",
                 amount=-change_amount,
                 balance_before=admin_balance_before,
@@ -421,6 +415,7 @@ async def change_user_balance(
     balance_log = BalanceLog(
         account_type="user",
         account_id=user_id,
+        owner_admin_id=user.created_by,
         change_type=type,
         amount=change_amount,
         balance_before=balance_before,
@@ -444,6 +439,7 @@ async def change_user_balance(
     )
 
     await db.commit()
+    session_meter.update_balance(user_id, balance_after)
 
     return ResponseData(
         code=200,
@@ -457,6 +453,147 @@ async def change_user_balance(
     )
 
 
+@router.post("/balance/bulk", response_model=ResponseData)
+async def bulk_change_user_balance(
+    bulk_data: UserBalanceBulkChange,
+    current_admin=Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    """批量充值/扣减用户余额
+
+    全部条目在一个事务内完成：一次查询所有用户，代理余额按充值合计校验一次，
+    用户余额批量增减，余额日志与操作日志批量写入。
+    单个条目不满足条件（重复、用户不存在、非本代理创建、扣减超过余额）时跳过并在结果中说明；
+    代理余额不足以支付全部有效充值时整体拒绝。
+    """
+    items = bulk_data.items
+    if len(items) > settings.BULK_BALANCE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"单次最多操作 {settings.BULK_BALANCE_MAX_ITEMS} 个用户",
+        )
+
+    type = bulk_data.type
+    remark = bulk_data.description or ("管理员充值" if type == "recharge" else "管理员扣减")
+    is_super = current_admin.role == "super_admin"
+    users = await user_service.get_by_ids(db, [item.user_id for item in items])
+
+    results = []
+    accepted = []  # (结果, 用户, 变动金额)
+    seen_user_ids = set()
+    for item in items:
+        result = {"user_id": item.user_id, "success": False}
+        results.append(result)
+        user = users.get(item.user_id)
+        if item.user_id in seen_user_ids:
+            result["message"] = "用户重复"
+        elif user is None:
+            result["message"] = "用户不存在"
+        elif not is_super and user.created_by != current_admin.id:
+            result["message"] = "无权操作该用户"
+        elif type == "deduct" and user.balance < item.amount:
+            result["message"] = "扣减金额不能超过用户余额"
+        else:
+            change_amount = item.amount if type == "recharge" else -item.amount
+            accepted.append((result, user, change_amount))
+        seen_user_ids.add(item.user_id)
+
+    # 管理员给用户充值时，按合计金额一次性校验并扣除管理员余额
+    recharge_total = sum(change for _, _, change in accepted) if type == "recharge" else 0
+    charge_admin = recharge_total > 0 and not is_super
+    if charge_admin and current_admin.balance < recharge_total:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                f"代理余额不足，当前余额: ¥{current_admin.balance:.2f}，"
+                f"本次充值合计: ¥{recharge_total:.2f}"
+            ),
+        )
+
+    balance_changes = {}
+    balance_logs = []
+    operation_logs = []
+    admin_balance = current_admin.balance
+    for result, user, change_amount in accepted:
+        balance_before = user.balance
+        balance_after = balance_before + change_amount
+        balance_changes[user.id] = change_amount
+
+        if charge_admin:
+            # 与单个充值一致，每个用户对应一条管理员扣减记录
+            balance_logs.append(
+                {
+                    "account_type": "admin",
+                    "account_id": current_admin.id,
+                    "owner_admin_id": current_admin.id,
+                    "change_type": "deduct",
+                    "amount": -change_amount,
+                    "balance_before": admin_balance,
+                    "balance_after": admin_balance - change_amount,
+                    "source": "manual",
+                    "remark": f"给用户 {user.company_name} 充值",
+                    "operator_id": current_admin.id,
+                }
+            )
+            admin_balance -= change_amount
+
+        balance_logs.append(
+            {
+                "account_type": "user",
+                "account_id": user.id,
+                "owner_admin_id": user.created_by,
+                "change_type": type,
+                "amount": change_amount,
+                "balance_before": balance_before,
+                "balance_after": balance_after,
+                "source": "manual",
+                "remark": remark,
+                "operator_id": current_admin.id,
+            }
+        )
+        operation_logs.append(
+            {
+                "admin_id": current_admin.id,
+                "action": f"{type}_balance",
+                "target_type": "user",
+                "target_id": user.id,
+                "old_value": f"{{balance: {balance_before}}}",
+                "new_value": f"{{balance: {balance_after}}}",
+                "description": f"批量{'充值' if type == 'recharge' else '扣减'} {abs(change_amount)} 元",
+            }
+        )
+        result.update(
+            success=True,
+            message="操作成功",
+            balance_before=balance_before,
+            balance_after=balance_after,
+            change_amount=change_amount,
+        )
+
+    if accepted:
+        await user_service.add_balances(db, balance_changes)
+        if charge_admin:
+            current_admin.balance = admin_balance
+        await log_service.bulk_create_balance_logs(db, balance_logs)
+        await log_service.bulk_create_admin_operation_logs(db, operation_logs)
+        await db.commit()
+        for result, user, _ in accepted:
+            session_meter.update_balance(user.id, result["balance_after"])
+
+    success_count = len(accepted)
+    return ResponseData(
+        code=200,
+        message=f"操作完成：成功 {success_count} 个，失败 {len(items) - success_count} 个",
+        data={
+            "success_count": success_count,
+            "failed_count": len(items) - success_count,
+            "total_amount": sum(abs(change) for _, _, change in accepted),
+            "admin_balance": current_admin.balance,
+            "items": results,
+        },
+    )
+
+
 @router.delete("/{user_id}", response_model=ResponseData)
 async def delete_user(
     user_id: int,
@@ -488,5 +625,6 @@ async def delete_user(
     )
 
     await user_service.delete(db, user)
+    session_meter.remove(user_id)
 
     return ResponseData(code=200, message="删除成功")
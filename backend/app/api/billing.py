@@ -1,17 +1,29 @@
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, func
 from typing import Optional
 
 from app.db.database import get_db
 from app.api.auth import get_current_user, get_current_admin
 from app.schemas.schemas import ResponseData, BillingChargeInfo
-from app.services.crud_service import container_service
+from app.services.crud_service import container_service, billing_summary_service
+from app.services.export_service import export_service
 from app.models.models import BillingChargeRecord
 
 router = APIRouter(prefix="/billing", tags=["账单管理"])
 
+CHARGE_EXPORT_COLUMNS = [
+    "id",
+    "container_id",
+    "charge_minute",
+    "price_per_minute",
+    "amount",
+    "balance_before",
+    "balance_after",
+    "created_at",
+]
+
 
 @router.get("/charges", response_model=ResponseData)
 async def get_charge_records(
@@ -46,16 +58,12 @@ async def get_charge_records(
     result = await db.execute(query)
     records = result.scalars().all()
 
-    # 统计总金额
-    sum_query = select(func.sum(BillingChargeRecord.amount)).where(
-        BillingChargeRecord.user_id == current_user.id
+    # 统计总金额（读取扣费汇总）
+    summary = await billing_summary_service.get_statistics(
+        db, "user", current_user.id
     )
-    total_amount = await db.scalar(sum_query) or 0
-
-    sum_minutes_query = select(func.count()).where(
-        BillingChargeRecord.user_id == current_user.id
-    )
-    total_minutes = await db.scalar(sum_minutes_query) or 0
+    total_amount = summary["total_cost"]
+    total_minutes = summary["total_minutes"]
 
     return ResponseData(
         code=200,
@@ -83,6 +91,39 @@ async def get_charge_records(
     )
 
 
+@router.get("/charges/export")
+async def export_charge_records(
+    export_format: str = Query("csv", alias="format"),
+    gzip: bool = False,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_user=Depends(get_current_user),
+):
+    """流式导出扣费记录（CSV / NDJSON）"""
+    export_format = export_service.validate_format(export_format)
+    start_dt, end_dt = export_service.parse_date_range(start_date, end_date)
+
+    query = select(
+        *[getattr(BillingChargeRecord, column) for column in CHARGE_EXPORT_COLUMNS]
+    ).where(BillingChargeRecord.user_id == current_user.id)
+
+    if start_dt:
+        query = query.where(BillingChargeRecord.charge_minute >= start_dt)
+    if end_dt:
+        query = query.where(BillingChargeRecord.charge_minute <= end_dt)
+
+    query = query.order_by(BillingChargeRecord.id.asc())
+
+    return export_service.build_response(
+        export_service.iter_query_rows(query),
+        CHARGE_EXPORT_COLUMNS,
+        export_format,
+        lambda rows: (row._asdict() for row in rows),
+        filename=f"charges_{current_user.id}_{datetime.utcnow():%Y%m%d%H%M%S}",
+        use_gzip=gzip,
+    )
+
+
 @router.get("/statistics", response_model=ResponseData)
 async def get_statistics(
     current_user=Depends(get_current_user), db: AsyncSession = Depends(get_db)
@@ -90,47 +131,20 @@ async def get_statistics(
     """获取消费统计"""
     container = await container_service.get_by_user_id(db, current_user.id)
 
-    # 今日消费
-    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_query = select(func.sum(BillingChargeRecord.amount)).where(
-        and_(
-            BillingChargeRecord.user_id == current_user.id,
-            BillingChargeRecord.charge_minute >= today,
-        )
-    )
-    today_cost = await db.scalar(today_query) or 0
-
-    # 本月消费
-    this_month = today.replace(day=1)
-    month_query = select(func.sum(BillingChargeRecord.amount)).where(
-        and_(
-            BillingChargeRecord.user_id == current_user.id,
-            BillingChargeRecord.charge_minute >= this_month,
-        )
-    )
-    this_month_cost = await db.scalar(month_query) or 0
-
-    # 累计消费
-    total_query = select(func.sum(BillingChargeRecord.amount)).where(
-        BillingChargeRecord.user_id == current_user.id
-    )
-    total_cost = await db.scalar(total_query) or 0
-
-    # 累计运行分钟数
-    total_minutes_query = select(func.count()).where(
-        BillingChargeRecord.user_id == current_user.id
+    # 今日/本月/累计消费（读取扣费汇总）
+    summary = await billing_summary_service.get_statistics(
+        db, "user", current_user.id
     )
-    total_running_minutes = await db.scalar(total_minutes_query) or 0
 
     return ResponseData(
         code=200,
         message="success",
         data={
             "balance": current_user.balance,
-            "total_cost": total_cost,
-            "total_running_minutes": total_running_minutes,
-            "today_cost": today_cost,
-            "this_month_cost": this_month_cost,
+            "total_cost": summary["total_cost"],
+            "total_running_minutes": summary["total_minutes"],
+            "today_cost": summary["today_cost"],
+            "this_month_cost": summary["this_month_cost"],
             "container_total_cost": container.total_cost if container else 0,
             "container_total_minutes": container.total_running_minutes
             if container
@@ -1,10 +1,23 @@
+import time
 from datetime import datetime
-from fastapi import APIRouter, Body, Depends, HTTPException, Request, status
+from typing import Optional
+
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import get_settings
 from app.db.database import get_db
-from app.api.auth import get_current_user
+from app.api.auth import get_current_user, get_current_user_id
 from app.schemas.schemas import (
     ResponseData,
     ContainerCreate,
@@ -13,14 +26,23 @@ from app.schemas.schemas import (
 from app.services.crud_service import (
     user_service,
     container_service,
+    container_job_service,
     config_service,
     log_service,
 )
+from app.services.container_jobs import container_create_worker
+from app.services.idempotency import IDEMPOTENCY_HEADER, idempotency_service
 from app.services.ucloud_service import ucloud_service
+from app.services.session_meter import session_meter
 from app.models.models import User
 
+settings = get_settings()
+
 router = APIRouter(prefix="/container", tags=["容器管理"])
 
+# 长轮询期间重新读取任务状态的最长间隔（秒）
+JOB_POLL_INTERVAL_SECONDS = 1.0
+
 
 def _extract_container_validation_message(exc: ValidationError) -> str:
     """提取创建容器请求的首个校验错误信息"""
@@ -86,6 +108,31 @@ def _serialize_pending_operation(current_user: User):
     }
 
 
+def _serialize_job(job) -> dict:
+    """序列化创建任务"""
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "step": job.step,
+        "instance_name": job.instance_name,
+        "config_code": job.config_code,
+        "container_id": job.container_id,
+        "error_message": job.error_message,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+async def _pending_operation_with_job(db: AsyncSession, current_user: User):
+    """序列化当前容器操作状态，创建中时附带任务ID便于继续轮询"""
+    pending_operation = _serialize_pending_operation(current_user)
+    if pending_operation and pending_operation["status"] == "creating":
+        job = await container_job_service.get_active_for_user(db, current_user.id)
+        pending_operation["job_id"] = job.id if job else None
+    return pending_operation
+
+
 @router.get("/config-options", response_model=ResponseData)
 async def get_container_config_options(
     current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)
@@ -117,7 +164,7 @@ async def get_my_container(
             message="success",
             data={
                 "has_container": False,
-                "pending_operation": _serialize_pending_operation(current_user),
+                "pending_operation": await _pending_operation_with_job(db, current_user),
             },
         )
 
@@ -127,65 +174,131 @@ async def get_my_container(
         data={
             "has_container": True,
             "container": _serialize_container(container),
-            "pending_operation": _serialize_pending_operation(current_user),
+            "pending_operation": await _pending_operation_with_job(db, current_user),
         },
     )
 
 
-@router.get("/my/status", response_model=ResponseData)
-async def get_container_status(
-    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)
-):
-    """获取云电脑实时状态"""
-    container = await container_service.get_by_user_id(db, current_user.id)
-
-    if not container:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="云电脑不存在"
-        )
-
-    # 计算本次运行统计
-    stats = await container_service.calculate_session_stats(db, container)
-
+def _build_status_data(
+    container_status: str,
+    stats: dict,
+    balance: float,
+    price_per_minute: float,
+    connection_info: dict = None,
+) -> dict:
+    """组装云电脑实时状态数据"""
     # 计算剩余时间
     remaining_minutes = (
-        int(current_user.balance / container.price_per_minute)
-        if container.price_per_minute > 0
-        else 0
+        int(balance / price_per_minute) if price_per_minute > 0 else 0
     )
     hours = remaining_minutes // 60
     minutes = remaining_minutes % 60
     remaining_formatted = f"{hours}小时{minutes}分钟" if hours > 0 else f"{minutes}分钟"
 
     data = {
-        "status": container.status,
+        "status": container_status,
         "current_running_minutes": stats["running_minutes"],
         "current_session_cost": stats["cost"],
-        "balance": current_user.balance,
-        "price_per_minute": container.price_per_minute,
+        "balance": balance,
+        "price_per_minute": price_per_minute,
         "remaining_minutes": remaining_minutes,
         "remaining_time_formatted": remaining_formatted,
     }
 
-    if container.status == "running":
-        data["connection_info"] = {
-            "host": container.connection_host,
-            "port": container.connection_port,
-            "username": container.connection_username,
-            "password": container.connection_password,
-        }
+    if container_status == "running" and connection_info:
+        data["connection_info"] = connection_info
+
+    return data
 
-    return ResponseData(code=200, message="success", data=data)
 
+@router.get("/my/status", response_model=ResponseData)
+async def get_container_status(
+    user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)
+):
+    """获取云电脑实时状态
 
-@router.post("", response_model=ResponseData)
+    运行中的会话优先从内存计量表计算，未命中时回退数据库。
+    """
+    live_session = session_meter.get(user_id)
+    if live_session:
+        return ResponseData(
+            code=200,
+            message="success",
+            data=_build_status_data(
+                "running",
+                session_meter.calculate_session_stats(live_session),
+                live_session.balance,
+                live_session.price_per_minute,
+                live_session.connection_info,
+            ),
+        )
+
+    current_user = await user_service.get_by_id(db, user_id)
+    if not current_user or current_user.status != 1:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="用户不存在或已被禁用"
+        )
+
+    container = await container_service.get_by_user_id(db, current_user.id)
+
+    if not container:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="云电脑不存在"
+        )
+
+    # 计算本次运行统计
+    stats = await container_service.calculate_session_stats(db, container)
+    session_meter.track(current_user, container)
+
+    return ResponseData(
+        code=200,
+        message="success",
+        data=_build_status_data(
+            container.status,
+            stats,
+            current_user.balance,
+            container.price_per_minute,
+            {
+                "host": container.connection_host,
+                "port": container.connection_port,
+                "username": container.connection_username,
+                "password": container.connection_password,
+            },
+        ),
+    )
+
+
+@router.post("", response_model=ResponseData, status_code=status.HTTP_202_ACCEPTED)
 async def create_container(
     request: Request,
     container_payload: dict = Body(...),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+):
+    """提交云电脑创建任务
+
+    校验通过后加创建锁并写入任务，立即返回 202 与任务ID；
+    云端创建由后台执行，客户端通过 `GET /container/jobs/{job_id}` 查询结果。
+    携带 `Idempotency-Key` 时，重复提交直接返回首次受理的任务。
+    """
+    return await idempotency_service.run(
+        db,
+        current_user.id,
+        idempotency_key,
+        "container.create",
+        container_payload,
+        lambda: _create_container(request, container_payload, current_user, db),
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+
+
+async def _create_container(
+    request: Request,
+    container_payload: dict,
+    current_user: User,
+    db: AsyncSession,
 ):
-    """创建云电脑"""
     try:
         container_data = ContainerCreate.model_validate(container_payload)
     except ValidationError as exc:
@@ -203,7 +316,7 @@ async def create_container(
             detail={
                 "message": "已有云电脑创建任务正在处理中，请稍候刷新结果",
                 "operation_in_progress": True,
-                "pending_operation": _serialize_pending_operation(current_user),
+                "pending_operation": await _pending_operation_with_job(db, current_user),
             },
         )
 
@@ -231,33 +344,6 @@ async def create_container(
                 },
             )
 
-        # 强制创建：先删除旧实例和数据库记录
-        try:
-            # 1. 调用 UCloud API 删除实例
-            delete_result = await ucloud_service.delete_container(
-                existing.ucloud_instance_id
-            )
-            if not delete_result["success"]:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"删除旧实例失败: {delete_result.get('error', '未知错误')}",
-                )
-
-            # 2. 物理删除数据库记录
-            await container_service.hard_delete_by_user(db, current_user.id)
-
-            # 3. 清除用户的当前容器ID
-            current_user.current_container_id = None
-            await db.commit()
-
-        except HTTPException:
-            raise
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"删除旧实例时出错: {str(e)}",
-            )
-
     lock_acquired = await user_service.acquire_container_operation(
         db, current_user.id, "creating"
     )
@@ -268,10 +354,11 @@ async def create_container(
             detail={
                 "message": "已有云电脑创建任务正在处理中，请稍候刷新结果",
                 "operation_in_progress": True,
-                "pending_operation": _serialize_pending_operation(current_user),
+                "pending_operation": await _pending_operation_with_job(db, current_user),
             },
         )
 
+    job = None
     try:
         # 检查余额
         min_balance = await config_service.get_min_balance_to_start(db)
@@ -281,9 +368,9 @@ async def create_container(
                 detail=f"余额不足，创建云电脑至少需要{min_balance}元",
             )
 
-        # 获取当前套餐与共享创建配置
+        # 提前校验套餐，避免任务执行时才失败
         try:
-            container_create_config = await config_service.get_container_create_config(
+            await config_service.get_container_create_config(
                 db,
                 container_data.config_code,
             )
@@ -293,78 +380,75 @@ async def create_container(
                 detail=str(exc),
             ) from exc
 
-        # 调用UCloud创建实例 - 规格参数来自固定套餐，共享镜像来自后台配置
-        result = await ucloud_service.create_container(
-            instance_name=container_data.instance_name,
-            create_config=container_create_config,
-        )
-
-        if not result["success"]:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"创建失败: {result.get('error', '未知错误')}",
-            )
-
-        # 创建容器记录 - 保存本次实际生效的系统配置快照
-        container = await container_service.create(
+        # 强制创建时，旧实例的删除也在任务中执行
+        job = await container_job_service.create(
             db,
             current_user.id,
-            {
-                "instance_id": result["instance_id"],
-                "instance_name": container_data.instance_name,
-                "config_code": container_create_config["config_code"],
-                "config_name": container_create_config["config_name"],
-                "gpu_type": container_create_config["gpu_type"],
-                "cpu_cores": container_create_config["cpu_cores"],
-                "memory_gb": container_create_config["memory_gb"],
-                "storage_gb": container_create_config["storage_gb"],
-                "price_per_minute": container_create_config["price_per_minute"],
-                "ip": result["ip"],
-                "password": result["password"],
-            },
-        )
-
-        current_user.current_container_id = container.id
-        current_user.container_operation_status = None
-        current_user.container_operation_started_at = None
-        await db.commit()
-
-        await log_service.create_container_log(
-            db,
-            user_id=current_user.id,
-            admin_id=current_user.admin_id,
-            container_id=container.id,
-            action="create",
-            action_status="success",
-            started_at=container.started_at,
+            instance_name=container_data.instance_name,
+            config_code=container_data.config_code,
+            replace_existing=bool(existing and container_data.force),
             ip_address=request.client.host,
         )
+        container_create_worker.submit(job.id)
 
         return ResponseData(
-            code=200,
-            message="云电脑创建成功，已自动启动",
+            code=202,
+            message="云电脑创建任务已提交",
             data={
-                "container_id": container.id,
-                "status": container.status,
-                "config_code": container.config_code,
-                "config_name": container.config_name,
-                "started_at": container.started_at.isoformat()
-                if container.started_at
-                else None,
-                "connection_info": {
-                    "host": container.connection_host,
-                    "port": container.connection_port,
-                    "username": container.connection_username,
-                    "password": container.connection_password,
-                },
+                **_serialize_job(job),
+                "poll_url": f"/api/container/jobs/{job.id}",
                 "estimated_time": 120,
             },
         )
     finally:
-        await db.rollback()
-        refreshed_user = await user_service.get_by_id(db, current_user.id)
-        if refreshed_user and refreshed_user.container_operation_status == "creating":
-            await user_service.clear_container_operation(db, refreshed_user, "creating")
+        if job is None:
+            # 任务未提交成功，释放创建锁
+            await db.rollback()
+            refreshed_user = await user_service.get_by_id(db, current_user.id)
+            if refreshed_user and refreshed_user.container_operation_status == "creating":
+                await user_service.clear_container_operation(db, refreshed_user, "creating")
+
+
+@router.get("/jobs/{job_id}", response_model=ResponseData)
+async def get_container_job(
+    job_id: int,
+    wait: int = Query(0, ge=0, description="任务未完成时最长等待秒数（长轮询）"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """查询云电脑创建任务
+
+    wait 大于 0 时，任务未完成则等待至进度变化或超时再返回。
+    任务成功后返回容器与连接信息。
+    """
+    job = await container_job_service.get_by_id(db, job_id)
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="任务不存在")
+
+    deadline = time.monotonic() + min(wait, settings.CONTAINER_JOB_MAX_WAIT_SECONDS)
+    observed = (job.status, job.step)
+    while job.status in container_job_service.ACTIVE_STATUSES and (job.status, job.step) == observed:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # 任务可能在其他 worker 进程中执行，收不到本进程的进度通知，定期重新读取
+        await container_create_worker.wait_for_change(
+            min(remaining, JOB_POLL_INTERVAL_SECONDS)
+        )
+        await db.refresh(job)
+
+    data = _serialize_job(job)
+    if job.status == "succeeded" and job.container_id:
+        container = await container_service.get_by_id(db, job.container_id)
+        if container:
+            data["container"] = _serialize_container(container)
+            data["connection_info"] = {
+                "host": container.connection_host,
+                "port": container.connection_port,
+                "username": container.connection_username,
+                "password": container.connection_password,
+            }
+    return ResponseData(code=200, message="success", data=data)
 
 
 @router.post("/start", response_model=ResponseData)
@@ -372,8 +456,23 @@ async def start_container(
     request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
 ):
-    """启动云电脑"""
+    """启动云电脑
+
+    携带 `Idempotency-Key` 时，重试直接返回首次成功的结果，不再调用云端。
+    """
+    return await idempotency_service.run(
+        db,
+        current_user.id,
+        idempotency_key,
+        "container.start",
+        None,
+        lambda: _start_container(request, current_user, db),
+    )
+
+
+async def _start_container(request: Request, current_user: User, db: AsyncSession):
     container = await container_service.get_by_user_id(db, current_user.id)
 
     if not container:
@@ -419,6 +518,7 @@ async def start_container(
 
     # 更新容器状态
     await container_service.update_status(db, container, "running")
+    session_meter.track(current_user, container)
 
     # 记录日志
     await log_service.create_container_log(
@@ -456,8 +556,23 @@ async def stop_container(
     request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
 ):
-    """停止云电脑"""
+    """停止云电脑
+
+    携带 `Idempotency-Key` 时，重试直接返回首次成功的结果，不再调用云端。
+    """
+    return await idempotency_service.run(
+        db,
+        current_user.id,
+        idempotency_key,
+        "container.stop",
+        None,
+        lambda: _stop_container(request, current_user, db),
+    )
+
+
+async def _stop_container(request: Request, current_user: User, db: AsyncSession):
     container = await container_service.get_by_user_id(db, current_user.id)
 
     if not container:
@@ -489,6 +604,7 @@ async def stop_container(
 
     # 更新容器状态
     await container_service.update_status(db, container, "stopped")
+    session_meter.remove(current_user.id)
 
     # 记录日志
     await log_service.create_container_log(
@@ -529,8 +645,28 @@ async def delete_container(
     request: Request,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+):
+    """删除云电脑
+
+    携带 `Idempotency-Key` 时，重试直接返回首次成功的结果。
+    """
+    return await idempotency_service.run(
+        db,
+        current_user.id,
+        idempotency_key,
+        "container.delete",
+        delete_request,
+        lambda: _delete_container(delete_request, request, current_user, db),
+    )
+
+
+async def _delete_container(
+    delete_request: ContainerDeleteRequest,
+    request: Request,
+    current_user: User,
+    db: AsyncSession,
 ):
-    """删除云电脑"""
     await db.refresh(current_user)
     await user_service.clear_stale_container_operation(db, current_user)
     container = await container_service.get_by_user_id(db, current_user.id)
@@ -586,12 +722,19 @@ async def delete_container(
     container.status = "deleting"
     container.connection_host = None
     container.connection_password = None
+    container.delete_requested_at = datetime.utcnow()
+    container.delete_attempts = 0
+    container.next_delete_attempt_at = None
+    container.last_delete_error = None
     await db.commit()
+    session_meter.remove(current_user.id)
 
-    # 先尝试立即删除，失败则交由后台补偿任务继续处理
+    # 先尝试立即删除，失败则交由后台补偿任务按退避间隔继续处理
     result = await ucloud_service.delete_container(container.ucloud_instance_id)
 
     if not result["success"]:
+        container_service.record_delete_failure(container, result.get("error"))
+        await db.commit()
         await log_service.create_container_log(
             db,
             user_id=current_user.id,
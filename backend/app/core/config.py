@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -7,8 +8,17 @@ class Settings(BaseSettings):
     APP_NAME: str = "云电脑容器管理系统"
     DEBUG: bool = True
 
+    # 服务进程：监听地址与生产模式（run.py --prod）的 worker 进程数（0 为 CPU 核数）
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WORKERS: int = 0
+
     # 数据库
     DATABASE_URL: str = "sqlite+aiosqlite:///./cloud_pc.db"
+    # 输出 SQL 语句日志，未设置时跟随 DEBUG（生产模式强制关闭）
+    SQL_ECHO: Optional[bool] = None
+    # SQLite 使用 WAL 日志模式，多进程读写时读不阻塞写
+    SQLITE_WAL: bool = True
 
     # JWT配置
     SECRET_KEY: str = "yXjiBi7GCQubdwBNL8axQSuRqILofUIbXZ022yCRzrE"
@@ -27,10 +37,117 @@ class Settings(BaseSettings):
     DEFAULT_CPU_CORES: int = 12
     DEFAULT_MEMORY_GB: int = 32
 
+    # UCloud本地模拟器（压测/基准测试用，不访问真实compshare接口）
+    UCLOUD_SIMULATOR: bool = False
+    UCLOUD_SIMULATOR_CONFIG: str = ""
+    # UCloud 接口限流（每秒调用数，按接口名覆盖，如 {"DescribeCompShareInstance": 20}；0 为不限）
+    UCLOUD_RATE_LIMIT_DEFAULT: float = 10.0
+    UCLOUD_RATE_LIMITS: Dict[str, float] = {}
+    UCLOUD_RATE_LIMIT_MAX_WAIT_SECONDS: float = 5.0
+    # UCloud 熔断：连续失败次数阈值（0 为关闭）与熔断后放行探测调用的等待时间
+    UCLOUD_BREAKER_FAILURE_THRESHOLD: int = 5
+    UCLOUD_BREAKER_RESET_SECONDS: float = 30.0
+    # 实例详情查询缓存有效期（秒，0 为只合并并发查询不缓存）与最大条目数
+    UCLOUD_DESCRIBE_CACHE_TTL_SECONDS: float = 5.0
+    UCLOUD_DESCRIBE_CACHE_MAX_ENTRIES: int = 10000
+
     # 默认价格配置
     DEFAULT_PRICE_PER_MINUTE: float = 0.5
     DEFAULT_MIN_BALANCE_TO_START: float = 2.5
 
+    # 运行中会话内存快照的有效期（秒），过期后回退数据库刷新
+    SESSION_METER_TTL_SECONDS: int = 60
+    # 快照只在本进程内维护，扣费与启停在其他进程执行时无法同步；多进程部署时须关闭
+    SESSION_METER_ENABLED: bool = True
+
+    # 是否在 API 进程内运行定时任务；多 worker 部署时关闭，由 run_scheduler.py 单独运行
+    SCHEDULER_ENABLED: bool = True
+    # 定时任务进程锁（同一台机器只允许一个调度器运行）与状态快照文件（供 API 进程查看）
+    SCHEDULER_LOCK_FILE: str = "./scheduler.lock"
+    SCHEDULER_STATUS_FILE: str = "./scheduler_status.json"
+    # 定时任务：保留的执行历史条数；删除补偿任务积压时的最大退避间隔（秒）
+    SCHEDULER_HISTORY_SIZE: int = 100
+    DELETION_JOB_MAX_INTERVAL_SECONDS: int = 160
+
+    # 云端删除失败后的重试间隔：从 BASE 起按失败次数指数增长，最长 MAX（秒）
+    DELETION_RETRY_BASE_SECONDS: int = 10
+    DELETION_RETRY_MAX_SECONDS: int = 1800
+    # 删除补偿任务每轮最多处理的容器数与并发调用 UCloud 的数量
+    DELETION_BATCH_SIZE: int = 100
+    DELETION_CONCURRENCY: int = 8
+
+    # 云电脑创建任务：每个进程同时执行的任务数（全局并发上限）
+    CONTAINER_CREATE_WORKERS: int = 4
+    # 查询创建任务时最长等待（长轮询）秒数
+    CONTAINER_JOB_MAX_WAIT_SECONDS: int = 30
+    # 容器操作幂等键：记录保留时长、处理中记录视为中断的时长与进程内缓存条数
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_PROCESSING_TIMEOUT_SECONDS: int = 300
+    IDEMPOTENCY_CACHE_SIZE: int = 10000
+    # 历史日志与扣费记录归档：保留天数（可按表覆盖）、归档目录、每批删除行数、每日自动归档（UTC 小时）
+    ARCHIVE_ENABLED: bool = False
+    ARCHIVE_DIR: str = "./archive"
+    ARCHIVE_RETENTION_DAYS: int = 180
+    ARCHIVE_RETENTION_DAYS_BY_TABLE: Dict[str, int] = {}
+    ARCHIVE_DELETE_CHUNK_SIZE: int = 1000
+    ARCHIVE_RUN_HOUR: int = 4
+    # 批量充值/扣减用户余额：单次请求最多条目数
+    BULK_BALANCE_MAX_ITEMS: int = 1000
+
+    # 预创建实例池：为每个套餐保持若干已创建并停止的实例，创建云电脑时直接领取启动
+    WARM_POOL_ENABLED: bool = False
+    # 每个套餐的池大小，未配置的套餐使用 WARM_POOL_DEFAULT_SIZE，如 {"config_1": 3}
+    WARM_POOL_SIZES: Dict[str, int] = {}
+    WARM_POOL_DEFAULT_SIZE: int = 0
+    # 池内实例（含创建中）总数上限，控制闲置成本
+    WARM_POOL_MAX_INSTANCES: int = 10
+    # 补充任务执行间隔与每轮最多新建实例数
+    WARM_POOL_REFILL_INTERVAL_SECONDS: int = 30
+    WARM_POOL_REFILL_BATCH: int = 2
+    # 创建后超过该时长仍未停止就绪的实例将被回收
+    WARM_POOL_PROVISION_TIMEOUT_SECONDS: int = 1800
+
+    # 是否开放 /metrics 运行指标接口（默认关闭）
+    METRICS_ENABLED: bool = False
+    # 设置后 /metrics 需携带 Authorization: Bearer <METRICS_TOKEN>
+    METRICS_TOKEN: str = ""
+    # 多进程部署时各进程指标快照的共享目录（为空则只输出本进程指标）与写入间隔（秒）
+    METRICS_MULTIPROCESS_DIR: str = ""
+    METRICS_SNAPSHOT_INTERVAL_SECONDS: float = 5.0
+
+    # 单个请求的SQL查询预算，超出时记录告警（0 表示不检查）
+    QUERY_BUDGET: int = 30
+    # 按路由单独配置的查询预算，键为 "方法 路由模板"，如 {"GET /api/admin/users": 10}
+    QUERY_BUDGET_ROUTES: Dict[str, int] = {}
+
+    # 按需采样分析（超级管理员请求头 X-Profile: 1 或 /admin/config/profiling 限时窗口）
+    PROFILER_ENABLED: bool = True
+    PROFILER_DIR: str = "./profiles"
+    PROFILER_MAX_FILES: int = 50
+    PROFILER_SAMPLE_INTERVAL_MS: int = 5
+
+    # 请求链路追踪（OTLP-JSON 写入本地滚动文件）
+    TRACING_ENABLED: bool = False
+    TRACING_SAMPLE_RATE: float = 1.0
+    TRACING_FILE: str = "./logs/traces.jsonl"
+    TRACING_MAX_BYTES: int = 50 * 1024 * 1024
+    TRACING_BACKUP_COUNT: int = 5
+
+    # 访问日志采样率（0~1），错误与慢请求始终记录
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0
+    ACCESS_LOG_SLOW_MS: int = 1000
+    # 访问日志每秒最多输出条数（0 表示不限制），WARNING 及以上不受限
+    ACCESS_LOG_MAX_PER_SECOND: int = 200
+
+    # 日志输出：后台线程写 stdout 与可选的滚动文件，格式为 json 或 text
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_FILE: str = ""
+    LOG_FILE_MAX_BYTES: int = 50 * 1024 * 1024
+    LOG_FILE_BACKUP_COUNT: int = 5
+    # 日志队列容量，写满时丢弃新记录而不阻塞请求
+    LOG_QUEUE_SIZE: int = 10000
+
     class Config:
         env_file = ".env"
 
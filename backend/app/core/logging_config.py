@@ -0,0 +1,215 @@
+"""非阻塞结构化日志
+
+业务代码（请求处理、扣费任务）只把日志记录放入有界内存队列，
+格式化与写 stdout / 文件由 QueueListener 后台线程完成，磁盘卡顿不会阻塞事件循环。
+队列写满时直接丢弃并计数，而不是等待。
+
+- 输出 JSON 行（LOG_FORMAT=json）或传统文本（LOG_FORMAT=text），自动附带当前请求ID
+- 高频访问日志（app.access）按 ACCESS_LOG_MAX_PER_SECOND 限流，WARNING 及以上不受限
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import List, Optional
+
+from app.core import metrics
+from app.core.config import get_settings
+
+settings = get_settings()
+
+ACCESS_LOGGER_NAME = "app.access"
+
+# 当前请求ID，由请求上下文中间件设置
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# LogRecord 自带属性，其余属性视为 extra 字段输出
+_RESERVED_ATTRS = set(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__
+) | {"message", "asctime", "request_id"}
+
+log_records_dropped_total = metrics.registry.counter(
+    "log_records_dropped_total",
+    "被丢弃的日志记录数（queue_full：队列已满；rate_limited：访问日志限流）",
+    ("logger", "reason"),
+)
+
+
+class JsonFormatter(logging.Formatter):
+    """单行 JSON 格式"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            payload["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # 经队列传递的记录只保留在调用线程中生成的异常文本
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not getattr(record, "request_id", None):
+            record.request_id = "-"
+        return super().format(record)
+
+
+class RequestIdFilter(logging.Filter):
+    """在调用线程中记录当前请求ID（上下文变量在后台线程中不可见）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "request_id", None):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """令牌桶限流：仅作用于指定 logger 的 WARNING 以下日志"""
+
+    def __init__(self, logger_name: str, max_per_second: int):
+        super().__init__()
+        self.logger_name = logger_name
+        self.rate = max_per_second
+        self.tokens = float(max_per_second)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.name != self.logger_name or record.levelno >= logging.WARNING:
+            return True
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+
+        log_records_dropped_total.inc(logger=record.name, reason="rate_limited")
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """只在调用线程中合并消息参数，格式化留给后台线程；队列满时丢弃"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 参数可能是之后会被修改的可变对象，先合并为字符串
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped_total.inc(logger=record.name, reason="queue_full")
+
+
+class QueuedHandlerGroup:
+    """一组输出 handler 及其后台线程
+
+    `handler` 为挂到 logger 上的队列 handler；调用方线程只做入队，
+    由后台线程把记录交给各输出 handler。
+    """
+
+    def __init__(self, *handlers: logging.Handler):
+        self.handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+        self.listener = QueueListener(
+            self.handler.queue, *handlers, respect_handler_level=True
+        )
+        self.listener.start()
+        _groups.append(self)
+
+    def stop(self) -> None:
+        """写出队列中剩余记录并停止后台线程（可重复调用）"""
+        if self.listener._thread is not None:
+            self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+
+
+_groups: List[QueuedHandlerGroup] = []
+_root_group: Optional[QueuedHandlerGroup] = None
+
+
+def _build_output_handlers() -> list:
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if settings.LOG_FILE:
+        os.makedirs(os.path.dirname(os.path.abspath(settings.LOG_FILE)), exist_ok=True)
+        handlers.append(
+            RotatingFileHandler(
+                settings.LOG_FILE,
+                maxBytes=settings.LOG_FILE_MAX_BYTES,
+                backupCount=settings.LOG_FILE_BACKUP_COUNT,
+                encoding="utf-8",
+            )
+        )
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def setup_logging() -> None:
+    """配置根 logger 使用队列日志（重复调用无副作用）"""
+    global _root_group
+    if _root_group is not None:
+        return
+
+    _root_group = QueuedHandlerGroup(*_build_output_handlers())
+    _root_group.handler.addFilter(RequestIdFilter())
+    _root_group.handler.addFilter(
+        RateLimitFilter(ACCESS_LOGGER_NAME, settings.ACCESS_LOG_MAX_PER_SECOND)
+    )
+
+    root = logging.getLogger()
+    root.handlers = [_root_group.handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+    # SQL 回显由 SQLAlchemy 自带 handler 直接输出，这里不重复处理
+    logging.getLogger("sqlalchemy.engine").propagate = False
+
+
+def shutdown_logging() -> None:
+    """恢复根 logger 并写出队列中剩余日志"""
+    global _root_group
+    if _root_group is None:
+        return
+    logging.getLogger().removeHandler(_root_group.handler)
+    _root_group.stop()
+    _groups.remove(_root_group)
+    _root_group = None
+
+
+@atexit.register
+def _stop_all_groups() -> None:
+    while _groups:
+        _groups.pop().stop()
@@ -0,0 +1,608 @@
+"""进程内运行指标
+
+提供 Counter / Gauge / Histogram 三种轻量指标，数据保存在进程内存中，
+由 `/metrics` 接口按 Prometheus 文本格式输出。
+多进程部署（`METRICS_MULTIPROCESS_DIR`）时各进程定期把指标写入共享目录，
+`/metrics` 由任一 worker 汇总全部 API worker 与定时任务进程的指标后输出。
+"""
+
+import abc
+import asyncio
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 默认延迟分桶（秒），与 Prometheus 客户端默认值一致
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 数据库语句耗时通常远低于 HTTP 请求，使用更细的分桶
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4"
+
+INF_LABEL = 'le="+Inf"'
+
+
+def _escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(abc.ABC):
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 的标签应为 {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+
+    @abc.abstractmethod
+    def render(self) -> List[str]:
+        """按 Prometheus 文本格式输出的行"""
+
+    @abc.abstractmethod
+    def reset(self) -> None:
+        """清空全部序列"""
+
+    def clone_empty(self) -> "_Metric":
+        """同名、同标签的空指标（多进程汇总时作为累加目标）"""
+        return self.__class__(self.name, self.documentation, self.labelnames)
+
+    @abc.abstractmethod
+    def snapshot(self) -> list:
+        """导出全部序列（可 JSON 序列化），用于多进程汇总"""
+
+    @abc.abstractmethod
+    def load(self, series: list) -> None:
+        """累加另一个进程导出的序列"""
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            # 无标签指标在未产生数据时也输出 0，便于告警规则判断
+            items = [((), 0.0)]
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def load(self, series: list) -> None:
+        with self._lock:
+            for key, value in series:
+                key = tuple(key)
+                self._values[key] = self._values.get(key, 0.0) + value
+
+
+class Gauge(_Metric):
+    """可增可减的瞬时值"""
+
+    metric_type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        multiprocess_mode: str = "sum",
+    ):
+        super().__init__(name, documentation, labelnames)
+        # 多进程汇总方式：sum 为各进程之和，max 取最大值（如熔断状态）
+        self.multiprocess_mode = multiprocess_mode
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def clone_empty(self) -> "Gauge":
+        return Gauge(self.name, self.documentation, self.labelnames, self.multiprocess_mode)
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            # 无标签指标在未产生数据时也输出 0，便于告警规则判断
+            items = [((), 0.0)]
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def load(self, series: list) -> None:
+        with self._lock:
+            for key, value in series:
+                key = tuple(key)
+                if key in self._values and self.multiprocess_mode == "max":
+                    self._values[key] = max(self._values[key], value)
+                else:
+                    self._values[key] = self._values.get(key, 0.0) + value
+
+
+class _HistogramSeries:
+    __slots__ = ("bucket_counts", "count", "total")
+
+    def __init__(self, bucket_count: int):
+        self.bucket_counts = [0] * bucket_count
+        self.count = 0
+        self.total = 0.0
+
+
+class Histogram(_Metric):
+    """分桶直方图（记录耗时分布）"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets))
+            if index < len(self.buckets):
+                series.bucket_counts[index] += 1
+            series.count += 1
+            series.total += value
+
+    @contextmanager
+    def time(self, **labels):
+        """计时上下文：退出时记录耗时（秒）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def clone_empty(self) -> "Histogram":
+        return Histogram(self.name, self.documentation, self.labelnames, self.buckets)
+
+    def get_count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return series.count if series else 0
+
+    def get_sum(self, **labels) -> float:
+        series = self._series.get(self._key(labels))
+        return series.total if series else 0.0
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        with self._lock:
+            snapshot = [
+                (key, list(series.bucket_counts), series.count, series.total)
+                for key, series in sorted(self._series.items())
+            ]
+        for key, bucket_counts, count, total in snapshot:
+            cumulative = 0
+            for upper, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(upper)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            lines.append(
+                f"{self.name}_bucket{_format_labels(self.labelnames, key, INF_LABEL)} {count}"
+            )
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [
+                [list(key), list(series.bucket_counts), series.count, series.total]
+                for key, series in self._series.items()
+            ]
+
+    def load(self, series: list) -> None:
+        with self._lock:
+            for key, bucket_counts, count, total in series:
+                key = tuple(key)
+                target = self._series.get(key)
+                if target is None:
+                    target = self._series[key] = _HistogramSeries(len(self.buckets))
+                for index, bucket_count in enumerate(bucket_counts):
+                    target.bucket_counts[index] += bucket_count
+                target.count += count
+                target.total += total
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"指标 {metric.name} 已注册")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        multiprocess_mode: str = "sum",
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, multiprocess_mode))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """输出 Prometheus 文本格式"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def snapshot(self) -> dict:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def render_merged(self, snapshots: Iterable[Tuple[dict, bool]]) -> str:
+        """汇总多个进程的指标快照并输出文本格式
+
+        snapshots 为 (快照, 进程是否存活)；计数器与直方图累加所有进程（含已退出进程，保持单调递增），
+        瞬时值只汇总存活进程。
+        """
+        snapshots = list(snapshots)
+        lines: List[str] = []
+        for name, metric in self._metrics.items():
+            merged = metric.clone_empty()
+            for snapshot, alive in snapshots:
+                if isinstance(metric, Gauge) and not alive:
+                    continue
+                series = snapshot.get(name)
+                if series:
+                    merged.load(series)
+            lines.extend(merged.render())
+        return "\n".join(lines) + "\n"
+
+
+# 全局指标注册表
+registry = MetricsRegistry()
+
+# ==================== 多进程汇总 ====================
+
+SNAPSHOT_PREFIX = "metrics_"
+SNAPSHOT_SUFFIX = ".json"
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        pass
+    return True
+
+
+def write_snapshot(directory: str) -> None:
+    """将本进程的指标写入共享目录（原子替换）"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{SNAPSHOT_PREFIX}{os.getpid()}{SNAPSHOT_SUFFIX}")
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"pid": os.getpid(), "metrics": registry.snapshot()}, f)
+    os.replace(temp_path, path)
+
+
+def render_multiprocess(directory: str) -> str:
+    """汇总共享目录中所有进程（API worker 与定时任务进程）的指标"""
+    write_snapshot(directory)
+    snapshots = []
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIX)):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        snapshots.append((data.get("metrics", {}), _pid_alive(int(data.get("pid", 0)))))
+    return registry.render_merged(snapshots)
+
+
+async def write_snapshots_periodically(directory: str, interval: float) -> None:
+    """定期写入本进程指标快照，取消时写入最后一次"""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                write_snapshot(directory)
+            except OSError as e:
+                logger.warning("写入指标快照失败: %s", e)
+    finally:
+        try:
+            write_snapshot(directory)
+        except OSError:
+            pass
+
+# ==================== HTTP ====================
+
+http_requests_total = registry.counter(
+    "http_requests_total",
+    "HTTP请求数（按路由模板、方法与状态码）",
+    ("method", "route", "status"),
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP请求处理耗时（秒）",
+    ("method", "route"),
+)
+http_requests_in_progress = registry.gauge(
+    "http_requests_in_progress",
+    "正在处理的HTTP请求数",
+)
+
+# ==================== 数据库 ====================
+
+db_pool_checkout_wait_seconds = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "从连接池获取数据库连接的等待耗时（秒）",
+    buckets=DB_BUCKETS,
+)
+db_statement_duration_seconds = registry.histogram(
+    "db_statement_duration_seconds",
+    "SQL语句执行耗时（秒，按语句类型）",
+    ("operation",),
+    buckets=DB_BUCKETS,
+)
+db_statement_errors_total = registry.counter(
+    "db_statement_errors_total",
+    "SQL语句执行失败次数（按语句类型）",
+    ("operation",),
+)
+
+# ==================== 定时任务 ====================
+
+billing_tick_duration_seconds = registry.histogram(
+    "billing_tick_duration_seconds",
+    "每分钟扣费任务单次执行耗时（秒）",
+)
+billing_containers_charged_total = registry.counter(
+    "billing_containers_charged_total",
+    "扣费任务成功扣费的容器分钟数",
+)
+billing_auto_stops_total = registry.counter(
+    "billing_auto_stops_total",
+    "因代理余额不足自动停止的容器数",
+)
+billing_tick_failures_total = registry.counter(
+    "billing_tick_failures_total",
+    "扣费任务执行失败次数",
+)
+container_deletion_backlog = registry.gauge(
+    "container_deletion_backlog",
+    "待后台完成删除的容器数（最近一次删除补偿任务观测值）",
+)
+container_deletion_tick_duration_seconds = registry.histogram(
+    "container_deletion_tick_duration_seconds",
+    "删除补偿任务单次执行耗时（秒）",
+)
+container_deletion_due = registry.gauge(
+    "container_deletion_due",
+    "已到重试时间、等待删除补偿任务处理的容器数",
+)
+container_deletion_oldest_age_seconds = registry.gauge(
+    "container_deletion_oldest_age_seconds",
+    "最早提交删除且仍未完成的容器已等待的时长（秒）",
+)
+container_deletion_attempts_total = registry.counter(
+    "container_deletion_attempts_total",
+    "后台云端删除尝试次数（result：success / failure）",
+    ("result",),
+)
+scheduler_job_running = registry.gauge(
+    "scheduler_job_running",
+    "定时任务是否正在执行（1 为执行中）",
+    ("job",),
+)
+scheduler_job_overruns_total = registry.counter(
+    "scheduler_job_overruns_total",
+    "定时任务单次执行超出调度间隔的次数",
+    ("job",),
+)
+scheduler_job_skipped_total = registry.counter(
+    "scheduler_job_skipped_total",
+    "定时任务被跳过的次数（running：上次仍在执行；missed：错过执行时间）",
+    ("job", "reason"),
+)
+
+# ==================== 创建任务 ====================
+
+container_create_queue_depth = registry.gauge(
+    "container_create_queue_depth",
+    "排队等待执行的云电脑创建任务数",
+)
+container_create_jobs_total = registry.counter(
+    "container_create_jobs_total",
+    "已完成的云电脑创建任务数（result：succeeded / failed）",
+    ("result",),
+)
+container_create_job_duration_seconds = registry.histogram(
+    "container_create_job_duration_seconds",
+    "云电脑创建任务从开始执行到完成的耗时（秒）",
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+
+idempotency_requests_total = registry.counter(
+    "idempotency_requests_total",
+    "携带幂等键的容器操作请求（stored 首次执行并保存 / replayed 重放 / failed 执行失败）",
+    ("endpoint", "result"),
+)
+
+container_time_to_desktop_seconds = registry.histogram(
+    "container_time_to_desktop_seconds",
+    "从提交创建到云电脑可连接的耗时（秒），source：warm 领取预创建实例 / cold 新建",
+    ("source",),
+    buckets=(1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0),
+)
+warm_pool_claims_total = registry.counter(
+    "warm_pool_claims_total",
+    "预创建实例领取次数（result：hit 命中 / miss 池为空 / failed 启动失败）",
+    ("config_code", "result"),
+)
+warm_pool_instances = registry.gauge(
+    "warm_pool_instances",
+    "预创建实例池内实例数（最近一次补充任务观测值）",
+    ("config_code", "status"),
+)
+warm_pool_provisioned_total = registry.counter(
+    "warm_pool_provisioned_total",
+    "补充任务新建的预创建实例数",
+    ("config_code",),
+)
+
+archive_rows_total = registry.counter(
+    "archive_rows_total",
+    "已归档并从数据库删除的记录数（按表）",
+    ("table",),
+)
+
+# ==================== UCloud ====================
+
+ucloud_call_duration_seconds = registry.histogram(
+    "ucloud_call_duration_seconds",
+    "UCloud接口调用耗时（秒，按接口）",
+    ("action",),
+)
+ucloud_call_errors_total = registry.counter(
+    "ucloud_call_errors_total",
+    "UCloud接口调用失败次数（按接口与错误类型）",
+    ("action", "error"),
+)
+ucloud_call_rejected_total = registry.counter(
+    "ucloud_call_rejected_total",
+    "未发出的UCloud接口调用次数（reason：circuit_open 熔断 / rate_limited 限流）",
+    ("action", "reason"),
+)
+ucloud_describe_cache_total = registry.counter(
+    "ucloud_describe_cache_total",
+    "实例详情查询缓存结果（hit 命中 / shared 合并到进行中的查询 / miss 调用接口）",
+    ("result",),
+)
+ucloud_breaker_state = registry.gauge(
+    "ucloud_breaker_state",
+    "UCloud熔断器状态（0 正常 / 1 熔断 / 2 探测中）",
+    multiprocess_mode="max",
+)
+ucloud_breaker_opened_total = registry.counter(
+    "ucloud_breaker_opened_total",
+    "UCloud熔断器打开次数",
+)
@@ -0,0 +1,138 @@
+"""请求上下文中间件（纯 ASGI 实现）
+
+替代原先的两个 `@app.middleware("http")`（BaseHTTPMiddleware）：
+每个请求不再额外创建任务与内存流，流式响应也按原样透传。
+在一处完成请求ID、耗时统计、运行指标、SQL 统计、链路追踪、按需采样与访问日志。
+"""
+
+import logging
+import random
+import time
+import uuid
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.core.logging_config import ACCESS_LOGGER_NAME, request_id_var
+from app.core.profiler import request_profiler
+from app.core.query_stats import RequestQueryTracker
+from app.core.tracing import tracer
+
+settings = get_settings()
+
+access_logger = logging.getLogger(ACCESS_LOGGER_NAME)
+
+
+def _route_template(scope) -> str:
+    """当前请求匹配到的路由模板（路由匹配后由 Router 写入 scope）"""
+    return getattr(scope.get("route"), "path", None)
+
+
+class RequestContextMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = uuid.uuid4().hex[:8]
+        scope.setdefault("state", {})["request_id"] = request_id
+        # 请求内的日志记录自动带上请求ID
+        request_id_token = request_id_var.set(request_id)
+        method = scope["method"]
+        started = time.perf_counter()
+        status_code = 500
+        profile_name = None
+        query_tracker = RequestQueryTracker()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode()))
+                headers.extend(query_tracker.debug_headers())
+                if profile_name:
+                    headers.append((b"x-profile-id", profile_name.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        metrics.http_requests_in_progress.inc()
+        try:
+            # 以请求ID开启链路追踪根 span，SQL 与 UCloud 调用作为子 span
+            with tracer.start_trace(f"{method} {scope['path']}", request_id) as span:
+                try:
+                    if request_profiler.should_profile_scope(scope):
+                        async with request_profiler.profile(
+                            f"{method} {scope['path']}"
+                        ) as profile_result:
+                            profile_name = profile_result["name"]
+                            await self.app(scope, receive, send_wrapper)
+                    else:
+                        await self.app(scope, receive, send_wrapper)
+                finally:
+                    if span is not None:
+                        self._annotate_span(span, scope, status_code)
+        except Exception as e:
+            access_logger.error(
+                "✕ 异常 %s %s %s: %s - %.3fs",
+                method,
+                scope["path"],
+                e.__class__.__name__,
+                e,
+                time.perf_counter() - started,
+            )
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            metrics.http_requests_in_progress.dec()
+            route = _route_template(scope)
+            # 统计请求内的SQL语句数与耗时，超出预算时告警
+            query_tracker.finish(method, route)
+            route = route or "unmatched"
+            metrics.http_requests_total.inc(
+                method=method, route=route, status=str(status_code)
+            )
+            metrics.http_request_duration_seconds.observe(
+                duration, method=method, route=route
+            )
+            self._log_access(method, scope, status_code, duration)
+            request_id_var.reset(request_id_token)
+
+    @staticmethod
+    def _annotate_span(span, scope, status_code: int) -> None:
+        route = _route_template(scope)
+        if route:
+            span.name = f"{scope['method']} {route}"
+        span.set_attribute("http.method", scope["method"])
+        span.set_attribute("http.route", route)
+        span.set_attribute("http.target", scope["path"])
+        span.set_attribute("http.status_code", status_code)
+        if status_code >= 500:
+            span.set_error(f"HTTP {status_code}")
+
+    @staticmethod
+    def _log_access(method, scope, status_code: int, duration: float) -> None:
+        """访问日志：错误与慢请求全部记录，其余按采样率记录"""
+        if not access_logger.isEnabledFor(logging.INFO):
+            return
+        if (
+            status_code < 500
+            and duration * 1000 < settings.ACCESS_LOG_SLOW_MS
+            and random.random() >= settings.ACCESS_LOG_SAMPLE_RATE
+        ):
+            return
+        access_logger.info(
+            "← %s %s %s - %.3fs",
+            method,
+            scope["path"],
+            status_code,
+            duration,
+            extra={
+                "http_method": method,
+                "http_route": _route_template(scope),
+                "http_status": status_code,
+                "duration_ms": round(duration * 1000, 2),
+            },
+        )
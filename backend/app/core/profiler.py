@@ -0,0 +1,325 @@
+"""按需采样分析器
+
+线上某个接口变慢时，无需重新部署即可采集调用栈：
+- 超级管理员在请求上携带 `X-Profile: 1` 请求头（或 `__profile=1` 查询参数），只分析该请求；
+- 或通过 `/admin/config/profiling` 开启一个限时窗口，窗口内分析匹配路径前缀的请求，
+  并可选同时分析每分钟扣费任务。
+
+采样线程按固定间隔读取事件循环线程的调用栈，开销与请求内调用深度无关。
+结果以 folded stacks 格式（`帧;帧;帧 次数`）写入磁盘，可直接用 flamegraph.pl / speedscope 打开。
+目录内文件数有上限，超出时删除最旧的文件（环形缓冲）。
+
+注意：事件循环是单线程的，采样期间同一进程内并发处理的其他请求也会被计入。
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from app.core.config import get_settings
+from app.core.security import decode_token
+
+settings = get_settings()
+
+PROFILE_HEADER_BYTES = b"x-profile"
+PROFILE_QUERY_BYTES = b"__profile=1"
+PROFILE_FILE_SUFFIX = ".folded"
+WINDOW_FILE_NAME = "window.json"
+WINDOW_CHECK_INTERVAL_SECONDS = 1.0
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_STDLIB_DIR = os.path.dirname(os.__file__)
+_UNSAFE_LABEL_PATTERN = re.compile(r"[^A-Za-z0-9_.-]+")
+_PROFILE_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_.-]+\.folded$")
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(_BACKEND_DIR):
+        filename = os.path.relpath(filename, _BACKEND_DIR)
+    elif "site-packages" in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    elif filename.startswith(_STDLIB_DIR):
+        filename = os.path.relpath(filename, _STDLIB_DIR)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """在后台线程中周期性采集目标线程的调用栈"""
+
+    def __init__(self, target_thread_id: int, interval: float):
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._label_cache = {}
+
+    def _sample_once(self) -> None:
+        frame = sys._current_frames().get(self.target_thread_id)
+        if frame is None:
+            return
+
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._label_cache.get(code)
+            if label is None:
+                label = self._label_cache[code] = _frame_label(code)
+            stack.append(label)
+            frame = frame.f_back
+        stack.reverse()
+        self.samples[";".join(stack)] += 1
+        self.sample_count += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample_once()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ProfileStore:
+    """磁盘上的分析结果环形缓冲"""
+
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_name(label: str) -> str:
+        safe_label = _UNSAFE_LABEL_PATTERN.sub("_", label).strip("_")[:80] or "profile"
+        return f"{datetime.utcnow():%Y%m%d-%H%M%S-%f}_{safe_label}{PROFILE_FILE_SUFFIX}"
+
+    def save(self, name: str, content: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            with open(os.path.join(self.directory, name), "w", encoding="utf-8") as f:
+                f.write(content)
+            self._trim()
+        return name
+
+    def _trim(self) -> None:
+        names = self._names()
+        for name in names[: max(0, len(names) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _names(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        # 文件名以 UTC 时间开头，字典序即时间顺序
+        return sorted(
+            name for name in os.listdir(self.directory) if _PROFILE_NAME_PATTERN.match(name)
+        )
+
+    def list(self) -> List[dict]:
+        profiles = []
+        for name in reversed(self._names()):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            profiles.append(
+                {
+                    "name": name,
+                    "size": stat.st_size,
+                    "created_at": datetime.utcfromtimestamp(stat.st_mtime).isoformat(),
+                }
+            )
+        return profiles
+
+    def path_for(self, name: str) -> Optional[str]:
+        """校验文件名并返回路径（不存在或非法时返回 None）"""
+        if not _PROFILE_NAME_PATTERN.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+
+@dataclass
+class ProfilingWindow:
+    """限时分析窗口"""
+
+    expires_at: datetime
+    path_prefix: Optional[str] = None
+    include_billing: bool = False
+    created_by: Optional[int] = None
+
+    @property
+    def active(self) -> bool:
+        return datetime.utcnow() < self.expires_at
+
+    def to_dict(self) -> dict:
+        return {
+            "expires_at": self.expires_at.isoformat(),
+            "remaining_seconds": max(
+                0, int((self.expires_at - datetime.utcnow()).total_seconds())
+            ),
+            "path_prefix": self.path_prefix,
+            "include_billing": self.include_billing,
+            "created_by": self.created_by,
+        }
+
+
+class RequestProfiler:
+    """采样分析入口：决定是否分析、执行采样并保存结果"""
+
+    def __init__(self):
+        self.store = ProfileStore(settings.PROFILER_DIR, settings.PROFILER_MAX_FILES)
+        self.window: Optional[ProfilingWindow] = None
+        # 窗口同时写入文件，多进程部署时其他 API worker 与定时任务进程据此同步
+        self.window_file = os.path.join(settings.PROFILER_DIR, WINDOW_FILE_NAME)
+        self._window_mtime: Optional[int] = None
+        self._window_checked_at = 0.0
+        # 同一时间只运行一个采样会话，避免并发请求互相重复计入
+        self._busy = threading.Lock()
+
+    def open_window(
+        self,
+        duration_seconds: int,
+        path_prefix: Optional[str] = None,
+        include_billing: bool = False,
+        created_by: Optional[int] = None,
+    ) -> ProfilingWindow:
+        self.window = ProfilingWindow(
+            expires_at=datetime.utcnow() + timedelta(seconds=duration_seconds),
+            path_prefix=path_prefix or None,
+            include_billing=include_billing,
+            created_by=created_by,
+        )
+        os.makedirs(settings.PROFILER_DIR, exist_ok=True)
+        temp_path = f"{self.window_file}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {**asdict(self.window), "expires_at": self.window.expires_at.isoformat()}, f
+            )
+        os.replace(temp_path, self.window_file)
+        self._window_mtime = os.stat(self.window_file).st_mtime_ns
+        return self.window
+
+    def close_window(self) -> None:
+        self.window = None
+        try:
+            os.remove(self.window_file)
+        except FileNotFoundError:
+            pass
+        self._window_mtime = None
+
+    def _sync_window(self) -> None:
+        """按文件同步其他进程开启或关闭的窗口（最多每秒检查一次）"""
+        now = time.monotonic()
+        if now - self._window_checked_at < WINDOW_CHECK_INTERVAL_SECONDS:
+            return
+        self._window_checked_at = now
+        try:
+            mtime = os.stat(self.window_file).st_mtime_ns
+        except FileNotFoundError:
+            self.window = None
+            self._window_mtime = None
+            return
+        except OSError:
+            return
+        if mtime == self._window_mtime:
+            return
+        try:
+            with open(self.window_file, encoding="utf-8") as f:
+                data = json.load(f)
+            data["expires_at"] = datetime.fromisoformat(data["expires_at"])
+            self.window = ProfilingWindow(**data)
+        except (OSError, ValueError, TypeError, KeyError):
+            return
+        self._window_mtime = mtime
+
+    def active_window(self) -> Optional[ProfilingWindow]:
+        self._sync_window()
+        window = self.window
+        if window and not window.active:
+            self.window = None
+            return None
+        return window
+
+    @staticmethod
+    def _is_super_admin(authorization: str) -> bool:
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return False
+        payload = decode_token(token)
+        return bool(
+            payload
+            and payload.get("type") == "admin"
+            and payload.get("role") == "super_admin"
+        )
+
+    def should_profile_scope(self, scope) -> bool:
+        """根据 ASGI scope 判断是否采样该请求（未命中时不解析请求头）"""
+        if not settings.PROFILER_ENABLED:
+            return False
+
+        window = self.active_window()
+        if window and (
+            not window.path_prefix or scope["path"].startswith(window.path_prefix)
+        ):
+            return True
+
+        headers = dict(scope["headers"])
+        requested = headers.get(PROFILE_HEADER_BYTES) == b"1" or (
+            PROFILE_QUERY_BYTES in scope.get("query_string", b"")
+        )
+        return requested and self._is_super_admin(
+            headers.get(b"authorization", b"").decode("latin-1")
+        )
+
+    def should_profile_billing(self) -> bool:
+        window = self.active_window()
+        return bool(settings.PROFILER_ENABLED and window and window.include_billing)
+
+    @asynccontextmanager
+    async def profile(self, label: str):
+        """对代码块进行采样，结束后保存结果
+
+        yield 一个字典，其中 name 为结果文件名（开始时即确定，便于提前写入响应头）；
+        已有采样会话在运行时跳过本次分析（name 为 None）。
+        """
+        result = {"name": None, "samples": 0}
+        if not self._busy.acquire(blocking=False):
+            yield result
+            return
+
+        result["name"] = self.store.new_name(label)
+        sampler = StackSampler(
+            threading.get_ident(), settings.PROFILER_SAMPLE_INTERVAL_MS / 1000
+        )
+        sampler.start()
+        try:
+            yield result
+        finally:
+            sampler.stop()
+            self._busy.release()
+            result["samples"] = sampler.sample_count
+            self.store.save(result["name"], sampler.folded())
+
+
+# 全局采样分析器
+request_profiler = RequestProfiler()
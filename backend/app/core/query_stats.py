@@ -0,0 +1,154 @@
+"""请求级 SQL 统计与 N+1 检测
+
+每个请求在上下文变量中登记一个 QueryStats 收集器，
+数据库语句事件（见 app.db.instrumentation）将语句数与耗时累加到当前所有收集器。
+请求结束后由中间件输出调试响应头，并在超出查询预算时记录告警。
+
+收集器可以嵌套：测试中用 assert_max_queries() 包裹一次接口调用，
+即可断言该接口的查询数不超过预算。
+"""
+
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+_active_collectors: ContextVar[Tuple["QueryStats", ...]] = ContextVar(
+    "query_stats_collectors", default=()
+)
+
+# 归一化语句时去掉字面量，使同一模板的重复查询可以合并计数
+_NUMBER_PATTERN = re.compile(r"\b\d+\b")
+_STRING_PATTERN = re.compile(r"'(?:[^']|'')*'")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+# 输出摘要时折叠 SELECT 列表，保留 FROM/WHERE 便于定位
+_SELECT_COLUMNS_PATTERN = re.compile(r"^SELECT .+? FROM ", re.IGNORECASE)
+
+
+def normalize_statement(statement: str) -> str:
+    statement = _STRING_PATTERN.sub("?", statement)
+    statement = _NUMBER_PATTERN.sub("?", statement)
+    return _WHITESPACE_PATTERN.sub(" ", statement).strip()
+
+
+@dataclass
+class QueryStats:
+    """一次请求（或一段代码）内的 SQL 统计"""
+
+    count: int = 0
+    total_time: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.statements[normalize_statement(statement)] += 1
+
+    @property
+    def total_time_ms(self) -> float:
+        return round(self.total_time * 1000, 2)
+
+    def repeated_statements(self, threshold: int = 2) -> List[Tuple[str, int]]:
+        """重复执行的语句模板（疑似 N+1），按次数降序"""
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+    def describe(self, limit: int = 3) -> str:
+        """统计摘要，附重复次数最多的语句模板"""
+        summary = f"{self.count} 条查询，耗时 {self.total_time_ms}ms"
+        repeated = self.repeated_statements()[:limit]
+        if repeated:
+            details = "; ".join(
+                f"{count}x {_SELECT_COLUMNS_PATTERN.sub('SELECT ... FROM ', statement)[:200]}"
+                for statement, count in repeated
+            )
+            summary += f"，重复语句: {details}"
+        return summary
+
+
+def record_statement(statement: str, duration: float) -> None:
+    """由数据库语句事件调用，累加到当前所有收集器"""
+    for collector in _active_collectors.get():
+        collector.record(statement, duration)
+
+
+@contextmanager
+def track_queries():
+    """在当前上下文内统计 SQL 语句
+
+    用法：
+        with track_queries() as stats:
+            ...
+        print(stats.count, stats.total_time_ms)
+    """
+    stats = QueryStats()
+    token = _active_collectors.set(_active_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active_collectors.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int):
+    """测试辅助：断言代码块内的查询数不超过预算
+
+    用法：
+        with assert_max_queries(10):
+            await client.get("/api/admin/users", headers=headers)
+    """
+    with track_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        raise AssertionError(
+            f"查询数超出预算：预算 {max_queries}，实际 {stats.describe()}"
+        )
+
+
+def get_query_budget(method: str, route: str) -> int:
+    """获取路由的查询预算（未单独配置时使用全局预算）"""
+    return settings.QUERY_BUDGET_ROUTES.get(f"{method} {route}", settings.QUERY_BUDGET)
+
+
+def check_query_budget(method: str, route: str, stats: QueryStats) -> bool:
+    """超出预算时记录告警，返回是否在预算内"""
+    budget = get_query_budget(method, route)
+    if budget <= 0 or stats.count <= budget:
+        return True
+    logger.warning("查询数超出预算 %s %s: 预算 %s，%s", method, route, budget, stats.describe())
+    return False
+
+
+class RequestQueryTracker:
+    """请求级统计的开始/结束封装，供 HTTP 中间件使用"""
+
+    def __init__(self):
+        self.stats = QueryStats()
+        self._token = _active_collectors.set(_active_collectors.get() + (self.stats,))
+
+    def debug_headers(self) -> List[Tuple[bytes, bytes]]:
+        """调试模式下随响应返回的统计头（在响应开始时计算）"""
+        if not settings.DEBUG:
+            return []
+        return [
+            (b"x-query-count", str(self.stats.count).encode()),
+            (b"x-query-time-ms", str(self.stats.total_time_ms).encode()),
+        ]
+
+    def finish(self, method: str, route: Optional[str]) -> QueryStats:
+        _active_collectors.reset(self._token)
+        if route:
+            check_query_budget(method, route, self.stats)
+        return self.stats
@@ -0,0 +1,257 @@
+"""轻量请求链路追踪
+
+每个请求开启一个根 span（trace_id 以 X-Request-ID 开头，便于按请求ID检索），
+请求内的 SQL 语句、会话提交与 UCloud 接口调用作为子 span 挂在当前 span 下。
+请求结束后整条链路按 OTLP-JSON（ExportTraceServiceRequest）格式由后台线程写入本地滚动文件，
+每行一条，可直接导入兼容 OTLP 的后端或用 jq 分析。
+"""
+
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+
+from app.core.config import get_settings
+from app.core.logging_config import QueuedHandlerGroup
+
+settings = get_settings()
+
+# OTLP SpanKind
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# OTLP StatusCode
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+SERVICE_NAME = "cloud-pc-backend"
+SCOPE_NAME = "app.core.tracing"
+
+# 单条链路最多记录的 span 数，防止批量操作产生超大记录
+MAX_SPANS_PER_TRACE = 2000
+
+
+def _new_span_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+@dataclass
+class Span:
+    trace: "Trace"
+    name: str
+    kind: int = SPAN_KIND_INTERNAL
+    parent_span_id: Optional[str] = None
+    span_id: str = field(default_factory=_new_span_id)
+    start_time_ns: int = field(default_factory=time.time_ns)
+    end_time_ns: Optional[int] = None
+    attributes: Dict[str, object] = field(default_factory=dict)
+    status_code: int = STATUS_UNSET
+    status_message: str = ""
+
+    def set_attribute(self, key: str, value) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_error(self, message: str) -> None:
+        self.status_code = STATUS_ERROR
+        self.status_message = message[:500]
+
+    def end(self) -> None:
+        if self.end_time_ns is None:
+            self.end_time_ns = time.time_ns()
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns or time.time_ns()),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": self.status_code},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    spans: List[Span] = field(default_factory=list)
+    dropped_spans: int = 0
+
+    def add(self, span: Span) -> None:
+        if len(self.spans) >= MAX_SPANS_PER_TRACE:
+            self.dropped_spans += 1
+            return
+        self.spans.append(span)
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("tracing_current_span", default=None)
+
+
+class TraceExporter:
+    """将整条链路以 OTLP-JSON 写入滚动文件"""
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._logger: Optional[logging.Logger] = None
+
+    def _get_logger(self) -> logging.Logger:
+        if self._logger is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(
+                self.path,
+                maxBytes=self.max_bytes,
+                backupCount=self.backup_count,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            trace_logger = logging.getLogger("app.tracing.export")
+            # 文件写入交给后台线程，不阻塞事件循环
+            trace_logger.handlers = [QueuedHandlerGroup(handler).handler]
+            trace_logger.setLevel(logging.INFO)
+            trace_logger.propagate = False
+            self._logger = trace_logger
+        return self._logger
+
+    def export(self, trace: Trace) -> None:
+        resource_attributes = [
+            {"key": "service.name", "value": _otlp_value(SERVICE_NAME)},
+            {"key": "process.pid", "value": _otlp_value(os.getpid())},
+        ]
+        if trace.dropped_spans:
+            resource_attributes.append(
+                {"key": "trace.dropped_spans", "value": _otlp_value(trace.dropped_spans)}
+            )
+        payload = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": resource_attributes},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": SCOPE_NAME},
+                            "spans": [span.to_otlp() for span in trace.spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        self._get_logger().info(
+            json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        )
+
+
+class Tracer:
+    """链路追踪入口"""
+
+    def __init__(self):
+        self.exporter = TraceExporter(
+            settings.TRACING_FILE,
+            settings.TRACING_MAX_BYTES,
+            settings.TRACING_BACKUP_COUNT,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return settings.TRACING_ENABLED
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        return _current_span.get()
+
+    @contextmanager
+    def start_trace(self, name: str, request_id: str, kind: int = SPAN_KIND_SERVER):
+        """开启根 span，结束时导出整条链路
+
+        未启用或未命中采样时 yield None，子 span 也不会被记录。
+        """
+        if not self.enabled or random.random() >= settings.TRACING_SAMPLE_RATE:
+            yield None
+            return
+
+        # trace_id 需为 32 位十六进制：以请求ID开头，其余随机补齐
+        trace_id = (request_id + uuid.uuid4().hex)[:32]
+        trace = Trace(trace_id=trace_id)
+        span = Span(trace=trace, name=name, kind=kind)
+        span.set_attribute("request.id", request_id)
+        trace.add(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.set_error(f"{e.__class__.__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+            self.exporter.export(trace)
+
+    def begin_span(
+        self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes
+    ) -> Optional[Span]:
+        """在当前 span 下创建子 span（不切换当前 span，用于无法包裹代码块的事件回调）"""
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        span = Span(
+            trace=parent.trace,
+            name=name,
+            kind=kind,
+            parent_span_id=parent.span_id,
+        )
+        for key, value in attributes.items():
+            span.set_attribute(key, value)
+        parent.trace.add(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+        """子 span 上下文：期间创建的 span 以其为父节点"""
+        span = self.begin_span(name, kind, **attributes)
+        if span is None:
+            yield None
+            return
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.set_error(f"{e.__class__.__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+
+# 全局链路追踪器
+tracer = Tracer()
@@ -1,17 +1,45 @@
-from sqlalchemy import text
+import hashlib
+import importlib
+import logging
+
+from sqlalchemy import delete, insert, select, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from app.core.config import get_settings
+from app.core.tracing import tracer
+from app.db.instrumentation import instrument_engine, timed_pool_class
+from app.db.search_index import (
+    ensure_search_index,
+    search_index_ddl,
+    set_search_index_enabled,
+)
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 创建异步引擎（连接池与语句执行接入运行指标）
+engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=settings.DEBUG if settings.SQL_ECHO is None else settings.SQL_ECHO,
+    future=True,
+    poolclass=timed_pool_class(settings.DATABASE_URL),
+)
+instrument_engine(engine.sync_engine)
+
+
+class TracedAsyncSession(AsyncSession):
+    """提交时记录链路追踪 span（flush 产生的语句挂在该 span 下）"""
+
+    async def commit(self) -> None:
+        with tracer.span("db commit"):
+            await super().commit()
 
-# 创建异步引擎
-engine = create_async_engine(settings.DATABASE_URL, echo=settings.DEBUG, future=True)
 
 # 创建异步会话
 AsyncSessionLocal = async_sessionmaker(
     engine,
-    class_=AsyncSession,
+    class_=TracedAsyncSession,
     expire_on_commit=False,
     autocommit=False,
     autoflush=False,
@@ -23,6 +51,18 @@ Base = declarative_base()
 CONTAINER_RECORD_OPTIONAL_COLUMNS = {
     "config_code": "ALTER TABLE container_record ADD COLUMN config_code VARCHAR(50)",
     "config_name": "ALTER TABLE container_record ADD COLUMN config_name VARCHAR(100)",
+    "delete_requested_at": (
+        "ALTER TABLE container_record ADD COLUMN delete_requested_at DATETIME"
+    ),
+    "delete_attempts": (
+        "ALTER TABLE container_record ADD COLUMN delete_attempts INTEGER NOT NULL DEFAULT 0"
+    ),
+    "next_delete_attempt_at": (
+        "ALTER TABLE container_record ADD COLUMN next_delete_attempt_at DATETIME"
+    ),
+    "last_delete_error": (
+        "ALTER TABLE container_record ADD COLUMN last_delete_error VARCHAR(500)"
+    ),
 }
 
 USER_OPTIONAL_COLUMNS = {
@@ -34,6 +74,23 @@ USER_OPTIONAL_COLUMNS = {
     ),
 }
 
+CONTAINER_CREATE_JOB_OPTIONAL_COLUMNS = {
+    "worker_id": "ALTER TABLE container_create_job ADD COLUMN worker_id VARCHAR(100)",
+}
+
+BALANCE_LOG_OPTIONAL_COLUMNS = {
+    "owner_admin_id": "ALTER TABLE balance_log ADD COLUMN owner_admin_id INTEGER",
+}
+
+# 旧数据回填：管理员账户归属其本身，用户账户归属其创建者
+BALANCE_LOG_OWNER_BACKFILL = """
+UPDATE balance_log SET owner_admin_id = CASE account_type
+    WHEN 'admin' THEN account_id
+    ELSE (SELECT created_by FROM m_user WHERE m_user.id = balance_log.account_id)
+END
+WHERE owner_admin_id IS NULL
+"""
+
 
 async def get_db():
     """获取数据库会话"""
@@ -44,12 +101,82 @@ async def get_db():
             await session.close()
 
 
-async def init_db():
-    """初始化数据库"""
+async def init_db(force: bool = False):
+    """初始化数据库
+
+    建表、补字段与搜索索引检查需要逐表读取结构，数据库结构指纹与当前代码一致时整体跳过；
+    `force=True` 时无论指纹是否一致都完整执行一遍（init_db.py 使用）。
+    """
+    # 注册全部模型，保证 create_all 与结构指纹覆盖所有表
+    importlib.import_module("app.models.models")
+
+    fingerprint = schema_fingerprint(engine.dialect)
+    if not force:
+        meta = await load_schema_meta()
+        if meta.get("fingerprint") == fingerprint:
+            set_search_index_enabled(meta.get("search_index") == "fts5")
+            return
+
     async with engine.begin() as conn:
+        if settings.SQLITE_WAL and conn.dialect.name == "sqlite":
+            await conn.execute(text("PRAGMA journal_mode=WAL"))
         await conn.run_sync(Base.metadata.create_all)
         await ensure_user_columns(conn)
         await ensure_container_record_columns(conn)
+        await ensure_container_create_job_columns(conn)
+        await ensure_balance_log_columns(conn)
+        search_index_enabled = await ensure_search_index(conn)
+        await save_schema_meta(
+            conn,
+            {
+                "fingerprint": fingerprint,
+                "search_index": "fts5" if search_index_enabled else "like",
+            },
+        )
+    logger.info("数据库结构检查完成 fingerprint=%s", fingerprint[:12])
+
+
+def schema_fingerprint(dialect) -> str:
+    """根据模型建表语句、补字段迁移与搜索索引定义计算数据库结构指纹"""
+    from sqlalchemy.schema import CreateIndex, CreateTable
+
+    parts = []
+    for _, table in sorted(Base.metadata.tables.items()):
+        parts.append(str(CreateTable(table).compile(dialect=dialect)))
+        for index in sorted(table.indexes, key=lambda item: item.name or ""):
+            parts.append(str(CreateIndex(index).compile(dialect=dialect)))
+    for columns in (
+        USER_OPTIONAL_COLUMNS,
+        CONTAINER_RECORD_OPTIONAL_COLUMNS,
+        CONTAINER_CREATE_JOB_OPTIONAL_COLUMNS,
+        BALANCE_LOG_OPTIONAL_COLUMNS,
+    ):
+        parts.extend(columns.values())
+    parts.append(BALANCE_LOG_OWNER_BACKFILL)
+    parts.extend(search_index_ddl())
+    parts.append(f"sqlite_wal={settings.SQLITE_WAL}")
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+async def load_schema_meta() -> dict:
+    """读取结构元信息，表不存在（新库或旧版数据库）时返回空字典"""
+    from app.models.models import SchemaMeta
+
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(select(SchemaMeta.key, SchemaMeta.value))
+            return {key: value for key, value in result.all()}
+    except OperationalError:
+        return {}
+
+
+async def save_schema_meta(conn, values: dict) -> None:
+    from app.models.models import SchemaMeta
+
+    await conn.execute(delete(SchemaMeta).where(SchemaMeta.key.in_(list(values))))
+    await conn.execute(
+        insert(SchemaMeta), [{"key": key, "value": value} for key, value in values.items()]
+    )
 
 
 async def ensure_user_columns(conn) -> None:
@@ -84,3 +211,46 @@ async def ensure_container_record_columns(conn) -> None:
     for column_name, sql in CONTAINER_RECORD_OPTIONAL_COLUMNS.items():
         if column_name not in existing_columns:
             await conn.execute(text(sql))
+
+
+async def ensure_container_create_job_columns(conn) -> None:
+    """为旧版数据库补齐 container_create_job 缺失字段"""
+    result = await conn.execute(
+        text(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='container_create_job'"
+        )
+    )
+    if not result.scalar_one_or_none():
+        return
+
+    result = await conn.execute(text("PRAGMA table_info(container_create_job)"))
+    existing_columns = {row[1] for row in result.fetchall()}
+
+    for column_name, sql in CONTAINER_CREATE_JOB_OPTIONAL_COLUMNS.items():
+        if column_name not in existing_columns:
+            await conn.execute(text(sql))
+
+
+async def ensure_balance_log_columns(conn) -> None:
+    """为旧版数据库补齐 balance_log 缺失字段，新增归属字段时回填并建索引"""
+    result = await conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type='table' AND name='balance_log'")
+    )
+    if not result.scalar_one_or_none():
+        return
+
+    result = await conn.execute(text("PRAGMA table_info(balance_log)"))
+    existing_columns = {row[1] for row in result.fetchall()}
+
+    for column_name, sql in BALANCE_LOG_OPTIONAL_COLUMNS.items():
+        if column_name not in existing_columns:
+            await conn.execute(text(sql))
+
+    if "owner_admin_id" not in existing_columns:
+        await conn.execute(text(BALANCE_LOG_OWNER_BACKFILL))
+        await conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_balance_log_owner_created "
+                "ON balance_log (owner_admin_id, created_at)"
+            )
+        )
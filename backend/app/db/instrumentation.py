@@ -0,0 +1,103 @@
+"""数据库指标采集
+
+- 连接池取连接等待耗时：对方言默认连接池做子类化，在 `_do_get` 前后计时
+- SQL 语句耗时：监听 before/after_cursor_execute 事件，按语句类型（SELECT/INSERT/...）聚合，
+  同时累加到当前请求的查询统计（见 app.core.query_stats），
+  并在开启链路追踪时为每条语句创建子 span（见 app.core.tracing）
+"""
+
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+from app.core import metrics
+from app.core.query_stats import record_statement
+from app.core.tracing import SPAN_KIND_CLIENT, tracer
+
+# span 中记录的 SQL 最大长度
+MAX_TRACED_STATEMENT_LENGTH = 2000
+
+_pool_classes = {}
+
+
+def timed_pool_class(database_url: str):
+    """返回带取连接计时的连接池类（基于该数据库方言的默认连接池）"""
+    url = make_url(database_url)
+    base_class = url.get_dialect().get_pool_class(url)
+
+    pool_class = _pool_classes.get(base_class)
+    if pool_class is None:
+
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return base_class._do_get(self)
+            finally:
+                metrics.db_pool_checkout_wait_seconds.observe(
+                    time.perf_counter() - started
+                )
+
+        pool_class = type(f"Timed{base_class.__name__}", (base_class,), {"_do_get": _do_get})
+        _pool_classes[base_class] = pool_class
+    return pool_class
+
+
+def statement_operation(statement: str) -> str:
+    """提取语句类型，用作低基数的指标标签"""
+    head = statement.lstrip().split(None, 1)
+    if not head:
+        return "OTHER"
+    operation = head[0].upper()
+    if operation in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+        return operation
+    if operation in ("CREATE", "ALTER", "DROP", "PRAGMA"):
+        return "DDL"
+    return "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = tracer.begin_span(
+        f"db {statement_operation(statement)}",
+        SPAN_KIND_CLIENT,
+        **{
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:MAX_TRACED_STATEMENT_LENGTH],
+            "db.executemany": executemany,
+        },
+    )
+    conn.info.setdefault("query_start_time", []).append((time.perf_counter(), span))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started, span = conn.info["query_start_time"].pop()
+    duration = time.perf_counter() - started
+    metrics.db_statement_duration_seconds.observe(
+        duration,
+        operation=statement_operation(statement),
+    )
+    record_statement(statement, duration)
+    if span is not None:
+        span.end()
+
+
+def _handle_error(exception_context):
+    statement = exception_context.statement or ""
+    connection = exception_context.connection
+    if connection is not None:
+        start_times = connection.info.get("query_start_time")
+        if start_times:
+            _, span = start_times.pop()
+            if span is not None:
+                span.set_error(str(exception_context.original_exception))
+                span.end()
+    metrics.db_statement_errors_total.inc(operation=statement_operation(statement))
+
+
+def instrument_engine(engine: Engine) -> None:
+    """为同步引擎注册语句计时事件（异步引擎传入 engine.sync_engine）"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -0,0 +1,122 @@
+"""关键字搜索索引（SQLite FTS5 trigram）
+
+用户（公司名、手机号）、管理员/代理（账号、公司名、联系人、手机号）与登录日志（手机号）
+各建一张外部内容 FTS5 表，由触发器随原表的新增、修改、删除同步，
+管理端按关键字搜索时走索引而不是 `LIKE '%x%'` 全表扫描。
+
+- trigram 分词支持任意子串匹配（不区分大小写），与原 LIKE 语义一致
+- 关键字不足 3 个字符时 trigram 无法匹配，回退到 LIKE
+- 非 SQLite 数据库或 SQLite 未编译 FTS5 时全部回退到 LIKE
+- 索引表首次创建时自动从原表回填
+"""
+
+import logging
+from typing import Dict, Sequence, Tuple
+
+from sqlalchemy import or_, select, text
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+# 原表 -> (索引表, 索引字段)
+SEARCH_INDEXES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "m_user": ("m_user_fts", ("company_name", "phone")),
+    "m_admin": ("m_admin_fts", ("username", "company_name", "contact_name", "phone")),
+    "user_login_log": ("user_login_log_fts", ("phone",)),
+}
+
+# trigram 分词可匹配的最短关键字
+MIN_MATCH_LENGTH = 3
+
+_enabled = False
+
+
+def set_search_index_enabled(enabled: bool) -> None:
+    """结构指纹未变化、跳过建索引时直接恢复上次检查的结果"""
+    global _enabled
+    _enabled = enabled
+
+
+def search_index_ddl() -> list:
+    """全部索引表定义与触发器语句（参与数据库结构指纹计算）"""
+    statements = []
+    for table, (fts_table, columns) in SEARCH_INDEXES.items():
+        statements.append(f"{fts_table}({', '.join(columns)}) trigram")
+        statements.extend(_trigger_sql(table, fts_table, columns))
+    return statements
+
+
+async def ensure_search_index(conn) -> bool:
+    """创建缺失的索引表与同步触发器，返回索引是否可用"""
+    global _enabled
+
+    if conn.dialect.name != "sqlite":
+        return False
+
+    try:
+        for table, (fts_table, columns) in SEARCH_INDEXES.items():
+            result = await conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type='table' AND name=:name"),
+                {"name": fts_table},
+            )
+            created = result.scalar_one_or_none() is None
+            if created:
+                await conn.execute(
+                    text(
+                        f"CREATE VIRTUAL TABLE {fts_table} USING fts5("
+                        f"{', '.join(columns)}, content='{table}', content_rowid='id', "
+                        f"tokenize='trigram')"
+                    )
+                )
+            for sql in _trigger_sql(table, fts_table, columns):
+                await conn.execute(text(sql))
+            if created:
+                await conn.execute(
+                    text(f"INSERT INTO {fts_table}({fts_table}) VALUES('rebuild')")
+                )
+                logger.info("已创建搜索索引 %s", fts_table)
+    except OperationalError as e:
+        logger.warning("SQLite 不支持 FTS5 trigram 分词，关键字搜索回退到 LIKE: %s", e)
+        return False
+
+    _enabled = True
+    return True
+
+
+def _trigger_sql(table: str, fts_table: str, columns: Sequence[str]) -> list:
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    delete_old = (
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {column_list}) "
+        f"VALUES('delete', old.id, {old_values});"
+    )
+    insert_new = (
+        f"INSERT INTO {fts_table}(rowid, {column_list}) VALUES(new.id, {new_values});"
+    )
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table} "
+        f"BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table} "
+        f"BEGIN {delete_old} END",
+        # 只在索引字段变化时更新，余额等高频更新不触发
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {column_list} "
+        f"ON {table} BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def keyword_filter(model, keyword: str):
+    """按关键字子串匹配任一索引字段的查询条件"""
+    fts_table, columns = SEARCH_INDEXES[model.__tablename__]
+
+    if not _enabled or len(keyword) < MIN_MATCH_LENGTH:
+        return or_(*(getattr(model, column).contains(keyword) for column in columns))
+
+    param = f"{fts_table}_keyword"
+    phrase = '"' + keyword.replace('"', '""') + '"'
+    matched_ids = (
+        select(text("rowid"))
+        .select_from(text(fts_table))
+        .where(text(f"{fts_table} MATCH :{param}").bindparams(**{param: phrase}))
+    )
+    return model.id.in_(matched_ids)
@@ -1,14 +1,21 @@
+import asyncio
+import hmac
 import traceback
-import uuid
 from datetime import datetime
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 import logging
 
+from app.core import metrics
 from app.core.config import get_settings
+from app.core.logging_config import setup_logging, shutdown_logging
+from app.core.middleware import RequestContextMiddleware
 from app.db.database import init_db
+from app.services.container_jobs import container_create_worker
+from app.services.ucloud_service import ucloud_service
 from app.tasks.scheduler import start_scheduler, shutdown_scheduler
 from app.api import (
     auth,
@@ -20,6 +27,8 @@ from app.api import (
     admin_dashboard,
     admin_log,
     admin_balance_log,
+    admin_scheduler,
+    admin_archive,
 )
 
 logger = logging.getLogger(__name__)
@@ -31,11 +40,28 @@ settings = get_settings()
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时初始化
+    setup_logging()
     await init_db()
-    start_scheduler()
+    await container_create_worker.start()
+    # 多 worker 部署时定时任务由独立进程（run_scheduler.py）运行
+    if settings.SCHEDULER_ENABLED:
+        start_scheduler()
+    # 多进程部署时定期写入本进程指标，供 /metrics 汇总
+    snapshot_task = None
+    if settings.METRICS_ENABLED and settings.METRICS_MULTIPROCESS_DIR:
+        snapshot_task = asyncio.create_task(
+            metrics.write_snapshots_periodically(
+                settings.METRICS_MULTIPROCESS_DIR, settings.METRICS_SNAPSHOT_INTERVAL_SECONDS
+            )
+        )
     yield
     # 关闭时清理
+    if snapshot_task is not None:
+        snapshot_task.cancel()
+        await asyncio.gather(snapshot_task, return_exceptions=True)
     shutdown_scheduler()
+    await container_create_worker.stop()
+    shutdown_logging()
 
 
 app = FastAPI(
@@ -54,6 +80,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 请求上下文：请求ID、耗时与指标、SQL 统计、链路追踪、按需采样与访问日志
+app.add_middleware(RequestContextMiddleware)
+
 # 注册路由
 app.include_router(auth.router, prefix="/api")
 app.include_router(container.router, prefix="/api")
@@ -64,6 +93,8 @@ app.include_router(admin_config.router, prefix="/api")
 app.include_router(admin_dashboard.router, prefix="/api")
 app.include_router(admin_log.router, prefix="/api")
 app.include_router(admin_balance_log.router, prefix="/api")
+app.include_router(admin_scheduler.router, prefix="/api")
+app.include_router(admin_archive.router, prefix="/api")
 
 
 @app.get("/")
@@ -73,24 +104,44 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ok"}
-
-
-# ==================== 全局异常处理器 ====================
-
+    # 公开接口只返回熔断器状态，错误详情见 /api/admin/config/ucloud
+    return {"status": "ok", "ucloud": {"breaker": {"state": ucloud_service.guard.breaker.state}}}
+
+
+if settings.METRICS_ENABLED:
+    metrics_security = HTTPBearer(auto_error=False)
+
+    def verify_metrics_token(
+        credentials: HTTPAuthorizationCredentials = Depends(metrics_security),
+    ):
+        """配置 METRICS_TOKEN 时校验抓取方携带的 Bearer Token"""
+        if not settings.METRICS_TOKEN:
+            return
+        if credentials is None or not hmac.compare_digest(
+            credentials.credentials, settings.METRICS_TOKEN
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="无效的Token"
+            )
+
+    @app.get(
+        "/metrics",
+        include_in_schema=False,
+        dependencies=[Depends(verify_metrics_token)],
+    )
+    async def metrics_endpoint():
+        """运行指标（Prometheus 文本格式）
 
-@app.middleware("http")
-async def add_request_context(request: Request, call_next):
-    """添加请求上下文信息"""
-    request_id = str(uuid.uuid4())[:8]
-    request.state.request_id = request_id
-    request.state.timestamp = datetime.now().isoformat()
+        配置 METRICS_MULTIPROCESS_DIR 时汇总所有 API worker 与定时任务进程的指标。
+        """
+        if settings.METRICS_MULTIPROCESS_DIR:
+            content = metrics.render_multiprocess(settings.METRICS_MULTIPROCESS_DIR)
+        else:
+            content = metrics.registry.render()
+        return PlainTextResponse(content, media_type=metrics.CONTENT_TYPE_LATEST)
 
-    response = await call_next(request)
 
-    # 添加请求ID到响应头
-    response.headers["X-Request-ID"] = request_id
-    return response
+# ==================== 全局异常处理器 ====================
 
 
 @app.exception_handler(HTTPException)
@@ -108,9 +159,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         "path": str(request.url),
     }
 
-    logger.error(
-        f"HTTP异常 [{request_id}] {exc.status_code}: {exc.detail} - {request.url}"
-    )
+    logger.error("HTTP异常 %s: %s - %s", exc.status_code, exc.detail, request.url)
 
     return JSONResponse(status_code=exc.status_code, content=error_response)
 
@@ -137,30 +186,7 @@ async def general_exception_handler(request: Request, exc: Exception):
     }
 
     logger.error(
-        f"未处理异常 [{request_id}] {exc.__class__.__name__}: {str(exc)}\n{error_traceback}"
+        "未处理异常 %s: %s", exc.__class__.__name__, exc, exc_info=exc
     )
 
     return JSONResponse(status_code=500, content=error_response)
-
-
-# 请求日志中间件
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """记录请求日志"""
-    start_time = datetime.now()
-    request_id = getattr(request.state, "request_id", "unknown")
-
-    logger.info(f"→ 请求 [{request_id}] {request.method} {request.url}")
-
-    try:
-        response = await call_next(request)
-        duration = (datetime.now() - start_time).total_seconds()
-
-        logger.info(f"← 响应 [{request_id}] {response.status_code} - {duration:.3f}s")
-        return response
-    except Exception as e:
-        duration = (datetime.now() - start_time).total_seconds()
-        logger.error(
-            f"✕ 异常 [{request_id}] {e.__class__.__name__}: {str(e)} - {duration:.3f}s"
-        )
-        raise
@@ -2,9 +2,11 @@ from sqlalchemy import (
     Column,
     Integer,
     String,
+    Date,
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Text,
 )
 from sqlalchemy.sql import func
@@ -108,6 +110,12 @@ class ContainerRecord(Base):
     connection_port = Column(Integer, default=3389, comment="连接端口")
     connection_username = Column(String(50), nullable=True, comment="连接用户名")
     connection_password = Column(String(100), nullable=True, comment="连接密码")
+    delete_requested_at = Column(DateTime(timezone=True), nullable=True, comment="提交删除时间")
+    delete_attempts = Column(Integer, default=0, server_default="0", comment="云端删除失败次数")
+    next_delete_attempt_at = Column(
+        DateTime(timezone=True), nullable=True, comment="下次重试删除时间"
+    )
+    last_delete_error = Column(String(500), nullable=True, comment="最近一次删除失败原因")
 
 
 class SystemConfig(Base):
@@ -143,6 +151,98 @@ class BillingChargeRecord(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
+class BillingSummary(Base):
+    """扣费汇总表（按用户/代理增量维护）"""
+
+    __tablename__ = "billing_summary"
+
+    account_type = Column(String(20), primary_key=True, comment="账户类型：user/admin")
+    account_id = Column(Integer, primary_key=True, comment="账户ID")
+    summary_date = Column(Date, nullable=False, comment="今日统计对应日期(UTC)")
+    today_cost = Column(Float, default=0.0, nullable=False, comment="今日消费金额")
+    today_minutes = Column(Integer, default=0, nullable=False, comment="今日计费分钟数")
+    summary_month = Column(String(7), nullable=False, comment="本月统计对应月份 YYYY-MM")
+    month_cost = Column(Float, default=0.0, nullable=False, comment="本月消费金额")
+    month_minutes = Column(Integer, default=0, nullable=False, comment="本月计费分钟数")
+    total_cost = Column(Float, default=0.0, nullable=False, comment="累计消费金额")
+    total_minutes = Column(Integer, default=0, nullable=False, comment="累计计费分钟数")
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class ContainerCreateJob(Base):
+    """云电脑创建任务表"""
+
+    __tablename__ = "container_create_job"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    user_id = Column(
+        Integer, ForeignKey("m_user.id"), nullable=False, index=True, comment="用户ID"
+    )
+    status = Column(
+        String(20),
+        nullable=False,
+        default="queued",
+        comment="状态: queued/running/succeeded/failed",
+    )
+    step = Column(String(50), nullable=True, comment="当前进度")
+    instance_name = Column(String(100), nullable=False, comment="实例名称")
+    config_code = Column(String(50), nullable=False, comment="套餐编码")
+    replace_existing = Column(
+        Integer, default=0, server_default="0", comment="是否先删除旧实例：0否 1是"
+    )
+    container_id = Column(
+        Integer, ForeignKey("container_record.id"), nullable=True, comment="创建成功的容器ID"
+    )
+    error_message = Column(Text, nullable=True, comment="失败原因")
+    ip_address = Column(String(50), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True, comment="开始执行时间")
+    finished_at = Column(DateTime(timezone=True), nullable=True, comment="完成时间")
+    worker_id = Column(String(100), nullable=True, comment="执行任务的进程（主机名:PID）")
+
+
+class WarmPoolInstance(Base):
+    """预创建实例池表"""
+
+    __tablename__ = "warm_pool_instance"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    config_code = Column(String(50), nullable=False, index=True, comment="套餐编码")
+    comp_share_image_id = Column(String(100), nullable=False, comment="创建时使用的镜像ID")
+    ucloud_instance_id = Column(String(100), nullable=False, comment="UCloud实例ID")
+    status = Column(
+        String(20),
+        nullable=False,
+        default="provisioning",
+        comment="状态: provisioning/ready/claimed/retiring",
+    )
+    connection_host = Column(String(100), nullable=True, comment="连接地址")
+    connection_password = Column(String(100), nullable=True, comment="连接密码")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    ready_at = Column(DateTime(timezone=True), nullable=True, comment="进入可用状态时间")
+    claimed_at = Column(DateTime(timezone=True), nullable=True, comment="被领取时间")
+
+
+class IdempotencyRecord(Base):
+    """幂等键记录表（容器操作接口的首次成功响应）"""
+
+    __tablename__ = "idempotency_record"
+
+    user_id = Column(Integer, primary_key=True, comment="用户ID")
+    idempotency_key = Column(String(128), primary_key=True, comment="客户端提供的幂等键")
+    endpoint = Column(String(50), nullable=False, comment="接口标识")
+    request_hash = Column(String(64), nullable=False, comment="请求体摘要")
+    status = Column(
+        String(20), nullable=False, default="processing", comment="状态: processing/completed"
+    )
+    status_code = Column(Integer, nullable=True, comment="响应状态码")
+    response_body = Column(Text, nullable=True, comment="响应内容(JSON)")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True, comment="过期时间")
+
+
 class ContainerLog(Base):
     """容器操作日志表"""
 
@@ -236,3 +336,23 @@ class BalanceLog(Base):
         Integer, ForeignKey("m_admin.id"), nullable=True, comment="操作人ID"
     )
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    owner_admin_id = Column(
+        Integer, nullable=True, comment="归属代理ID：管理员账户为其本身，用户账户为其创建者"
+    )
+
+    # 代理查看余额日志按归属代理过滤并按时间倒序分页
+    __table_args__ = (
+        Index("ix_balance_log_owner_created", "owner_admin_id", "created_at"),
+    )
+
+
+class SchemaMeta(Base):
+    """数据库结构元信息表（结构指纹等，启动时据此跳过结构检查）"""
+
+    __tablename__ = "schema_meta"
+
+    key = Column(String(50), primary_key=True, comment="键")
+    value = Column(Text, nullable=False, comment="值")
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
@@ -99,6 +99,17 @@ class UserBalanceChange(BaseModel):
     description: Optional[str] = None
 
 
+class UserBalanceBulkItem(BaseModel):
+    user_id: int
+    amount: float = Field(gt=0)
+
+
+class UserBalanceBulkChange(BaseModel):
+    type: Literal["recharge", "deduct"]
+    items: List[UserBalanceBulkItem] = Field(min_length=1)
+    description: Optional[str] = None
+
+
 class AdminInfo(BaseModel):
     id: int
     username: str
@@ -230,6 +241,12 @@ class SystemConfigInfo(BaseModel):
     config_options: List[ConfigOptionInfo]
 
 
+class ProfilingWindowCreate(BaseModel):
+    duration_seconds: int = Field(gt=0, le=3600)
+    path_prefix: Optional[str] = None
+    include_billing: bool = False
+
+
 # ==================== 扣费记录相关 ====================
 class BillingChargeInfo(BaseModel):
     id: int
@@ -0,0 +1,507 @@
+"""历史日志与扣费记录归档
+
+container_log、user_login_log、admin_operation_log、balance_log、billing_charge_record
+超过保留天数（ARCHIVE_RETENTION_DAYS，可按表覆盖）的记录按天导出为 gzip 压缩的 NDJSON 文件：
+
+    {ARCHIVE_DIR}/{表名}/{YYYY}/{MM}/{表名}-{YYYY-MM-DD}.{序号}.ndjson.gz
+    {ARCHIVE_DIR}/{表名}/{YYYY}/{MM}/{表名}-{YYYY-MM-DD}.{序号}.manifest.json
+
+每个分区文件写完后重新读取并与数据库中同一批记录的汇总（行数、ID 之和、金额列之和）比对，
+一致后才写入清单文件并按 ARCHIVE_DELETE_CHUNK_SIZE 分批删除，每批单独提交，不长时间占用写锁。
+删除扣费记录前先为涉及的用户与代理建立扣费汇总行，归档后的统计不会丢失这部分金额。
+归档中断（已写文件但未删除）时，下次运行按清单核对后继续删除，不会重复导出。
+
+iter_rows 按日期范围流式读取归档文件，供管理端导出与运维脚本查询历史数据。
+"""
+
+import asyncio
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.db.database import AsyncSessionLocal
+from app.models.models import (
+    AdminOperationLog,
+    BalanceLog,
+    BillingChargeRecord,
+    ContainerLog,
+    User,
+    UserLoginLog,
+)
+from app.services.crud_service import billing_summary_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 每批读取/写入的行数
+ARCHIVE_BATCH_SIZE = 1000
+
+_PART_PATTERN = re.compile(r"^(?P<table>[a-z_]+)-(?P<day>\d{4}-\d{2}-\d{2})\.(?P<seq>\d{3})\.ndjson\.gz$")
+
+
+class ArchiveError(Exception):
+    """归档文件与数据库核对不一致等需要人工处理的错误"""
+
+
+@dataclass(frozen=True)
+class ArchiveTable:
+    model: type
+    time_column: str
+    # 参与核对的金额/数量列
+    sum_columns: Tuple[str, ...] = ()
+
+    @property
+    def name(self) -> str:
+        return self.model.__tablename__
+
+    @property
+    def columns(self) -> List[str]:
+        return [column.name for column in self.model.__table__.columns]
+
+    @property
+    def id_column(self):
+        return self.model.__table__.c.id
+
+    @property
+    def ts_column(self):
+        return self.model.__table__.c[self.time_column]
+
+
+ARCHIVE_TABLES: Dict[str, ArchiveTable] = {
+    spec.name: spec
+    for spec in (
+        ArchiveTable(ContainerLog, "created_at", ("cost", "duration_minutes")),
+        ArchiveTable(UserLoginLog, "created_at"),
+        ArchiveTable(AdminOperationLog, "created_at"),
+        ArchiveTable(BalanceLog, "created_at", ("amount",)),
+        ArchiveTable(BillingChargeRecord, "charge_minute", ("amount",)),
+    )
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _empty_rollup(spec: ArchiveTable) -> dict:
+    return {"rows": 0, "id_sum": 0, "sums": {column: 0.0 for column in spec.sum_columns}}
+
+
+def _add_to_rollup(rollup: dict, spec: ArchiveTable, row: dict) -> None:
+    rollup["rows"] += 1
+    rollup["id_sum"] += row["id"]
+    for column in spec.sum_columns:
+        rollup["sums"][column] += row.get(column) or 0
+
+
+def _normalize_rollup(rollup: dict) -> dict:
+    return {
+        "rows": int(rollup["rows"]),
+        "id_sum": int(rollup["id_sum"] or 0),
+        "sums": {column: round(float(value or 0), 6) for column, value in rollup["sums"].items()},
+    }
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_file_rollup(path: str, spec: ArchiveTable) -> dict:
+    rollup = _empty_rollup(spec)
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            _add_to_rollup(rollup, spec, json.loads(line))
+    return _normalize_rollup(rollup)
+
+
+def _iter_file_batches(path: str, batch_size: int) -> Iterator[List[dict]]:
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        batch = []
+        for line in file:
+            batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def _write_json_atomic(path: str, data: dict) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=2)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+class _PartWriter:
+    """在线程中写入分区文件（写入临时文件，完成后改名）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = gzip.open(self.tmp_path, "wt", encoding="utf-8", compresslevel=6)
+
+    def write(self, text: str) -> None:
+        self._file.write(text)
+
+    def commit(self) -> None:
+        self._file.close()
+        with open(self.tmp_path, "rb") as file:
+            os.fsync(file.fileno())
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self) -> None:
+        self._file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class ArchiveService:
+    """归档与历史数据读取"""
+
+    @property
+    def root(self) -> str:
+        return settings.ARCHIVE_DIR
+
+    @staticmethod
+    def get_table(table: str) -> ArchiveTable:
+        spec = ARCHIVE_TABLES.get(table)
+        if spec is None:
+            raise ValueError(f"不支持归档的表: {table}，可选 {', '.join(ARCHIVE_TABLES)}")
+        return spec
+
+    @staticmethod
+    def retention_days(table: str) -> int:
+        return settings.ARCHIVE_RETENTION_DAYS_BY_TABLE.get(
+            table, settings.ARCHIVE_RETENTION_DAYS
+        )
+
+    # ==================== 文件布局 ====================
+
+    def _day_dir(self, table: str, day: date) -> str:
+        return os.path.join(self.root, table, f"{day:%Y}", f"{day:%m}")
+
+    def _part_path(self, table: str, day: date, seq: int) -> str:
+        return os.path.join(self._day_dir(table, day), f"{table}-{day.isoformat()}.{seq:03d}.ndjson.gz")
+
+    @staticmethod
+    def _manifest_path(part_path: str) -> str:
+        return part_path[: -len(".ndjson.gz")] + ".manifest.json"
+
+    def _day_parts(self, table: str, day: date) -> List[Tuple[str, Optional[dict]]]:
+        """某天已有的分区文件及其清单（清单缺失表示写入后未完成核对）"""
+        pattern = os.path.join(self._day_dir(table, day), f"{table}-{day.isoformat()}.*.ndjson.gz")
+        parts = []
+        for path in sorted(glob.glob(pattern)):
+            manifest_path = self._manifest_path(path)
+            manifest = None
+            if os.path.exists(manifest_path):
+                with open(manifest_path, encoding="utf-8") as file:
+                    manifest = json.load(file)
+            parts.append((path, manifest))
+        return parts
+
+    def list_partitions(
+        self,
+        table: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> List[dict]:
+        """列出已完成的分区清单（按表、日期排序）"""
+        tables = [self.get_table(table).name] if table else list(ARCHIVE_TABLES)
+        manifests = []
+        for name in tables:
+            pattern = os.path.join(self.root, name, "*", "*", f"{name}-*.manifest.json")
+            for path in sorted(glob.glob(pattern)):
+                with open(path, encoding="utf-8") as file:
+                    manifest = json.load(file)
+                day = date.fromisoformat(manifest["day"])
+                if (start and day < start) or (end and day > end):
+                    continue
+                manifest["path"] = path[: -len(".manifest.json")] + ".ndjson.gz"
+                manifests.append(manifest)
+        return manifests
+
+    # ==================== 归档 ====================
+
+    async def archive(
+        self,
+        tables: Optional[List[str]] = None,
+        older_than_days: Optional[int] = None,
+        dry_run: bool = False,
+        now: Optional[datetime] = None,
+    ) -> List[dict]:
+        """归档各表中早于保留天数的整天记录，返回每个分区的处理结果"""
+        now = now or datetime.utcnow()
+        results = []
+        for name in tables or list(ARCHIVE_TABLES):
+            spec = self.get_table(name)
+            days = older_than_days if older_than_days is not None else self.retention_days(name)
+            cutoff = datetime.combine((now - timedelta(days=days)).date(), datetime.min.time())
+            async with AsyncSessionLocal() as db:
+                for day in await self._pending_days(db, spec, cutoff):
+                    results.append(await self._archive_day(db, spec, day, dry_run))
+        return results
+
+    @staticmethod
+    async def _pending_days(db: AsyncSession, spec: ArchiveTable, cutoff: datetime) -> List[date]:
+        result = await db.execute(
+            select(func.date(spec.ts_column))
+            .where(spec.ts_column < cutoff)
+            .group_by(func.date(spec.ts_column))
+            .order_by(func.date(spec.ts_column))
+        )
+        return [date.fromisoformat(str(value)) for (value,) in result.all() if value]
+
+    @staticmethod
+    def _day_filter(spec: ArchiveTable, day: date):
+        """某天的记录：以 date() 判定与分组保持一致，时间范围条件便于使用索引
+
+        默认值写入的时间没有微秒部分，与带微秒的边界按字符串比较时整点会落到前一天，
+        因此范围向前放宽一秒。
+        """
+        start = datetime.combine(day, datetime.min.time())
+        return and_(
+            spec.ts_column >= start - timedelta(seconds=1),
+            spec.ts_column < start + timedelta(days=1),
+            func.date(spec.ts_column) == day.isoformat(),
+        )
+
+    @staticmethod
+    async def _db_rollup(db: AsyncSession, spec: ArchiveTable, condition) -> dict:
+        table = spec.model.__table__
+        result = await db.execute(
+            select(
+                func.count(),
+                func.sum(spec.id_column),
+                *(func.sum(table.c[column]) for column in spec.sum_columns),
+            ).where(condition)
+        )
+        row = result.one()
+        return _normalize_rollup(
+            {
+                "rows": row[0],
+                "id_sum": row[1],
+                "sums": dict(zip(spec.sum_columns, row[2:])),
+            }
+        )
+
+    async def _archive_day(self, db: AsyncSession, spec: ArchiveTable, day: date, dry_run: bool) -> dict:
+        day_filter = self._day_filter(spec, day)
+        outcome = {"table": spec.name, "day": day.isoformat(), "archived": 0, "deleted": 0, "resumed": 0}
+
+        last_id = 0
+        seq = 0
+        for path, manifest in self._day_parts(spec.name, day):
+            seq = max(seq, int(_PART_PATTERN.match(os.path.basename(path)).group("seq")))
+            if manifest is None:
+                # 写入后未完成核对的文件，重新导出
+                if not dry_run:
+                    os.remove(path)
+                continue
+            last_id = max(last_id, manifest["max_id"])
+            part_filter = and_(
+                day_filter, spec.id_column.between(manifest["min_id"], manifest["max_id"])
+            )
+            remaining = await self._db_rollup(db, spec, part_filter)
+            if remaining["rows"] == 0:
+                continue
+            if remaining != manifest["rollup"]:
+                raise ArchiveError(
+                    f"{spec.name} {day} 分区 {os.path.basename(path)} 与数据库剩余记录不一致，"
+                    f"清单 {manifest['rollup']}，数据库 {remaining}"
+                )
+            # 上次归档在删除阶段中断，继续删除
+            outcome["resumed"] += remaining["rows"]
+            if not dry_run:
+                outcome["deleted"] += await self._delete_rows(
+                    db, spec, day_filter, manifest["min_id"], manifest["max_id"]
+                )
+
+        new_filter = and_(day_filter, spec.id_column > last_id)
+        if dry_run:
+            outcome["archived"] = (await self._db_rollup(db, spec, new_filter))["rows"]
+            return outcome
+
+        part = await self._write_part(db, spec, day, seq + 1, new_filter)
+        if part is not None:
+            outcome["archived"] = part["rollup"]["rows"]
+            outcome["deleted"] += await self._delete_rows(
+                db, spec, day_filter, part["min_id"], part["max_id"]
+            )
+            metrics.archive_rows_total.inc(part["rollup"]["rows"], table=spec.name)
+            logger.info(
+                "已归档 %s %s 共 %s 行 -> %s",
+                spec.name,
+                day,
+                part["rollup"]["rows"],
+                part["file"],
+            )
+        return outcome
+
+    async def _write_part(
+        self, db: AsyncSession, spec: ArchiveTable, day: date, seq: int, condition
+    ) -> Optional[dict]:
+        """导出一个分区文件并核对，通过后写入清单；没有记录时返回 None"""
+        path = self._part_path(spec.name, day, seq)
+        writer = await asyncio.to_thread(_PartWriter, path)
+        rollup = _empty_rollup(spec)
+        min_id = max_id = None
+        try:
+            result = await db.stream(
+                select(*spec.model.__table__.columns)
+                .where(condition)
+                .order_by(spec.id_column)
+                .execution_options(yield_per=ARCHIVE_BATCH_SIZE)
+            )
+            async for partition in result.mappings().partitions():
+                lines = []
+                for row in partition:
+                    row = dict(row)
+                    _add_to_rollup(rollup, spec, row)
+                    min_id = row["id"] if min_id is None else min_id
+                    max_id = row["id"]
+                    lines.append(json.dumps(row, ensure_ascii=False, default=_json_default))
+                await asyncio.to_thread(writer.write, "\n".join(lines) + "\n")
+            if min_id is None:
+                await asyncio.to_thread(writer.discard)
+                return None
+            await asyncio.to_thread(writer.commit)
+        except BaseException:
+            await asyncio.to_thread(writer.discard)
+            raise
+
+        # 重新读取文件，与数据库中同一批记录核对
+        file_rollup = await asyncio.to_thread(_read_file_rollup, path, spec)
+        db_rollup = await self._db_rollup(
+            db, spec, and_(condition, spec.id_column.between(min_id, max_id))
+        )
+        if file_rollup != db_rollup or file_rollup != _normalize_rollup(rollup):
+            os.remove(path)
+            raise ArchiveError(
+                f"{spec.name} {day} 归档文件核对失败，文件 {file_rollup}，数据库 {db_rollup}"
+            )
+
+        manifest = {
+            "table": spec.name,
+            "day": day.isoformat(),
+            "seq": seq,
+            "file": os.path.basename(path),
+            "columns": spec.columns,
+            "time_column": spec.time_column,
+            "min_id": min_id,
+            "max_id": max_id,
+            "rollup": file_rollup,
+            "sha256": await asyncio.to_thread(_sha256, path),
+            "size_bytes": os.path.getsize(path),
+            "archived_at": datetime.utcnow().isoformat(),
+        }
+        await asyncio.to_thread(_write_json_atomic, self._manifest_path(path), manifest)
+        return manifest
+
+    @staticmethod
+    async def _ensure_billing_summaries(db: AsyncSession, condition) -> None:
+        """删除扣费记录前为涉及的用户与代理建立扣费汇总
+
+        汇总行缺失时会从扣费记录回填，记录删除后将无法再回填出已归档的部分。
+        """
+        result = await db.execute(
+            select(BillingChargeRecord.user_id, User.admin_id)
+            .outerjoin(User, BillingChargeRecord.user_id == User.id)
+            .where(condition)
+            .distinct()
+        )
+        accounts = set()
+        for user_id, admin_id in result.all():
+            accounts.add(("user", user_id))
+            if admin_id is not None:
+                accounts.add(("admin", admin_id))
+        for account_type, account_id in sorted(accounts):
+            await billing_summary_service.get_or_create(db, account_type, account_id)
+        await db.commit()
+
+    @classmethod
+    async def _delete_rows(
+        cls, db: AsyncSession, spec: ArchiveTable, day_filter, min_id: int, max_id: int
+    ) -> int:
+        """按批删除已归档记录，每批单独提交"""
+        deleted = 0
+        condition = and_(day_filter, spec.id_column.between(min_id, max_id))
+        if spec.model is BillingChargeRecord:
+            await cls._ensure_billing_summaries(db, condition)
+        while True:
+            ids = select(spec.id_column).where(condition).limit(settings.ARCHIVE_DELETE_CHUNK_SIZE)
+            result = await db.execute(
+                delete(spec.model)
+                .where(spec.id_column.in_(ids.scalar_subquery()))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            if not result.rowcount:
+                return deleted
+            deleted += result.rowcount
+            # 让出事件循环，避免长时间占用
+            await asyncio.sleep(0)
+
+    # ==================== 校验与读取 ====================
+
+    async def verify(self, table: Optional[str] = None) -> List[dict]:
+        """核对归档文件的摘要与汇总是否与清单一致"""
+        problems = []
+        for manifest in self.list_partitions(table):
+            path = manifest["path"]
+            spec = self.get_table(manifest["table"])
+            if not os.path.exists(path):
+                problems.append({"file": path, "error": "文件不存在"})
+                continue
+            if await asyncio.to_thread(_sha256, path) != manifest["sha256"]:
+                problems.append({"file": path, "error": "sha256 不一致"})
+                continue
+            rollup = await asyncio.to_thread(_read_file_rollup, path, spec)
+            if rollup != manifest["rollup"]:
+                problems.append({"file": path, "error": f"汇总不一致: {rollup}"})
+        return problems
+
+    async def iter_rows(
+        self,
+        table: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        batch_size: int = ARCHIVE_BATCH_SIZE,
+    ) -> AsyncIterator[List[dict]]:
+        """按日期范围（含首尾）流式读取归档记录，每次返回一批"""
+        for manifest in self.list_partitions(table, start, end):
+            batches = _iter_file_batches(manifest["path"], batch_size)
+            try:
+                while True:
+                    batch = await asyncio.to_thread(next, batches, None)
+                    if batch is None:
+                        break
+                    yield batch
+            finally:
+                batches.close()
+
+
+# 全局归档服务
+archive_service = ArchiveService()
@@ -0,0 +1,288 @@
+"""云电脑创建任务执行器
+
+创建接口只做校验、加用户级操作锁并写入任务记录，随即返回 202；
+云端创建（可能耗时数十秒）由本进程内固定数量的后台 worker 执行，
+并发数即 CONTAINER_CREATE_WORKERS，不再占用请求与数据库会话。
+
+任务进度写入 container_create_job 表，客户端轮询 `/container/jobs/{id}`，
+可携带 wait 参数长轮询：任务进度变化时立即返回。
+服务重启时，排队中的任务重新入队；执行中断的任务无法确认云端结果，记为失败并释放锁。
+多 worker 进程部署时，任务通过条件更新领取，同一任务只会被一个进程执行；
+恢复时只处理执行进程已退出（或超时）的任务，不影响其他进程中正在执行的任务。
+启用预创建实例池（WARM_POOL_ENABLED）时优先从池中领取实例，只需改名并启动。
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.db.database import AsyncSessionLocal
+from app.models.models import ContainerCreateJob, ContainerLog, User
+from app.services.crud_service import (
+    config_service,
+    container_job_service,
+    container_service,
+    user_service,
+)
+from app.services.session_meter import session_meter
+from app.services.ucloud_service import ucloud_service
+from app.services.warm_pool import warm_pool_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 执行中的任务超过该时长视为中断（与用户级容器操作锁的超时一致）
+RUNNING_JOB_TIMEOUT_MINUTES = 10
+
+
+class ContainerJobError(Exception):
+    """创建任务的业务失败（错误信息直接展示给用户）"""
+
+
+class ContainerCreateWorker:
+    """进程内创建任务 worker 池"""
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        # 任意任务进度变化时通知长轮询请求
+        self._changed = asyncio.Condition()
+        self.worker_id = ""
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """启动 worker，并恢复上次未完成的任务"""
+        if self._tasks:
+            return
+        # 在当前事件循环中重新创建队列与条件变量
+        self.queue = asyncio.Queue()
+        self._changed = asyncio.Condition()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        await self._recover()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"container-create-{index}")
+            for index in range(self.concurrency)
+        ]
+        logger.info("云电脑创建任务执行器已启动，并发数 %s", self.concurrency)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job_id: int) -> None:
+        self.queue.put_nowait(job_id)
+        metrics.container_create_queue_depth.set(self.queue.qsize())
+
+    async def wait_for_change(self, timeout: float) -> None:
+        """等待任一任务进度变化，超时直接返回"""
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _recover(self) -> None:
+        async with AsyncSessionLocal() as db:
+            jobs = await container_job_service.list_unfinished(db)
+            for job in jobs:
+                if job.status == "queued":
+                    self.submit(job.id)
+                    continue
+                if self._owner_alive(job):
+                    continue
+                user = await user_service.get_by_id(db, job.user_id)
+                self._fail(job, user, "服务重启导致创建任务中断，请刷新后确认是否需要重新创建")
+            await db.commit()
+        if jobs:
+            logger.info("恢复未完成的创建任务 %s 个", len(jobs))
+
+    def _owner_alive(self, job: ContainerCreateJob) -> bool:
+        """执行该任务的进程是否仍在运行（仅能判断本机进程）"""
+        if not job.worker_id or os.name == "nt":
+            return False
+        started_at = job.started_at.replace(tzinfo=None) if job.started_at else None
+        if started_at and started_at < datetime.utcnow() - timedelta(
+            minutes=RUNNING_JOB_TIMEOUT_MINUTES
+        ):
+            return False
+        host, _, pid = job.worker_id.rpartition(":")
+        if host != socket.gethostname() or job.worker_id == self.worker_id:
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except (ValueError, ProcessLookupError):
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self.queue.get()
+            metrics.container_create_queue_depth.set(self.queue.qsize())
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.exception("创建任务 %s 执行异常: %s", job_id, e)
+            finally:
+                self.queue.task_done()
+                await self._notify()
+
+    async def _run(self, job_id: int) -> None:
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            # 其他进程已领取或任务已结束时跳过
+            if not await container_job_service.claim(
+                db, job_id, self.worker_id, datetime.utcnow()
+            ):
+                return
+
+            job = await container_job_service.get_by_id(db, job_id)
+            user = await user_service.get_by_id(db, job.user_id)
+            if user and user.container_operation_status == "creating":
+                # 刷新锁时间，避免排队较久的任务被当作超时锁清理
+                user.container_operation_started_at = job.started_at
+                await db.commit()
+            await self._notify()
+
+            try:
+                await self._create(db, job, user)
+                result = "succeeded"
+            except Exception as e:
+                if isinstance(e, ContainerJobError):
+                    message = str(e)
+                else:
+                    logger.exception("创建任务 %s 执行失败: %s", job_id, e)
+                    message = f"创建失败: {e}"
+                await db.rollback()
+                job = await container_job_service.get_by_id(db, job_id)
+                user = await user_service.get_by_id(db, job.user_id)
+                self._fail(job, user, message)
+                await db.commit()
+                result = "failed"
+
+        metrics.container_create_jobs_total.inc(result=result)
+        metrics.container_create_job_duration_seconds.observe(time.perf_counter() - started)
+
+    async def _step(self, db, job: ContainerCreateJob, step: str) -> None:
+        await container_job_service.update_step(db, job, step)
+        await self._notify()
+
+    async def _create(self, db, job: ContainerCreateJob, user: Optional[User]) -> None:
+        if not user:
+            raise ContainerJobError("用户不存在")
+
+        if job.replace_existing:
+            existing = await container_service.get_by_user_id(db, user.id)
+            if existing:
+                await self._step(db, job, "deleting_old_instance")
+                delete_result = await ucloud_service.delete_container(
+                    existing.ucloud_instance_id
+                )
+                if not delete_result["success"]:
+                    raise ContainerJobError(
+                        f"删除旧实例失败: {delete_result.get('error', '未知错误')}"
+                    )
+                await container_service.hard_delete_by_user(db, user.id)
+                session_meter.remove(user.id)
+                user.current_container_id = None
+                await db.commit()
+
+        try:
+            create_config = await config_service.get_container_create_config(
+                db, job.config_code
+            )
+        except ValueError as exc:
+            raise ContainerJobError(str(exc)) from exc
+
+        # 优先领取预创建实例，池为空或启动失败时正常创建
+        result = None
+        if warm_pool_service.enabled:
+            await self._step(db, job, "starting_warm_instance")
+            result = await warm_pool_service.claim_and_start(
+                db, create_config, job.instance_name
+            )
+        source = "warm" if result else "cold"
+
+        if result is None:
+            # 规格参数来自固定套餐，共享镜像来自后台配置
+            await self._step(db, job, "creating_instance")
+            result = await ucloud_service.create_container(
+                instance_name=job.instance_name,
+                create_config=create_config,
+            )
+            if not result["success"]:
+                raise ContainerJobError(f"创建失败: {result.get('error', '未知错误')}")
+
+        # 创建容器记录 - 保存本次实际生效的系统配置快照
+        await self._step(db, job, "saving")
+        container = await container_service.create(
+            db,
+            user.id,
+            {
+                "instance_id": result["instance_id"],
+                "instance_name": job.instance_name,
+                "config_code": create_config["config_code"],
+                "config_name": create_config["config_name"],
+                "gpu_type": create_config["gpu_type"],
+                "cpu_cores": create_config["cpu_cores"],
+                "memory_gb": create_config["memory_gb"],
+                "storage_gb": create_config["storage_gb"],
+                "price_per_minute": create_config["price_per_minute"],
+                "ip": result["ip"],
+                "password": result["password"],
+            },
+            auto_commit=False,
+        )
+
+        # 容器记录、用户状态、任务结果、实例池领取与操作日志一次提交，
+        # 提交失败时不会留下无人关联却仍在计费的运行中容器
+        user.current_container_id = container.id
+        user.container_operation_status = None
+        user.container_operation_started_at = None
+        container_job_service.finish(job, container_id=container.id)
+        if source == "warm":
+            await warm_pool_service.finish_claim(db, result["warm_pool_id"])
+        db.add(
+            ContainerLog(
+                user_id=user.id,
+                admin_id=user.admin_id,
+                container_id=container.id,
+                action="create",
+                action_status="success",
+                started_at=container.started_at,
+                ip_address=job.ip_address,
+            )
+        )
+        time_to_desktop = (job.finished_at - job.created_at.replace(tzinfo=None)).total_seconds()
+        await db.commit()
+        session_meter.track(user, container)
+        metrics.container_time_to_desktop_seconds.observe(time_to_desktop, source=source)
+
+    @staticmethod
+    def _fail(job: ContainerCreateJob, user: Optional[User], message: str) -> None:
+        """标记任务失败并释放创建锁（不提交）"""
+        container_job_service.finish(job, error_message=message)
+        if user and user.container_operation_status == "creating":
+            user.container_operation_status = None
+            user.container_operation_started_at = None
+
+
+# 全局创建任务执行器
+container_create_worker = ContainerCreateWorker(settings.CONTAINER_CREATE_WORKERS)
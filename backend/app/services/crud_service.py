@@ -1,20 +1,26 @@
 import logging
+import random
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, or_, update
+from sqlalchemy import select, and_, func, or_, update, case, insert, bindparam
 from typing import Optional, List
 
 from app.models.models import (
     User,
     Admin,
     ContainerRecord,
+    ContainerCreateJob,
     SystemConfig,
     ContainerLog,
     AdminOperationLog,
     UserLoginLog,
+    BillingChargeRecord,
+    BillingSummary,
+    BalanceLog,
 )
 from app.core.security import get_password_hash
 from app.core.config import get_settings
+from app.db.search_index import keyword_filter
 from app.core.container_configs import (
     FIXED_CONTAINER_CONFIGS,
     build_config_price_key,
@@ -41,6 +47,14 @@ class UserService:
         result = await db.execute(select(User).where(User.id == user_id))
         return result.scalar_one_or_none()
 
+    @staticmethod
+    async def get_by_ids(db: AsyncSession, user_ids: List[int]) -> dict:
+        """批量获取用户，返回 {用户ID: 用户}"""
+        if not user_ids:
+            return {}
+        result = await db.execute(select(User).where(User.id.in_(set(user_ids))))
+        return {user.id: user for user in result.scalars().all()}
+
     @staticmethod
     async def clear_stale_container_operation(
         db: AsyncSession, user: User, timeout_minutes: int = 10
@@ -139,6 +153,22 @@ class UserService:
         new_balance = user.balance + amount
         user.balance = new_balance
 
+    @staticmethod
+    async def add_balances(db: AsyncSession, changes: dict) -> None:
+        """按 {用户ID: 变动金额} 批量增减余额（单条 executemany，不提交事务）"""
+        if not changes:
+            return
+        user_table = User.__table__
+        await db.execute(
+            update(user_table)
+            .where(user_table.c.id == bindparam("user_id"))
+            .values(balance=user_table.c.balance + bindparam("change_amount")),
+            [
+                {"user_id": user_id, "change_amount": amount}
+                for user_id, amount in changes.items()
+            ],
+        )
+
     @staticmethod
     async def list_users(
         db: AsyncSession,
@@ -151,9 +181,7 @@ class UserService:
         query = select(User)
 
         if keyword:
-            query = query.where(
-                or_(User.company_name.contains(keyword), User.phone.contains(keyword))
-            )
+            query = query.where(keyword_filter(User, keyword))
 
         if status is not None:
             query = query.where(User.status == status)
@@ -189,9 +217,7 @@ class UserService:
         query = select(User).options(joinedload(User.admin))
 
         if keyword:
-            query = query.where(
-                or_(User.company_name.contains(keyword), User.phone.contains(keyword))
-            )
+            query = query.where(keyword_filter(User, keyword))
 
         # 应用额外过滤条件
         if filters:
@@ -257,10 +283,15 @@ class AdminService:
         return admin
 
     @staticmethod
-    async def list_admins(db: AsyncSession, skip: int = 0, limit: int = 20) -> tuple:
+    async def list_admins(
+        db: AsyncSession, skip: int = 0, limit: int = 20, keyword: str = None
+    ) -> tuple:
         """获取管理员列表"""
         query = select(Admin).order_by(Admin.created_at.desc())
 
+        if keyword:
+            query = query.where(keyword_filter(Admin, keyword))
+
         # 获取总数
         count_query = select(func.count()).select_from(query.subquery())
         total = await db.scalar(count_query)
@@ -314,9 +345,12 @@ class ContainerService:
 
     @staticmethod
     async def create(
-        db: AsyncSession, user_id: int, container_data: dict
+        db: AsyncSession, user_id: int, container_data: dict, auto_commit: bool = True
     ) -> ContainerRecord:
-        """创建容器记录"""
+        """创建容器记录
+
+        auto_commit 为 False 时只 flush 以取得容器ID，由调用方与其他变更一并提交。
+        """
         container = ContainerRecord(
             user_id=user_id,
             ucloud_instance_id=container_data["instance_id"],
@@ -337,6 +371,9 @@ class ContainerService:
             connection_password=container_data["password"],
         )
         db.add(container)
+        if not auto_commit:
+            await db.flush()
+            return container
         await db.commit()
         await db.refresh(container)
         return container
@@ -433,6 +470,85 @@ class ContainerService:
         )
         return result.scalars().all()
 
+    @staticmethod
+    async def list_due_deletions(
+        db: AsyncSession, now: datetime, limit: int
+    ) -> List[ContainerRecord]:
+        """获取已到重试时间的删除中容器（从未重试过的优先）"""
+        result = await db.execute(
+            select(ContainerRecord)
+            .where(
+                and_(
+                    ContainerRecord.status == "deleting",
+                    ContainerRecord.deleted_at.is_(None),
+                    or_(
+                        ContainerRecord.next_delete_attempt_at.is_(None),
+                        ContainerRecord.next_delete_attempt_at <= now,
+                    ),
+                )
+            )
+            .order_by(
+                ContainerRecord.next_delete_attempt_at.asc().nulls_first(),
+                ContainerRecord.id.asc(),
+            )
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    @staticmethod
+    async def get_deletion_backlog(db: AsyncSession, now: datetime) -> dict:
+        """删除中容器的积压情况：总数、已到重试时间的数量、最早提交删除时间"""
+        requested_at = func.coalesce(
+            ContainerRecord.delete_requested_at,
+            ContainerRecord.stopped_at,
+            ContainerRecord.created_at,
+        )
+        result = await db.execute(
+            select(
+                func.count(),
+                func.sum(
+                    case(
+                        (
+                            or_(
+                                ContainerRecord.next_delete_attempt_at.is_(None),
+                                ContainerRecord.next_delete_attempt_at <= now,
+                            ),
+                            1,
+                        ),
+                        else_=0,
+                    )
+                ),
+                func.min(requested_at),
+            ).where(
+                and_(
+                    ContainerRecord.status == "deleting",
+                    ContainerRecord.deleted_at.is_(None),
+                )
+            )
+        )
+        total, due, oldest = result.one()
+        if isinstance(oldest, str):
+            # SQLite 对 coalesce 结果不做类型转换
+            oldest = datetime.fromisoformat(oldest)
+        return {"total": total or 0, "due": due or 0, "oldest_requested_at": oldest}
+
+    @staticmethod
+    def record_delete_failure(
+        container: ContainerRecord, error: str, now: Optional[datetime] = None
+    ) -> None:
+        """记录一次云端删除失败并按指数退避安排下次重试（不提交）"""
+        now = now or datetime.utcnow()
+        attempts = (container.delete_attempts or 0) + 1
+        delay = min(
+            settings.DELETION_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+            settings.DELETION_RETRY_MAX_SECONDS,
+        )
+        # 加入少量随机抖动，避免同一批失败的容器总在同一轮重试
+        delay *= random.uniform(1.0, 1.2)
+        container.delete_attempts = attempts
+        container.next_delete_attempt_at = now + timedelta(seconds=delay)
+        container.last_delete_error = (error or "未知错误")[:500]
+
     @staticmethod
     async def count_by_status(db: AsyncSession) -> dict:
         """统计各状态容器数量"""
@@ -447,6 +563,113 @@ class ContainerService:
         return counts
 
 
+class ContainerJobService:
+    """云电脑创建任务服务"""
+
+    ACTIVE_STATUSES = ("queued", "running")
+
+    @staticmethod
+    async def create(
+        db: AsyncSession,
+        user_id: int,
+        instance_name: str,
+        config_code: str,
+        replace_existing: bool = False,
+        ip_address: str = None,
+    ) -> ContainerCreateJob:
+        """创建排队中的任务"""
+        job = ContainerCreateJob(
+            user_id=user_id,
+            status="queued",
+            step="queued",
+            instance_name=instance_name,
+            config_code=config_code,
+            replace_existing=1 if replace_existing else 0,
+            ip_address=ip_address,
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        return job
+
+    @staticmethod
+    async def get_by_id(db: AsyncSession, job_id: int) -> Optional[ContainerCreateJob]:
+        result = await db.execute(
+            select(ContainerCreateJob).where(ContainerCreateJob.id == job_id)
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def get_active_for_user(
+        db: AsyncSession, user_id: int
+    ) -> Optional[ContainerCreateJob]:
+        """获取用户最近一个未完成的任务"""
+        result = await db.execute(
+            select(ContainerCreateJob)
+            .where(
+                and_(
+                    ContainerCreateJob.user_id == user_id,
+                    ContainerCreateJob.status.in_(ContainerJobService.ACTIVE_STATUSES),
+                )
+            )
+            .order_by(ContainerCreateJob.id.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+    @staticmethod
+    async def list_unfinished(db: AsyncSession) -> List[ContainerCreateJob]:
+        """获取所有未完成的任务（服务启动时恢复用）"""
+        result = await db.execute(
+            select(ContainerCreateJob)
+            .where(ContainerCreateJob.status.in_(ContainerJobService.ACTIVE_STATUSES))
+            .order_by(ContainerCreateJob.id.asc())
+        )
+        return result.scalars().all()
+
+    @staticmethod
+    async def claim(
+        db: AsyncSession, job_id: int, worker_id: str, started_at: datetime
+    ) -> bool:
+        """原子地将排队中的任务标记为执行中，多个进程同时领取同一任务时只有一个成功"""
+        result = await db.execute(
+            update(ContainerCreateJob)
+            .where(
+                and_(
+                    ContainerCreateJob.id == job_id,
+                    ContainerCreateJob.status == "queued",
+                )
+            )
+            .values(
+                status="running",
+                step="preparing",
+                started_at=started_at,
+                worker_id=worker_id,
+            )
+        )
+        await db.commit()
+        return bool(result.rowcount)
+
+    @staticmethod
+    async def update_step(db: AsyncSession, job: ContainerCreateJob, step: str) -> None:
+        """记录任务进度"""
+        job.step = step
+        await db.commit()
+
+    @staticmethod
+    def finish(
+        job: ContainerCreateJob,
+        container_id: Optional[int] = None,
+        error_message: Optional[str] = None,
+    ) -> None:
+        """结束任务：有错误信息时记为失败（不提交）"""
+        job.status = "failed" if error_message else "succeeded"
+        job.step = job.status
+        job.container_id = container_id
+        job.error_message = error_message
+        job.finished_at = datetime.utcnow()
+
+
 class ConfigService:
     """配置服务"""
 
@@ -701,6 +924,167 @@ class ConfigService:
         }
 
 
+def _insert_ignore_conflict(db: AsyncSession, model):
+    """按方言构造 INSERT ... ON CONFLICT DO NOTHING（主键冲突时不写入）"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(model).on_conflict_do_nothing()
+
+
+class BillingSummaryService:
+    """扣费汇总服务
+
+    每个用户、每个代理各维护一行今日/本月/累计汇总，
+    由扣费任务在同一事务内增量更新，统计接口只需一次主键读取。
+    """
+
+    @staticmethod
+    def _period_keys(now: datetime) -> tuple:
+        return now.date(), now.strftime("%Y-%m")
+
+    @staticmethod
+    def _rollover(summary: BillingSummary, now: datetime) -> None:
+        """跨日/跨月时重置对应周期的统计"""
+        today, month = BillingSummaryService._period_keys(now)
+        if summary.summary_date != today:
+            summary.summary_date = today
+            summary.today_cost = 0.0
+            summary.today_minutes = 0
+        if summary.summary_month != month:
+            summary.summary_month = month
+            summary.month_cost = 0.0
+            summary.month_minutes = 0
+
+    @staticmethod
+    async def _backfill(
+        db: AsyncSession, account_type: str, account_id: int, now: datetime
+    ) -> BillingSummary:
+        """首次访问时从扣费记录回填汇总行（不提交事务）
+
+        需在写入本次扣费记录之前调用，否则回填结果会包含本次扣费。
+        """
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        month_start = today_start.replace(day=1)
+        charge_time = BillingChargeRecord.charge_minute
+        query = select(
+            func.coalesce(
+                func.sum(
+                    case((charge_time >= today_start, BillingChargeRecord.amount), else_=0)
+                ),
+                0,
+            ),
+            func.coalesce(func.sum(case((charge_time >= today_start, 1), else_=0)), 0),
+            func.coalesce(
+                func.sum(
+                    case((charge_time >= month_start, BillingChargeRecord.amount), else_=0)
+                ),
+                0,
+            ),
+            func.coalesce(func.sum(case((charge_time >= month_start, 1), else_=0)), 0),
+            func.coalesce(func.sum(BillingChargeRecord.amount), 0),
+            func.count(BillingChargeRecord.id),
+        )
+        if account_type == "user":
+            query = query.where(BillingChargeRecord.user_id == account_id)
+        else:
+            query = query.join(User, BillingChargeRecord.user_id == User.id).where(
+                User.admin_id == account_id
+            )
+
+        result = await db.execute(query)
+        (
+            today_cost,
+            today_minutes,
+            month_cost,
+            month_minutes,
+            total_cost,
+            total_minutes,
+        ) = result.one()
+
+        today, month = BillingSummaryService._period_keys(now)
+        # 统计接口与扣费任务可能同时回填同一行：冲突时保留先写入的行，
+        # 不抛 IntegrityError，避免中断调用方事务（如整轮扣费）
+        statement = _insert_ignore_conflict(db, BillingSummary).values(
+            account_type=account_type,
+            account_id=account_id,
+            summary_date=today,
+            today_cost=float(today_cost),
+            today_minutes=int(today_minutes),
+            summary_month=month,
+            month_cost=float(month_cost),
+            month_minutes=int(month_minutes),
+            total_cost=float(total_cost),
+            total_minutes=int(total_minutes),
+        )
+        await db.execute(statement)
+        return await db.get(
+            BillingSummary, (account_type, account_id), populate_existing=True
+        )
+
+    @staticmethod
+    async def get_or_create(
+        db: AsyncSession, account_type: str, account_id: int, now: datetime = None
+    ) -> BillingSummary:
+        """获取汇总行，不存在时回填（不提交事务）"""
+        now = now or datetime.utcnow()
+        summary = await db.get(BillingSummary, (account_type, account_id))
+        if summary is None:
+            summary = await BillingSummaryService._backfill(
+                db, account_type, account_id, now
+            )
+        return summary
+
+    @staticmethod
+    async def record_charge(
+        db: AsyncSession,
+        user: User,
+        amount: float,
+        charge_time: datetime,
+    ) -> None:
+        """记录一分钟扣费，同时更新用户与代理汇总（不提交事务，由调用方控制）
+
+        须在本次扣费记录加入会话之前调用。
+        """
+        for account_type, account_id in (("user", user.id), ("admin", user.admin_id)):
+            summary = await BillingSummaryService.get_or_create(
+                db, account_type, account_id, charge_time
+            )
+            BillingSummaryService._rollover(summary, charge_time)
+            summary.today_cost += amount
+            summary.today_minutes += 1
+            summary.month_cost += amount
+            summary.month_minutes += 1
+            summary.total_cost += amount
+            summary.total_minutes += 1
+
+    @staticmethod
+    async def get_statistics(
+        db: AsyncSession, account_type: str, account_id: int
+    ) -> dict:
+        """读取汇总统计，已跨日/跨月的周期按 0 返回"""
+        now = datetime.utcnow()
+        summary = await db.get(BillingSummary, (account_type, account_id))
+        if summary is None:
+            summary = await BillingSummaryService._backfill(
+                db, account_type, account_id, now
+            )
+            await db.commit()
+
+        today, month = BillingSummaryService._period_keys(now)
+        is_today = summary.summary_date == today
+        is_this_month = summary.summary_month == month
+        return {
+            "today_cost": summary.today_cost if is_today else 0,
+            "today_minutes": summary.today_minutes if is_today else 0,
+            "this_month_cost": summary.month_cost if is_this_month else 0,
+            "this_month_minutes": summary.month_minutes if is_this_month else 0,
+            "total_cost": summary.total_cost,
+            "total_minutes": summary.total_minutes,
+        }
+
+
 class LogService:
     """日志服务"""
 
@@ -766,6 +1150,18 @@ class LogService:
         db.add(log)
         await db.commit()
 
+    @staticmethod
+    async def bulk_create_admin_operation_logs(db: AsyncSession, logs: List[dict]):
+        """批量写入管理员操作日志（不提交事务，由调用方控制）"""
+        if logs:
+            await db.execute(insert(AdminOperationLog), logs)
+
+    @staticmethod
+    async def bulk_create_balance_logs(db: AsyncSession, logs: List[dict]):
+        """批量写入余额变动日志（不提交事务，由调用方控制）"""
+        if logs:
+            await db.execute(insert(BalanceLog), logs)
+
     @staticmethod
     async def create_user_login_log(
         db: AsyncSession,
@@ -797,5 +1193,7 @@ class LogService:
 user_service = UserService()
 admin_service = AdminService()
 container_service = ContainerService()
+container_job_service = ContainerJobService()
 config_service = ConfigService()
+billing_summary_service = BillingSummaryService()
 log_service = LogService()
@@ -0,0 +1,173 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Callable, Iterable, List, Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+
+from app.db.database import AsyncSessionLocal
+
+# 每批从数据库游标读取的行数
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _format_csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class ExportService:
+    """流式导出服务
+
+    通过服务端游标（stream + yield_per）按批读取数据并逐批编码输出，
+    导出任意时间范围时内存占用保持恒定。
+    """
+
+    @staticmethod
+    def validate_format(export_format: str) -> str:
+        """校验导出格式"""
+        export_format = (export_format or "csv").lower()
+        if export_format not in EXPORT_MEDIA_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="导出格式无效，仅支持 csv / ndjson",
+            )
+        return export_format
+
+    @staticmethod
+    async def iter_query_rows(
+        query: Select,
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+    ) -> AsyncIterator[list]:
+        """按批次流式读取查询结果
+
+        使用独立会话，避免依赖请求级会话在响应发送前被关闭。
+        """
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(
+                query.execution_options(yield_per=chunk_size)
+            )
+            async for partition in result.partitions():
+                yield partition
+
+    @staticmethod
+    def _encode_csv(columns: List[str], rows: Iterable[dict]) -> str:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_format_csv_value(row.get(column)) for column in columns])
+        return buffer.getvalue()
+
+    @staticmethod
+    def _encode_ndjson(rows: Iterable[dict]) -> str:
+        return "".join(
+            json.dumps(row, ensure_ascii=False, default=_json_default) + "\n"
+            for row in rows
+        )
+
+    @staticmethod
+    async def encode_rows(
+        chunks: AsyncIterator[list],
+        columns: List[str],
+        export_format: str,
+        row_mapper: Callable[[list], Iterable[dict]],
+        use_gzip: bool = False,
+    ) -> AsyncIterator[bytes]:
+        """将批次数据编码为 CSV / NDJSON 字节流（可选 gzip）"""
+        compressor = (
+            zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+            if use_gzip
+            else None
+        )
+
+        def _emit(text: str) -> bytes:
+            data = text.encode("utf-8")
+            if compressor:
+                return compressor.compress(data)
+            return data
+
+        if export_format == "csv":
+            # 带 BOM 便于 Excel 正确识别中文
+            header = "\ufeff" + ExportService._encode_csv(
+                columns, [{column: column for column in columns}]
+            )
+            yield _emit(header)
+
+        async for chunk in chunks:
+            rows = row_mapper(chunk)
+            if export_format == "csv":
+                data = _emit(ExportService._encode_csv(columns, rows))
+            else:
+                data = _emit(ExportService._encode_ndjson(rows))
+            if data:
+                yield data
+
+        if compressor:
+            yield compressor.flush()
+
+    @staticmethod
+    def build_response(
+        chunks: AsyncIterator[list],
+        columns: List[str],
+        export_format: str,
+        row_mapper: Callable[[list], Iterable[dict]],
+        filename: str,
+        use_gzip: bool = False,
+    ) -> StreamingResponse:
+        """构建流式导出响应"""
+        full_filename = f"{filename}.{export_format}"
+        media_type = EXPORT_MEDIA_TYPES[export_format]
+        if use_gzip:
+            full_filename += ".gz"
+            media_type = "application/gzip"
+
+        return StreamingResponse(
+            ExportService.encode_rows(
+                chunks,
+                columns,
+                export_format,
+                row_mapper,
+                use_gzip=use_gzip,
+            ),
+            media_type=media_type,
+            headers={
+                "Content-Disposition": f'attachment; filename="{full_filename}"',
+                "Cache-Control": "no-store",
+            },
+        )
+
+    @staticmethod
+    def parse_date_range(
+        start_date: Optional[str], end_date: Optional[str]
+    ) -> tuple:
+        """解析导出的起止时间"""
+        try:
+            start_dt = datetime.fromisoformat(start_date) if start_date else None
+            end_dt = datetime.fromisoformat(end_date) if end_date else None
+        except ValueError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="日期格式无效，请使用 ISO 格式，如 2026-01-01 或 2026-01-01T00:00:00",
+            ) from exc
+        return start_dt, end_dt
+
+
+export_service = ExportService()
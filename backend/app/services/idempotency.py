@@ -0,0 +1,240 @@
+"""容器操作接口的幂等键
+
+创建/启动/停止/删除接口接受可选的 `Idempotency-Key` 请求头（同一用户内唯一）。
+首次请求成功后，响应保存到 idempotency_record 表并在本进程内缓存；
+携带相同幂等键的重试直接返回保存的响应（响应头 `Idempotent-Replayed: true`），
+不再调用 UCloud、写日志或重新计算费用。
+
+- 同一幂等键用于不同接口或不同请求体时返回 422
+- 首次请求仍在处理中时重试返回 409；处理超过 IDEMPOTENCY_PROCESSING_TIMEOUT_SECONDS 视为中断，允许重新执行
+- 只保存成功响应；失败的请求会删除占位记录，客户端可用同一幂等键重试
+- 记录保留 IDEMPOTENCY_TTL_SECONDS，过期记录由定时任务清理
+"""
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.models.models import IdempotencyRecord
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 128
+
+
+def request_fingerprint(payload) -> str:
+    """请求体摘要（键排序后的 JSON）"""
+    canonical = json.dumps(jsonable_encoder(payload), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class IdempotencyService:
+    """幂等键记录与响应重放"""
+
+    def __init__(self, max_cached: int):
+        self.max_cached = max_cached
+        # (user_id, key) -> (过期时间, 接口, 请求摘要, 状态码, 响应内容)
+        self._cache: "OrderedDict[Tuple[int, str], tuple]" = OrderedDict()
+
+    async def run(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        key: Optional[str],
+        endpoint: str,
+        payload,
+        handler: Callable[[], Awaitable],
+        status_code: int = status.HTTP_200_OK,
+    ):
+        """以幂等方式执行接口逻辑；未提供幂等键时直接执行"""
+        if not key:
+            return await handler()
+        if len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{IDEMPOTENCY_HEADER} 长度不能超过 {MAX_KEY_LENGTH}",
+            )
+
+        request_hash = request_fingerprint(payload)
+        replay = self._replay_cached(user_id, key, endpoint, request_hash)
+        if replay is None:
+            replay = await self._begin(db, user_id, key, endpoint, request_hash)
+        if replay is not None:
+            metrics.idempotency_requests_total.inc(endpoint=endpoint, result="replayed")
+            return replay
+
+        try:
+            response = await handler()
+        except Exception:
+            await self._abort(db, user_id, key)
+            metrics.idempotency_requests_total.inc(endpoint=endpoint, result="failed")
+            raise
+
+        body = jsonable_encoder(response)
+        await self._complete(db, user_id, key, status_code, body)
+        self._remember(user_id, key, endpoint, request_hash, status_code, body)
+        metrics.idempotency_requests_total.inc(endpoint=endpoint, result="stored")
+        return response
+
+    # ==================== 内部实现 ====================
+
+    @staticmethod
+    def _check_match(endpoint: str, request_hash: str, stored_endpoint: str, stored_hash: str):
+        if endpoint != stored_endpoint or request_hash != stored_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"{IDEMPOTENCY_HEADER} 已用于其他请求，请为新操作生成新的幂等键",
+            )
+
+    @staticmethod
+    def _replay_response(status_code: int, body) -> JSONResponse:
+        return JSONResponse(
+            status_code=status_code, content=body, headers={REPLAYED_HEADER: "true"}
+        )
+
+    def _replay_cached(
+        self, user_id: int, key: str, endpoint: str, request_hash: str
+    ) -> Optional[JSONResponse]:
+        entry = self._cache.get((user_id, key))
+        if entry is None:
+            return None
+        expires_at, stored_endpoint, stored_hash, status_code, body = entry
+        if expires_at <= datetime.utcnow():
+            del self._cache[(user_id, key)]
+            return None
+        self._check_match(endpoint, request_hash, stored_endpoint, stored_hash)
+        return self._replay_response(status_code, body)
+
+    async def _begin(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        key: str,
+        endpoint: str,
+        request_hash: str,
+    ) -> Optional[JSONResponse]:
+        """写入处理中占位记录；已有完成的记录时返回其响应"""
+        now = datetime.utcnow()
+        for _ in range(2):
+            record = await db.get(IdempotencyRecord, (user_id, key), populate_existing=True)
+            if record is not None:
+                expired = record.expires_at.replace(tzinfo=None) <= now
+                abandoned = (
+                    record.status == "processing"
+                    and record.created_at.replace(tzinfo=None)
+                    <= now - timedelta(seconds=settings.IDEMPOTENCY_PROCESSING_TIMEOUT_SECONDS)
+                )
+                if not expired and not abandoned:
+                    self._check_match(
+                        endpoint, request_hash, record.endpoint, record.request_hash
+                    )
+                    if record.status == "processing":
+                        raise HTTPException(
+                            status_code=status.HTTP_409_CONFLICT,
+                            detail="相同请求正在处理中，请稍候",
+                        )
+                    body = json.loads(record.response_body)
+                    self._remember(
+                        user_id, key, endpoint, request_hash, record.status_code, body,
+                        record.expires_at.replace(tzinfo=None),
+                    )
+                    return self._replay_response(record.status_code, body)
+                await db.delete(record)
+                await db.flush()
+
+            db.add(
+                IdempotencyRecord(
+                    user_id=user_id,
+                    idempotency_key=key,
+                    endpoint=endpoint,
+                    request_hash=request_hash,
+                    status="processing",
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+                )
+            )
+            try:
+                await db.commit()
+                return None
+            except IntegrityError:
+                # 并发的相同请求已先写入，重新读取
+                await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="相同请求正在处理中，请稍候"
+        )
+
+    @staticmethod
+    async def _complete(
+        db: AsyncSession, user_id: int, key: str, status_code: int, body
+    ) -> None:
+        record = await db.get(IdempotencyRecord, (user_id, key))
+        if record is None:
+            return
+        record.status = "completed"
+        record.status_code = status_code
+        record.response_body = json.dumps(body, ensure_ascii=False)
+        await db.commit()
+
+    @staticmethod
+    async def _abort(db: AsyncSession, user_id: int, key: str) -> None:
+        """删除占位记录，允许使用同一幂等键重试"""
+        try:
+            await db.rollback()
+            await db.execute(
+                delete(IdempotencyRecord).where(
+                    IdempotencyRecord.user_id == user_id,
+                    IdempotencyRecord.idempotency_key == key,
+                    IdempotencyRecord.status == "processing",
+                )
+            )
+            await db.commit()
+        except Exception as e:
+            logger.warning("清理幂等键占位记录失败 user=%s key=%s: %s", user_id, key, e)
+
+    def _remember(
+        self,
+        user_id: int,
+        key: str,
+        endpoint: str,
+        request_hash: str,
+        status_code: int,
+        body,
+        expires_at: Optional[datetime] = None,
+    ) -> None:
+        if self.max_cached <= 0:
+            return
+        if expires_at is None:
+            expires_at = datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+        self._cache[(user_id, key)] = (expires_at, endpoint, request_hash, status_code, body)
+        self._cache.move_to_end((user_id, key))
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    async def purge_expired(db: AsyncSession, now: Optional[datetime] = None) -> int:
+        """删除过期记录，返回删除条数"""
+        now = now or datetime.utcnow()
+        result = await db.execute(
+            delete(IdempotencyRecord).where(IdempotencyRecord.expires_at <= now)
+        )
+        await db.commit()
+        return result.rowcount or 0
+
+
+# 全局幂等键服务
+idempotency_service = IdempotencyService(settings.IDEMPOTENCY_CACHE_SIZE)
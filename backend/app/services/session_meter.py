@@ -0,0 +1,108 @@
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+@dataclass
+class LiveSession:
+    """运行中会话快照"""
+
+    user_id: int
+    container_id: int
+    started_at: datetime
+    price_per_minute: float
+    balance: float
+    connection_info: dict
+    refreshed_at: float = field(default_factory=time.monotonic)
+
+
+class SessionMeter:
+    """运行中会话的内存计量表
+
+    由启动/停止/删除接口与每分钟扣费任务维护，
+    `/container/my/status` 命中时直接基于内存数据计算运行时长与费用，
+    未命中或快照过期时回退到数据库并重新登记。
+    快照只在本进程内维护，多进程部署（扣费在定时任务进程、请求分散到多个 worker）时关闭。
+    """
+
+    def __init__(self, ttl_seconds: int, enabled: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._sessions: Dict[int, LiveSession] = {}
+
+    def get(self, user_id: int) -> Optional[LiveSession]:
+        """获取未过期的会话快照"""
+        if not self.enabled:
+            return None
+        session = self._sessions.get(user_id)
+        if not session:
+            return None
+        if time.monotonic() - session.refreshed_at > self.ttl_seconds:
+            self._sessions.pop(user_id, None)
+            return None
+        return session
+
+    def track(self, user, container) -> None:
+        """登记运行中的容器会话（仅限启用状态的用户）
+
+        命中快照时不再校验用户状态，禁用或删除用户的接口须同时调用 remove。
+        """
+        if (
+            not self.enabled
+            or user.status != 1
+            or container.status != "running"
+            or not container.started_at
+        ):
+            self.remove(user.id)
+            return
+
+        self._sessions[user.id] = LiveSession(
+            user_id=user.id,
+            container_id=container.id,
+            started_at=container.started_at,
+            price_per_minute=container.price_per_minute,
+            balance=user.balance,
+            connection_info={
+                "host": container.connection_host,
+                "port": container.connection_port,
+                "username": container.connection_username,
+                "password": container.connection_password,
+            },
+        )
+
+    def update_balance(self, user_id: int, balance: float) -> None:
+        """同步用户余额快照"""
+        session = self._sessions.get(user_id)
+        if session:
+            session.balance = balance
+            session.refreshed_at = time.monotonic()
+
+    def remove(self, user_id: int) -> None:
+        """移除会话"""
+        self._sessions.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._sessions.clear()
+
+    @staticmethod
+    def calculate_session_stats(session: LiveSession) -> dict:
+        """基于内存快照计算本次会话统计"""
+        running_seconds = (datetime.utcnow() - session.started_at).total_seconds()
+        running_minutes = max(0, int(running_seconds / 60))
+        cost = running_minutes * session.price_per_minute
+        return {"running_minutes": running_minutes, "cost": round(cost, 2)}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+# 全局会话计量表
+session_meter = SessionMeter(
+    ttl_seconds=settings.SESSION_METER_TTL_SECONDS,
+    enabled=settings.SESSION_METER_ENABLED,
+)
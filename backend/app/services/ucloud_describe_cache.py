@@ -0,0 +1,92 @@
+"""实例详情查询缓存
+
+按 UHostId 缓存 DescribeCompShareInstance 的结果（有效期 UCLOUD_DESCRIBE_CACHE_TTL_SECONDS），
+同一实例的并发查询共用一次进行中的请求（single-flight），
+管理端批量查看与状态核对不会成倍放大对云端的查询。
+
+启动、停止、删除、改名等会改变实例状态的调用前后都会使对应缓存失效；
+失效时仍在进行中的查询结果只返回给已在等待的调用方，不写入缓存。
+查询失败不缓存；发起查询的调用方被取消时，由仍在等待的调用方重新查询。
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Tuple
+
+from app.core import metrics
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class _LeaderCancelled(Exception):
+    """进行中的查询因发起方被取消而中止"""
+
+
+class DescribeCache:
+    """按实例ID的 TTL 缓存 + single-flight"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        # 失效时移除，据此丢弃失效前发出的查询结果
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def get(
+        self, instance_id: str, fetch: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        """返回实例详情：命中缓存直接返回，已有进行中的查询则等待其结果"""
+        entry = self._entries.get(instance_id)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                metrics.ucloud_describe_cache_total.inc(result="hit")
+                return entry[1]
+            del self._entries[instance_id]
+
+        future = self._inflight.get(instance_id)
+        if future is not None:
+            metrics.ucloud_describe_cache_total.inc(result="shared")
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                # 发起查询的调用方被取消：由等待者接手重新查询
+                return await self.get(instance_id, fetch)
+
+        metrics.ucloud_describe_cache_total.inc(result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[instance_id] = future
+        try:
+            data = await fetch()
+        except asyncio.CancelledError:
+            # 不能直接取消 future，否则仍在等待的调用方会一并收到 CancelledError
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        else:
+            future.set_result(data)
+            if self._inflight.get(instance_id) is future:
+                self._store(instance_id, data)
+            return data
+        finally:
+            if self._inflight.get(instance_id) is future:
+                del self._inflight[instance_id]
+
+    def invalidate(self, instance_id: str) -> None:
+        self._entries.pop(instance_id, None)
+        # 失效后的查询需重新发出，不再复用失效前的进行中请求
+        self._inflight.pop(instance_id, None)
+
+    def _store(self, instance_id: str, data: dict) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        self._entries[instance_id] = (time.monotonic() + self.ttl_seconds, data)
+        self._entries.move_to_end(instance_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
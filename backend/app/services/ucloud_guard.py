@@ -0,0 +1,204 @@
+"""UCloud 接口限流与熔断
+
+请求处理、扣费自动停机、删除补偿与预创建实例池都经由 UCloudService._call 调用 compshare，
+这里为所有调用方提供统一的保护：
+
+- 按接口的令牌桶限流：每秒速率由 UCLOUD_RATE_LIMITS（按接口名）或 UCLOUD_RATE_LIMIT_DEFAULT 配置，
+  令牌不足时在调用线程中等待，超过 UCLOUD_RATE_LIMIT_MAX_WAIT_SECONDS 仍未取得则直接失败
+- 全局熔断器：连续 UCLOUD_BREAKER_FAILURE_THRESHOLD 次服务不可用类错误（网络异常、HTTP 错误、
+  服务端繁忙）后打开，期间所有调用立即失败；UCLOUD_BREAKER_RESET_SECONDS 后放行一次探测调用，
+  成功则恢复，失败则继续熔断
+
+实例不存在、状态冲突等业务错误说明服务本身可用，不计入熔断。
+SDK 调用在线程池中执行，因此这里使用线程锁。
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+from ucloud.core import exc
+
+from app.core import metrics
+from app.core.config import get_settings
+
+settings = get_settings()
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+_BREAKER_STATE_VALUES = {BREAKER_CLOSED: 0, BREAKER_OPEN: 1, BREAKER_HALF_OPEN: 2}
+
+# 服务端繁忙/内部错误类返回码（业务错误码不计入熔断）
+SERVER_ERROR_RET_CODES = {5000, 5001, 5002, 5003, 5004, 5005}
+
+
+class UCloudUnavailableError(Exception):
+    """熔断或限流导致调用未发出"""
+
+
+def is_service_failure(error: Exception) -> bool:
+    """是否为服务不可用类错误（计入熔断）"""
+    if isinstance(error, exc.RetCodeException):
+        return error.code in SERVER_ERROR_RET_CODES
+    if isinstance(error, exc.ValidationException):
+        return False
+    return True
+
+
+class TokenBucket:
+    """线程安全的令牌桶，容量等于每秒速率"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = float(rate)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, max_wait: float) -> bool:
+        """取得一个令牌，最多等待 max_wait 秒"""
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """连续失败计数熔断器"""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        metrics.ucloud_breaker_state.set(0)
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    def allow(self) -> bool:
+        """是否放行本次调用；熔断超时后只放行一个探测调用"""
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self.state == BREAKER_CLOSED:
+                return True
+            if self.state == BREAKER_OPEN:
+                if time.monotonic() - self.opened_at < self.reset_seconds:
+                    return False
+                self._set_state(BREAKER_HALF_OPEN)
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def is_open(self) -> bool:
+        """熔断中且尚未到探测时间（后台任务据此跳过本轮）"""
+        with self._lock:
+            return (
+                self.state == BREAKER_OPEN
+                and time.monotonic() - self.opened_at < self.reset_seconds
+            )
+
+    def release_probe(self) -> None:
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            if self.state != BREAKER_CLOSED:
+                self._set_state(BREAKER_CLOSED)
+
+    def record_failure(self, error: Exception) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = f"{error.__class__.__name__}: {error}"[:500]
+            if self.state == BREAKER_HALF_OPEN or (
+                self.state == BREAKER_CLOSED
+                and self.consecutive_failures >= self.failure_threshold
+            ):
+                self._probe_in_flight = False
+                self.opened_at = time.monotonic()
+                self._set_state(BREAKER_OPEN)
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        metrics.ucloud_breaker_state.set(_BREAKER_STATE_VALUES[state])
+        if state == BREAKER_OPEN:
+            metrics.ucloud_breaker_opened_total.inc()
+
+    def status(self) -> dict:
+        with self._lock:
+            retry_in = None
+            if self.state == BREAKER_OPEN:
+                retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "retry_in_seconds": round(retry_in, 1) if retry_in is not None else None,
+                "last_error": self.last_error,
+            }
+
+
+class UCloudGuard:
+    """按接口限流 + 全局熔断"""
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(
+            settings.UCLOUD_BREAKER_FAILURE_THRESHOLD,
+            settings.UCLOUD_BREAKER_RESET_SECONDS,
+        )
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, action_name: str) -> Optional[TokenBucket]:
+        with self._lock:
+            if action_name not in self._buckets:
+                rate = settings.UCLOUD_RATE_LIMITS.get(
+                    action_name, settings.UCLOUD_RATE_LIMIT_DEFAULT
+                )
+                self._buckets[action_name] = TokenBucket(rate) if rate > 0 else None
+            return self._buckets[action_name]
+
+    def before_call(self, action_name: str) -> None:
+        """调用前检查熔断并取得令牌，不可调用时抛出 UCloudUnavailableError"""
+        if not self.breaker.allow():
+            metrics.ucloud_call_rejected_total.inc(action=action_name, reason="circuit_open")
+            raise UCloudUnavailableError("UCloud 服务暂时不可用（已熔断），请稍后重试")
+
+        bucket = self._bucket(action_name)
+        if bucket is not None and not bucket.acquire(settings.UCLOUD_RATE_LIMIT_MAX_WAIT_SECONDS):
+            # 调用未发出，探测机会留给下一次调用
+            self.breaker.release_probe()
+            metrics.ucloud_call_rejected_total.inc(action=action_name, reason="rate_limited")
+            raise UCloudUnavailableError("UCloud 接口调用过于频繁，请稍后重试")
+
+    def after_call(self, error: Optional[Exception] = None) -> None:
+        if error is not None and is_service_failure(error):
+            self.breaker.record_failure(error)
+        else:
+            self.breaker.record_success()
+
+    def status(self) -> dict:
+        return {"breaker": self.breaker.status()}
@@ -1,7 +1,13 @@
+import asyncio
 import base64
+import threading
+import time
 from ucloud.core import exc
-from ucloud.client import Client
+from app.core import metrics
 from app.core.config import get_settings
+from app.core.tracing import SPAN_KIND_CLIENT, tracer
+from app.services.ucloud_describe_cache import DescribeCache
+from app.services.ucloud_guard import UCloudGuard
 
 settings = get_settings()
 
@@ -10,7 +16,42 @@ class UCloudService:
     """UCloud服务封装"""
 
     def __init__(self):
-        self.client = Client(
+        self.guard = UCloudGuard()
+        self.describe_cache = DescribeCache(
+            settings.UCLOUD_DESCRIBE_CACHE_TTL_SECONDS,
+            settings.UCLOUD_DESCRIBE_CACHE_MAX_ENTRIES,
+        )
+        # SDK 客户端（连带导入 requests 等）在首次调用时创建，不拖慢服务启动
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            # 调用在线程池中并发执行，加锁保证只创建一次
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._build_client()
+        return self._client
+
+    @staticmethod
+    def _build_client():
+        if settings.UCLOUD_SIMULATOR:
+            from app.services.ucloud_simulator import (
+                SimulatedClient,
+                SimulatorConfig,
+                UCloudSimulator,
+            )
+
+            return SimulatedClient(
+                UCloudSimulator(
+                    SimulatorConfig.from_file(settings.UCLOUD_SIMULATOR_CONFIG)
+                )
+            )
+
+        from ucloud.client import Client
+
+        return Client(
             {
                 "region": settings.UCLOUD_REGION,
                 "public_key": settings.UCLOUD_PUBLIC_KEY,
@@ -19,6 +60,72 @@ class UCloudService:
             }
         )
 
+    def _call(self, action: str, payload: dict) -> dict:
+        """调用 compshare 接口并记录耗时与错误指标
+
+        action 为 SDK 方法名，如 describe_comp_share_instance，
+        指标标签使用对应的接口名 DescribeCompShareInstance。
+        调用前经过按接口限流与全局熔断检查，熔断中直接抛出 UCloudUnavailableError。
+        """
+        action_name = "".join(part.capitalize() for part in action.split("_"))
+        self.guard.before_call(action_name)
+        started = time.perf_counter()
+        with tracer.span(
+            f"ucloud {action_name}",
+            SPAN_KIND_CLIENT,
+            **{"ucloud.action": action_name, "ucloud.region": settings.UCLOUD_REGION},
+        ) as span:
+            try:
+                response = getattr(self.client.ucompshare(), action)(payload)
+            except exc.RetCodeException as e:
+                self.guard.after_call(e)
+                metrics.ucloud_call_errors_total.inc(
+                    action=action_name, error=str(e.code)
+                )
+                if span is not None:
+                    span.set_attribute("ucloud.ret_code", e.code)
+                raise
+            except Exception as e:
+                self.guard.after_call(e)
+                metrics.ucloud_call_errors_total.inc(
+                    action=action_name, error=e.__class__.__name__
+                )
+                raise
+            finally:
+                metrics.ucloud_call_duration_seconds.observe(
+                    time.perf_counter() - started, action=action_name
+                )
+            self.guard.after_call()
+            return response
+
+    @property
+    def available(self) -> bool:
+        """熔断中返回 False，后台任务据此跳过本轮"""
+        return not self.guard.breaker.is_open()
+
+    async def _describe(self, instance_id: str) -> dict:
+        """查询单个实例详情（经缓存与 single-flight）"""
+
+        async def fetch() -> dict:
+            describe_resp = await asyncio.to_thread(
+                self._call,
+                "describe_comp_share_instance",
+                {
+                    "UHostIds": [instance_id],
+                },
+            )
+            return describe_resp["UHostSet"][0]
+
+        return await self.describe_cache.get(instance_id, fetch)
+
+    async def _change_state(self, action: str, instance_id: str, payload: dict) -> dict:
+        """调用会改变实例状态的接口，前后使详情缓存失效"""
+        self.describe_cache.invalidate(instance_id)
+        try:
+            return await asyncio.to_thread(self._call, action, payload)
+        finally:
+            self.describe_cache.invalidate(instance_id)
+
     async def create_container(
         self,
         instance_name: str,
@@ -28,6 +135,7 @@ class UCloudService:
 
         创建参数从系统后台配置读取，仅部分底层参数保持固定。
         参考 Ucloud_SDK_example.py 中的创建方式。
+        SDK 调用在线程池中执行，创建任务并发执行时不阻塞事件循环。
         """
         try:
             # 创建容器实例 - 核心规格来自系统配置
@@ -35,8 +143,8 @@ class UCloudService:
                 instance_name=instance_name,
                 create_config=create_config,
             )
-            create_resp = self.client.ucompshare().create_comp_share_instance(
-                create_payload
+            create_resp = await asyncio.to_thread(
+                self._call, "create_comp_share_instance", create_payload
             )
 
             # 获取新创建的实例ID
@@ -46,13 +154,7 @@ class UCloudService:
                 return {"success": False, "error": "创建失败，未返回实例ID"}
 
             # 查询实例详情
-            describe_resp = self.client.ucompshare().describe_comp_share_instance(
-                {
-                    "UHostIds": instance_ids,
-                }
-            )
-
-            data = describe_resp["UHostSet"][0]
+            data = await self._describe(instance_ids[0])
 
             return {
                 "success": True,
@@ -91,23 +193,19 @@ class UCloudService:
     async def start_container(self, instance_id: str) -> dict:
         """启动容器实例"""
         try:
-            start_resp = self.client.ucompshare().start_comp_share_instance(
+            start_resp = await self._change_state(
+                "start_comp_share_instance",
+                instance_id,
                 {
                     "Region": settings.UCLOUD_REGION,
                     "Zone": settings.UCLOUD_ZONE,
                     "UHostId": instance_id,
-                }
+                },
             )
 
             if start_resp:
                 # 获取最新的连接信息
-                describe_resp = self.client.ucompshare().describe_comp_share_instance(
-                    {
-                        "UHostIds": [instance_id],
-                    }
-                )
-
-                data = describe_resp["UHostSet"][0]
+                data = await self._describe(instance_id)
 
                 return {
                     "success": True,
@@ -125,12 +223,14 @@ class UCloudService:
     async def stop_container(self, instance_id: str) -> dict:
         """停止容器实例"""
         try:
-            stop_resp = self.client.ucompshare().stop_comp_share_instance(
+            stop_resp = await self._change_state(
+                "stop_comp_share_instance",
+                instance_id,
                 {
                     "Region": settings.UCLOUD_REGION,
                     "Zone": settings.UCLOUD_ZONE,
                     "UHostId": instance_id,
-                }
+                },
             )
 
             if stop_resp:
@@ -142,14 +242,19 @@ class UCloudService:
             return {"success": False, "error": str(e)}
 
     async def delete_container(self, instance_id: str) -> dict:
-        """删除容器实例"""
+        """删除容器实例
+
+        在线程池中调用 SDK，删除补偿任务可并发删除多个实例而不阻塞事件循环。
+        """
         try:
-            delete_resp = self.client.ucompshare().terminate_comp_share_instance(
+            delete_resp = await self._change_state(
+                "terminate_comp_share_instance",
+                instance_id,
                 {
                     "Region": settings.UCLOUD_REGION,
                     "Zone": settings.UCLOUD_ZONE,
                     "UHostId": instance_id,
-                }
+                },
             )
 
             if delete_resp:
@@ -164,16 +269,27 @@ class UCloudService:
                 return {"success": True, "already_deleted": True}
             return {"success": False, "error": str(e)}
 
-    async def get_instance_info(self, instance_id: str) -> dict:
-        """获取实例信息"""
+    async def rename_container(self, instance_id: str, name: str) -> dict:
+        """修改实例名称"""
         try:
-            describe_resp = self.client.ucompshare().describe_comp_share_instance(
+            await self._change_state(
+                "modify_comp_share_instance_name",
+                instance_id,
                 {
-                    "UHostIds": [instance_id],
-                }
+                    "Region": settings.UCLOUD_REGION,
+                    "Zone": settings.UCLOUD_ZONE,
+                    "UHostId": instance_id,
+                    "Name": name,
+                },
             )
+            return {"success": True}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
 
-            data = describe_resp["UHostSet"][0]
+    async def get_instance_info(self, instance_id: str) -> dict:
+        """获取实例信息（结果短时缓存，同一实例的并发查询合并为一次）"""
+        try:
+            data = await self._describe(instance_id)
 
             return {
                 "success": True,
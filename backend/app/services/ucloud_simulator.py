@@ -0,0 +1,536 @@
+"""本地 UCloud compshare 模拟器
+
+模拟 UCloudService 调用的 compshare 接口（创建/查询/启动/停止/删除/改名），
+维护实例状态，并支持按接口配置延迟分布、错误率、"不存在"响应与缓慢的状态切换，
+用于在本地对创建/启停/扣费流程进行压测与基准测试。
+
+进程内使用：设置 UCLOUD_SIMULATOR=true（可选 UCLOUD_SIMULATOR_CONFIG 指向 JSON 配置），
+UCloudService 会改用 SimulatedClient。
+
+独立运行：
+    python -m app.services.ucloud_simulator --port 18080 --config sim.json
+然后将 UCLOUD_BASE_URL 指向 http://127.0.0.1:18080 即可让真实 SDK 访问模拟器。
+"""
+
+import argparse
+import base64
+import json
+import math
+import random
+import secrets
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qsl
+
+from ucloud.core import exc
+
+ACTION_CREATE = "CreateCompShareInstance"
+ACTION_DESCRIBE = "DescribeCompShareInstance"
+ACTION_START = "StartCompShareInstance"
+ACTION_STOP = "StopCompShareInstance"
+ACTION_TERMINATE = "TerminateCompShareInstance"
+ACTION_RENAME = "ModifyCompShareInstanceName"
+
+SUPPORTED_ACTIONS = (
+    ACTION_CREATE,
+    ACTION_DESCRIBE,
+    ACTION_START,
+    ACTION_STOP,
+    ACTION_TERMINATE,
+    ACTION_RENAME,
+)
+
+# 模拟的返回码
+RET_CODE_NOT_FOUND = 8039
+RET_CODE_STATE_CONFLICT = 8040
+RET_CODE_SERVER_BUSY = 5000
+
+
+@dataclass
+class ActionProfile:
+    """单个接口的延迟与故障配置
+
+    distribution 支持 fixed / uniform / normal / lognormal，
+    mean_ms 为期望延迟，stddev_ms 为离散程度，max_ms 为截断上限。
+    """
+
+    distribution: str = "lognormal"
+    mean_ms: float = 100.0
+    stddev_ms: float = 30.0
+    max_ms: float = 10000.0
+    error_rate: float = 0.0
+    not_found_rate: float = 0.0
+    transport_error_rate: float = 0.0
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """采样一次延迟（秒）"""
+        if self.mean_ms <= 0:
+            return 0.0
+
+        if self.distribution == "fixed":
+            value = self.mean_ms
+        elif self.distribution == "uniform":
+            value = rng.uniform(
+                max(0.0, self.mean_ms - self.stddev_ms), self.mean_ms + self.stddev_ms
+            )
+        elif self.distribution == "normal":
+            value = rng.gauss(self.mean_ms, self.stddev_ms)
+        else:
+            # 对数正态：由期望与标准差换算 mu / sigma
+            variance = self.stddev_ms**2
+            sigma2 = math.log(1 + variance / (self.mean_ms**2))
+            mu = math.log(self.mean_ms) - sigma2 / 2
+            value = rng.lognormvariate(mu, sigma2**0.5)
+
+        return min(max(0.0, value), self.max_ms) / 1000
+
+
+def _default_action_profiles() -> Dict[str, ActionProfile]:
+    return {
+        ACTION_CREATE: ActionProfile(mean_ms=1500, stddev_ms=500),
+        ACTION_DESCRIBE: ActionProfile(mean_ms=120, stddev_ms=40),
+        ACTION_START: ActionProfile(mean_ms=800, stddev_ms=250),
+        ACTION_STOP: ActionProfile(mean_ms=600, stddev_ms=200),
+        ACTION_TERMINATE: ActionProfile(mean_ms=700, stddev_ms=200),
+        ACTION_RENAME: ActionProfile(mean_ms=150, stddev_ms=50),
+    }
+
+
+@dataclass
+class SimulatorConfig:
+    """模拟器配置"""
+
+    actions: Dict[str, ActionProfile] = field(default_factory=_default_action_profiles)
+    # 状态切换耗时（秒）
+    create_seconds: float = 30.0
+    start_seconds: float = 15.0
+    stop_seconds: float = 5.0
+    terminate_seconds: float = 3.0
+    # 删除前是否要求实例已停止（与云端行为一致）
+    terminate_requires_stopped: bool = True
+    # 为 0 时不产生真实等待，便于快速测试
+    time_scale: float = 1.0
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SimulatorConfig":
+        data = dict(data or {})
+        actions = _default_action_profiles()
+        for action, profile in (data.pop("actions", None) or {}).items():
+            base = asdict(actions.get(action, ActionProfile()))
+            base.update(profile)
+            actions[action] = ActionProfile(**base)
+        return cls(actions=actions, **data)
+
+    @classmethod
+    def from_file(cls, path: Optional[str]) -> "SimulatorConfig":
+        if not path:
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def profile(self, action: str) -> ActionProfile:
+        return self.actions.get(action) or ActionProfile()
+
+
+@dataclass
+class SimulatedInstance:
+    """模拟实例"""
+
+    uhost_id: str
+    name: str
+    state: str
+    gpu_type: str
+    cpu: int
+    memory_mb: int
+    image_id: str
+    private_ip: str
+    public_ip: str
+    password: str
+    created_at: float
+    # 进行中的状态切换：到达 transition_at 后切换为 target_state
+    target_state: Optional[str] = None
+    transition_at: float = 0.0
+
+    def to_api(self) -> dict:
+        return {
+            "UHostId": self.uhost_id,
+            "Name": self.name,
+            "State": self.state,
+            "GpuType": self.gpu_type,
+            "CPU": self.cpu,
+            "Memory": self.memory_mb,
+            "CompShareImageId": self.image_id,
+            "IPSet": [
+                {"Type": "Private", "IP": self.private_ip},
+                {"Type": "International", "IP": self.public_ip},
+            ],
+            "Password": base64.b64encode(self.password.encode()).decode(),
+            "CreateTime": int(self.created_at),
+        }
+
+
+class UCloudSimulator:
+    """compshare 接口模拟器（线程安全）"""
+
+    def __init__(self, config: Optional[SimulatorConfig] = None):
+        self.config = config or SimulatorConfig()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._instances: Dict[str, SimulatedInstance] = {}
+        self._ip_counter = 0
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def reseed(self, seed: Optional[int]) -> None:
+        """重新设置随机种子（延迟与故障注入从此可复现）"""
+        with self._lock:
+            self.config.seed = seed
+            self._rng = random.Random(seed)
+
+    # ==================== 公共入口 ====================
+
+    def invoke(self, action: str, args: dict) -> dict:
+        """执行一次接口调用，失败时抛出与 SDK 一致的异常"""
+        profile = self.config.profile(action)
+        with self._lock:
+            latency = profile.sample_latency(self._rng)
+            roll = self._rng.random()
+        self._sleep(latency)
+
+        self._count(action, "calls")
+        if roll < profile.transport_error_rate:
+            self._count(action, "transport_errors")
+            raise exc.HTTPStatusException(503, request_uuid=str(uuid.uuid4()))
+        roll -= profile.transport_error_rate
+        if roll < profile.error_rate:
+            self._count(action, "errors")
+            raise exc.RetCodeException(
+                action, RET_CODE_SERVER_BUSY, "Server busy, please retry later"
+            )
+        roll -= profile.error_rate
+        if roll < profile.not_found_rate:
+            self._count(action, "not_found")
+            raise self._not_found(action, args.get("UHostId") or args.get("UHostIds"))
+
+        handler = {
+            ACTION_CREATE: self._create,
+            ACTION_DESCRIBE: self._describe,
+            ACTION_START: self._start,
+            ACTION_STOP: self._stop,
+            ACTION_TERMINATE: self._terminate,
+            ACTION_RENAME: self._rename,
+        }.get(action)
+        if handler is None:
+            raise exc.RetCodeException(action, 160, f"Action [{action}] not found")
+
+        with self._lock:
+            response = handler(args)
+        response.setdefault("RetCode", 0)
+        response.setdefault("Action", f"{action}Response")
+        return response
+
+    def stats(self) -> dict:
+        """各接口调用统计"""
+        with self._lock:
+            return {
+                "actions": {key: dict(value) for key, value in self._stats.items()},
+                "instances": {
+                    state: sum(
+                        1 for item in self._instances.values() if item.state == state
+                    )
+                    for state in {item.state for item in self._instances.values()}
+                },
+            }
+
+    def list_instances(self) -> list:
+        with self._lock:
+            for instance in self._instances.values():
+                self._advance(instance)
+            return [instance.to_api() for instance in self._instances.values()]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._instances.clear()
+            self._stats.clear()
+
+    # ==================== 内部实现 ====================
+
+    def _sleep(self, seconds: float) -> None:
+        seconds *= self.config.time_scale
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _count(self, action: str, key: str) -> None:
+        with self._lock:
+            bucket = self._stats.setdefault(action, {})
+            bucket[key] = bucket.get(key, 0) + 1
+
+    @staticmethod
+    def _not_found(action: str, instance_id) -> exc.RetCodeException:
+        return exc.RetCodeException(
+            action, RET_CODE_NOT_FOUND, f"UHost [{instance_id}] not found"
+        )
+
+    def _now(self) -> float:
+        return time.monotonic()
+
+    def _transition_delay(self, seconds: float) -> float:
+        return seconds * self.config.time_scale
+
+    def _advance(self, instance: SimulatedInstance) -> None:
+        """推进到期的状态切换"""
+        if instance.target_state and self._now() >= instance.transition_at:
+            instance.state = instance.target_state
+            instance.target_state = None
+
+    def _get_instance(self, action: str, instance_id: str) -> SimulatedInstance:
+        instance = self._instances.get(instance_id)
+        if instance is None:
+            raise self._not_found(action, instance_id)
+        self._advance(instance)
+        if instance.state == "Terminated":
+            raise self._not_found(action, instance_id)
+        return instance
+
+    def _begin_transition(
+        self,
+        instance: SimulatedInstance,
+        transient_state: str,
+        target_state: str,
+        seconds: float,
+    ) -> None:
+        delay = self._transition_delay(seconds)
+        if delay <= 0:
+            instance.state = target_state
+            instance.target_state = None
+            return
+        instance.state = transient_state
+        instance.target_state = target_state
+        instance.transition_at = self._now() + delay
+
+    def _next_ip_pair(self) -> tuple:
+        self._ip_counter += 1
+        high, low = divmod(self._ip_counter, 250)
+        return (
+            f"10.{high // 250}.{high % 250}.{low + 1}",
+            f"106.75.{high % 250}.{low + 1}",
+        )
+
+    def _create(self, args: dict) -> dict:
+        private_ip, public_ip = self._next_ip_pair()
+        instance = SimulatedInstance(
+            uhost_id=f"uhost-sim-{uuid.uuid4().hex[:10]}",
+            name=args.get("Name") or "sim-instance",
+            state="Initializing",
+            gpu_type=args.get("GpuType", ""),
+            cpu=int(args.get("CPU") or 0),
+            memory_mb=int(args.get("Memory") or 0),
+            image_id=args.get("CompShareImageId", ""),
+            private_ip=private_ip,
+            public_ip=public_ip,
+            password=secrets.token_urlsafe(12),
+            created_at=time.time(),
+        )
+        self._begin_transition(
+            instance, "Initializing", "Running", self.config.create_seconds
+        )
+        self._instances[instance.uhost_id] = instance
+        return {"UHostIds": [instance.uhost_id]}
+
+    def _describe(self, args: dict) -> dict:
+        instance_ids = args.get("UHostIds") or []
+        if instance_ids:
+            instances = [
+                self._get_instance(ACTION_DESCRIBE, instance_id)
+                for instance_id in instance_ids
+            ]
+        else:
+            instances = []
+            for instance in self._instances.values():
+                self._advance(instance)
+                if instance.state != "Terminated":
+                    instances.append(instance)
+        return {
+            "TotalCount": len(instances),
+            "UHostSet": [instance.to_api() for instance in instances],
+        }
+
+    def _start(self, args: dict) -> dict:
+        instance = self._get_instance(ACTION_START, args.get("UHostId"))
+        if instance.state != "Stopped":
+            raise exc.RetCodeException(
+                ACTION_START,
+                RET_CODE_STATE_CONFLICT,
+                f"UHost [{instance.uhost_id}] state [{instance.state}] can not start",
+            )
+        self._begin_transition(
+            instance, "Starting", "Running", self.config.start_seconds
+        )
+        return {"UHostId": instance.uhost_id}
+
+    def _stop(self, args: dict) -> dict:
+        instance = self._get_instance(ACTION_STOP, args.get("UHostId"))
+        if instance.state == "Stopped":
+            return {"UHostId": instance.uhost_id}
+        if instance.state not in {"Running", "Initializing"}:
+            raise exc.RetCodeException(
+                ACTION_STOP,
+                RET_CODE_STATE_CONFLICT,
+                f"UHost [{instance.uhost_id}] state [{instance.state}] can not stop",
+            )
+        self._begin_transition(
+            instance, "Stopping", "Stopped", self.config.stop_seconds
+        )
+        return {"UHostId": instance.uhost_id}
+
+    def _terminate(self, args: dict) -> dict:
+        instance = self._get_instance(ACTION_TERMINATE, args.get("UHostId"))
+        if self.config.terminate_requires_stopped and instance.state != "Stopped":
+            raise exc.RetCodeException(
+                ACTION_TERMINATE,
+                RET_CODE_STATE_CONFLICT,
+                f"UHost [{instance.uhost_id}] state [{instance.state}] must be stopped",
+            )
+        self._begin_transition(
+            instance, "Terminating", "Terminated", self.config.terminate_seconds
+        )
+        return {"UHostId": instance.uhost_id}
+
+    def _rename(self, args: dict) -> dict:
+        instance = self._get_instance(ACTION_RENAME, args.get("UHostId"))
+        instance.name = args.get("Name") or instance.name
+        return {"UHostId": instance.uhost_id}
+
+
+class SimulatedUCompShareClient:
+    """与 SDK ucompshare 客户端方法签名一致的模拟实现"""
+
+    def __init__(self, simulator: UCloudSimulator):
+        self.simulator = simulator
+
+    def create_comp_share_instance(self, req: dict = None, **kwargs) -> dict:
+        return self.simulator.invoke(ACTION_CREATE, dict(req or {}, **kwargs))
+
+    def describe_comp_share_instance(self, req: dict = None, **kwargs) -> dict:
+        return self.simulator.invoke(ACTION_DESCRIBE, dict(req or {}, **kwargs))
+
+    def start_comp_share_instance(self, req: dict = None, **kwargs) -> dict:
+        return self.simulator.invoke(ACTION_START, dict(req or {}, **kwargs))
+
+    def stop_comp_share_instance(self, req: dict = None, **kwargs) -> dict:
+        return self.simulator.invoke(ACTION_STOP, dict(req or {}, **kwargs))
+
+    def terminate_comp_share_instance(self, req: dict = None, **kwargs) -> dict:
+        return self.simulator.invoke(ACTION_TERMINATE, dict(req or {}, **kwargs))
+
+    def modify_comp_share_instance_name(self, req: dict = None, **kwargs) -> dict:
+        return self.simulator.invoke(ACTION_RENAME, dict(req or {}, **kwargs))
+
+
+class SimulatedClient:
+    """替代 ucloud.client.Client 的进程内模拟客户端"""
+
+    def __init__(self, simulator: Optional[UCloudSimulator] = None):
+        self.simulator = simulator or UCloudSimulator()
+        self._ucompshare = SimulatedUCompShareClient(self.simulator)
+
+    def ucompshare(self) -> SimulatedUCompShareClient:
+        return self._ucompshare
+
+
+# ==================== 独立 HTTP 服务 ====================
+
+
+def _decode_form(pairs) -> dict:
+    """还原 SDK 展开的表单参数，如 UHostIds.0 / Disks.0.Size"""
+    result: dict = {}
+    for key, value in pairs:
+        parts = key.split(".")
+        node = result
+        for index, part in enumerate(parts):
+            is_last = index == len(parts) - 1
+            if is_last:
+                node[part] = value
+            else:
+                node = node.setdefault(part, {})
+
+    def _normalize(node):
+        if not isinstance(node, dict):
+            return node
+        if node and all(key.isdigit() for key in node):
+            return [_normalize(node[key]) for key in sorted(node, key=int)]
+        return {key: _normalize(value) for key, value in node.items()}
+
+    return _normalize(result)
+
+
+def build_http_handler(simulator: UCloudSimulator):
+    class SimulatorRequestHandler(BaseHTTPRequestHandler):
+        def _write_json(self, status_code: int, payload: dict) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith("/_simulator/stats"):
+                self._write_json(200, simulator.stats())
+            elif self.path.startswith("/_simulator/instances"):
+                self._write_json(200, {"UHostSet": simulator.list_instances()})
+            else:
+                self._write_json(404, {"RetCode": 404, "Message": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            raw_body = self.rfile.read(length).decode("utf-8")
+            if "json" in (self.headers.get("Content-Type") or ""):
+                args = json.loads(raw_body or "{}")
+            else:
+                args = _decode_form(parse_qsl(raw_body, keep_blank_values=True))
+
+            action = args.pop("Action", "")
+            for key in ("Signature", "PublicKey", "Region", "ProjectId"):
+                args.pop(key, None)
+
+            try:
+                self._write_json(200, simulator.invoke(action, args))
+            except exc.RetCodeException as e:
+                self._write_json(200, dict(e.json(), Action=f"{action}Response"))
+            except exc.HTTPStatusException as e:
+                self._write_json(e.status_code, {"RetCode": e.status_code})
+
+        def log_message(self, format, *args):
+            return
+
+    return SimulatorRequestHandler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="UCloud compshare 本地模拟器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--config", default=None, help="模拟器 JSON 配置文件路径")
+    args = parser.parse_args()
+
+    simulator = UCloudSimulator(SimulatorConfig.from_file(args.config))
+    server = ThreadingHTTPServer(
+        (args.host, args.port), build_http_handler(simulator)
+    )
+    print(f"UCloud 模拟器已启动: http://{args.host}:{args.port}")
+    print("将 UCLOUD_BASE_URL 指向该地址即可使用")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
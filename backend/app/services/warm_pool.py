@@ -0,0 +1,339 @@
+"""预创建实例池
+
+为每个套餐保持若干已创建并停止的实例（使用当前配置的镜像）。
+创建云电脑时先尝试从池中领取一台，改名并启动即可交付，省去创建与初始化的等待；
+池为空或启动失败时回退到正常创建。
+
+补充任务周期性推进池内实例状态：
+provisioning（已提交创建）→ 运行后发起停止 → 停止后变为 ready；
+镜像变更、超出目标数量或长时间未就绪的实例转为 retiring 并删除。
+池内实例总数受 WARM_POOL_MAX_INSTANCES 限制。
+关闭实例池（WARM_POOL_ENABLED=false）后补充任务继续运行，直到池内实例全部回收。
+"""
+
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.core.container_configs import FIXED_CONTAINER_CONFIGS
+from app.db.database import AsyncSessionLocal
+from app.models.models import ContainerRecord, WarmPoolInstance
+from app.services.crud_service import config_service
+from app.services.ucloud_service import ucloud_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 领取后未能完成交付（任务中途失败）的实例，超过该时长后回收
+CLAIMED_ORPHAN_SECONDS = 3600
+
+
+def _is_not_found(error: str) -> bool:
+    return "not found" in (error or "").lower() or "不存在" in (error or "")
+
+
+class WarmPoolService:
+    """预创建实例池"""
+
+    @property
+    def enabled(self) -> bool:
+        return settings.WARM_POOL_ENABLED
+
+    @staticmethod
+    def targets() -> Dict[str, int]:
+        """各套餐的目标池大小"""
+        return {
+            item["config_code"]: max(
+                0,
+                settings.WARM_POOL_SIZES.get(
+                    item["config_code"], settings.WARM_POOL_DEFAULT_SIZE
+                ),
+            )
+            for item in FIXED_CONTAINER_CONFIGS
+        }
+
+    # ==================== 领取 ====================
+
+    async def claim_and_start(
+        self, db: AsyncSession, create_config: dict, instance_name: str
+    ) -> Optional[dict]:
+        """领取并启动一台预创建实例
+
+        返回与 ucloud_service.create_container 相同结构的结果（附带 warm_pool_id），
+        池为空或启动失败时返回 None，由调用方回退到正常创建。
+        """
+        config_code = create_config["config_code"]
+        instance = await self._claim(db, config_code, create_config["comp_share_image_id"])
+        if instance is None:
+            metrics.warm_pool_claims_total.inc(config_code=config_code, result="miss")
+            return None
+
+        rename_result = await ucloud_service.rename_container(
+            instance.ucloud_instance_id, instance_name
+        )
+        if not rename_result["success"]:
+            logger.warning(
+                "预创建实例 %s 改名失败: %s",
+                instance.ucloud_instance_id,
+                rename_result.get("error"),
+            )
+
+        start_result = await ucloud_service.start_container(instance.ucloud_instance_id)
+        if not start_result["success"]:
+            logger.warning(
+                "预创建实例 %s 启动失败，回退到新建: %s",
+                instance.ucloud_instance_id,
+                start_result.get("error"),
+            )
+            instance.status = "retiring"
+            await db.commit()
+            metrics.warm_pool_claims_total.inc(config_code=config_code, result="failed")
+            return None
+
+        metrics.warm_pool_claims_total.inc(config_code=config_code, result="hit")
+        return {
+            "success": True,
+            "instance_id": instance.ucloud_instance_id,
+            "ip": start_result["ip"],
+            "password": start_result["password"],
+            "warm_pool_id": instance.id,
+        }
+
+    @staticmethod
+    async def _claim(
+        db: AsyncSession, config_code: str, image_id: str
+    ) -> Optional[WarmPoolInstance]:
+        """以条件更新原子领取一台就绪实例（并发领取同一台时重试）"""
+        for _ in range(3):
+            result = await db.execute(
+                select(WarmPoolInstance)
+                .where(
+                    and_(
+                        WarmPoolInstance.config_code == config_code,
+                        WarmPoolInstance.comp_share_image_id == image_id,
+                        WarmPoolInstance.status == "ready",
+                    )
+                )
+                .order_by(WarmPoolInstance.ready_at.asc(), WarmPoolInstance.id.asc())
+                .limit(1)
+            )
+            instance = result.scalar_one_or_none()
+            if instance is None:
+                return None
+
+            claimed = await db.execute(
+                update(WarmPoolInstance)
+                .where(
+                    and_(
+                        WarmPoolInstance.id == instance.id,
+                        WarmPoolInstance.status == "ready",
+                    )
+                )
+                .values(status="claimed", claimed_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            if claimed.rowcount:
+                await db.refresh(instance)
+                return instance
+        return None
+
+    @staticmethod
+    async def finish_claim(db: AsyncSession, warm_pool_id: int) -> None:
+        """实例已交付给用户，移出实例池（不提交）"""
+        instance = await db.get(WarmPoolInstance, warm_pool_id)
+        if instance is not None:
+            await db.delete(instance)
+
+    # ==================== 补充 ====================
+
+    async def refill(self) -> None:
+        """推进池内实例状态、回收多余实例并按缺口补充新实例
+
+        实例池关闭后目标数量为 0，池内剩余实例逐步回收。
+        """
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(WarmPoolInstance))
+            instances = result.scalars().all()
+            if not self.enabled and not instances:
+                return
+            if not ucloud_service.available:
+                logger.info("UCloud 熔断中，跳过本轮实例池补充")
+                return
+            configs = await config_service.get_all_configs(db)
+            image_id = configs["comp_share_image_id"]
+            targets = self.targets() if self.enabled else {}
+
+            await self._advance_provisioning(db, instances)
+            await self._mark_retiring(db, instances, targets, image_id)
+            await self._retire(db, instances)
+            await db.commit()
+
+            active = [item for item in instances if item.status in ("provisioning", "ready")]
+            await self._provision(db, active, targets)
+            await db.commit()
+
+            result = await db.execute(select(WarmPoolInstance))
+            self._observe(result.scalars().all())
+
+    async def _advance_provisioning(
+        self, db: AsyncSession, instances: List[WarmPoolInstance]
+    ) -> None:
+        timeout_at = datetime.utcnow() - timedelta(
+            seconds=settings.WARM_POOL_PROVISION_TIMEOUT_SECONDS
+        )
+        for instance in instances:
+            if instance.status != "provisioning":
+                continue
+
+            info = await ucloud_service.get_instance_info(instance.ucloud_instance_id)
+            if not info["success"]:
+                if _is_not_found(info.get("error")):
+                    await db.delete(instance)
+                    instance.status = "deleted"
+                continue
+
+            if info["status"] == "Stopped":
+                instance.status = "ready"
+                instance.ready_at = datetime.utcnow()
+                instance.connection_host = info["ip"]
+                instance.connection_password = info["password"]
+            elif info["status"] == "Running":
+                # 创建完成后自动运行，停止后再放入池中，避免闲置计费
+                await ucloud_service.stop_container(instance.ucloud_instance_id)
+            elif instance.created_at and instance.created_at.replace(tzinfo=None) < timeout_at:
+                logger.warning(
+                    "预创建实例 %s 长时间未就绪（%s），回收",
+                    instance.ucloud_instance_id,
+                    info["status"],
+                )
+                instance.status = "retiring"
+
+    @staticmethod
+    async def _mark_retiring(
+        db: AsyncSession,
+        instances: List[WarmPoolInstance],
+        targets: Dict[str, int],
+        image_id: str,
+    ) -> None:
+        """镜像已变更或超出目标数量的就绪实例转为待回收"""
+        kept = Counter()
+        for instance in sorted(instances, key=lambda item: item.id):
+            if instance.status != "ready":
+                continue
+            if (
+                instance.comp_share_image_id != image_id
+                or kept[instance.config_code] >= targets.get(instance.config_code, 0)
+            ):
+                instance.status = "retiring"
+            else:
+                kept[instance.config_code] += 1
+
+        # 领取后长时间未交付的实例：若未被任何容器记录引用则回收
+        orphan_at = datetime.utcnow() - timedelta(seconds=CLAIMED_ORPHAN_SECONDS)
+        for instance in instances:
+            if (
+                instance.status == "claimed"
+                and instance.claimed_at
+                and instance.claimed_at.replace(tzinfo=None) < orphan_at
+            ):
+                owner = await db.execute(
+                    select(ContainerRecord.id).where(
+                        ContainerRecord.ucloud_instance_id == instance.ucloud_instance_id
+                    )
+                )
+                if owner.first():
+                    await db.delete(instance)
+                    instance.status = "deleted"
+                else:
+                    instance.status = "retiring"
+
+    @staticmethod
+    async def _retire(db: AsyncSession, instances: List[WarmPoolInstance]) -> None:
+        for instance in instances:
+            if instance.status != "retiring":
+                continue
+            result = await ucloud_service.delete_container(instance.ucloud_instance_id)
+            if result["success"]:
+                await db.delete(instance)
+                instance.status = "deleted"
+                continue
+            # 运行中的实例需先停止才能删除，下一轮再试
+            await ucloud_service.stop_container(instance.ucloud_instance_id)
+
+    async def _provision(
+        self,
+        db: AsyncSession,
+        active: List[WarmPoolInstance],
+        targets: Dict[str, int],
+    ) -> None:
+        counts = Counter(item.config_code for item in active)
+        budget = min(
+            settings.WARM_POOL_REFILL_BATCH,
+            settings.WARM_POOL_MAX_INSTANCES - len(active),
+        )
+        plan = []
+        # 轮流为各套餐补充，避免预算被单个套餐占满
+        while budget > 0:
+            progressed = False
+            for config_code, target in targets.items():
+                if budget > 0 and counts[config_code] < target:
+                    plan.append(config_code)
+                    counts[config_code] += 1
+                    budget -= 1
+                    progressed = True
+            if not progressed:
+                break
+        if not plan:
+            return
+
+        # 会话不能并发使用，先读取配置，再并发提交创建
+        create_configs = {
+            code: await config_service.get_container_create_config(db, code)
+            for code in set(plan)
+        }
+
+        async def provision_one(config_code: str) -> Optional[WarmPoolInstance]:
+            create_config = create_configs[config_code]
+            result = await ucloud_service.create_container(
+                instance_name=f"warm-{config_code}-{uuid.uuid4().hex[:8]}",
+                create_config=create_config,
+            )
+            if not result["success"]:
+                logger.warning("预创建实例创建失败 %s: %s", config_code, result.get("error"))
+                return None
+            metrics.warm_pool_provisioned_total.inc(config_code=config_code)
+            return WarmPoolInstance(
+                config_code=config_code,
+                comp_share_image_id=create_config["comp_share_image_id"],
+                ucloud_instance_id=result["instance_id"],
+                status="provisioning",
+            )
+
+        created = await asyncio.gather(*(provision_one(code) for code in plan))
+        for instance in created:
+            if instance is not None:
+                db.add(instance)
+
+    @staticmethod
+    def _observe(instances: List[WarmPoolInstance]) -> None:
+        counts = Counter((item.config_code, item.status) for item in instances)
+        for item in FIXED_CONTAINER_CONFIGS:
+            for status in ("provisioning", "ready", "claimed", "retiring"):
+                metrics.warm_pool_instances.set(
+                    counts.get((item["config_code"], status), 0),
+                    config_code=item["config_code"],
+                    status=status,
+                )
+
+
+# 全局预创建实例池
+warm_pool_service = WarmPoolService()
@@ -0,0 +1,242 @@
+"""定时任务执行监控
+
+记录每个定时任务最近的执行历史（耗时、结果），单次执行超出调度间隔时告警，
+并统计因上次仍在执行或错过执行时间而被跳过的次数，供 `/admin/scheduler` 查看。
+定时任务运行在独立进程（run_scheduler.py）时，状态快照写入 SCHEDULER_STATUS_FILE，
+由 API 进程读取。
+
+配置了最大退避间隔的任务（删除补偿任务）在上次执行未结束或执行超时时
+自动将调度间隔翻倍，恢复正常后回到基础间隔。
+"""
+
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Deque, Dict, Optional
+
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
+from apscheduler.triggers.interval import IntervalTrigger
+
+from app.core import metrics
+from app.core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class JobRun:
+    started_at: datetime
+    duration: float
+    success: bool
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 2),
+            "success": self.success,
+            "error": self.error,
+        }
+
+
+@dataclass
+class JobStats:
+    job_id: str
+    name: str
+    base_interval: float
+    # 为 None 时不退避
+    max_interval: Optional[float] = None
+    interval: float = 0.0
+    history: Deque[JobRun] = field(
+        default_factory=lambda: deque(maxlen=settings.SCHEDULER_HISTORY_SIZE)
+    )
+    running_since: Optional[datetime] = None
+    runs: int = 0
+    failures: int = 0
+    overruns: int = 0
+    skipped_running: int = 0
+    skipped_missed: int = 0
+
+    def __post_init__(self):
+        self.interval = self.base_interval
+
+    def to_dict(self, next_run_time: Optional[datetime] = None) -> dict:
+        durations = sorted(run.duration for run in self.history)
+        last_run = self.history[-1] if self.history else None
+        return {
+            "job_id": self.job_id,
+            "name": self.name,
+            "base_interval_seconds": self.base_interval,
+            "interval_seconds": self.interval,
+            "backed_off": self.interval > self.base_interval,
+            "running": self.running_since is not None,
+            "running_since": self.running_since.isoformat() if self.running_since else None,
+            "next_run_time": next_run_time.isoformat() if next_run_time else None,
+            "runs": self.runs,
+            "failures": self.failures,
+            "overruns": self.overruns,
+            "skipped_running": self.skipped_running,
+            "skipped_missed": self.skipped_missed,
+            "last_run": last_run.to_dict() if last_run else None,
+            "avg_duration_ms": (
+                round(sum(durations) / len(durations) * 1000, 2) if durations else None
+            ),
+            "max_duration_ms": round(durations[-1] * 1000, 2) if durations else None,
+            "history": [run.to_dict() for run in reversed(self.history)],
+        }
+
+
+class JobMonitor:
+    """定时任务执行监控"""
+
+    def __init__(self):
+        self.jobs: Dict[str, JobStats] = {}
+        self.scheduler = None
+        self.status_file: Optional[str] = None
+
+    def attach(self, scheduler, status_file: Optional[str] = None) -> None:
+        """监听调度器的跳过事件（上次仍在执行 / 错过执行时间）
+
+        指定 status_file 时，每次任务开始、结束或跳过后写入状态快照。
+        """
+        self.scheduler = scheduler
+        self.status_file = status_file
+        scheduler.add_listener(self._on_skipped, EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED)
+
+    def register(
+        self,
+        job_id: str,
+        name: str,
+        interval_seconds: float,
+        max_interval_seconds: Optional[float] = None,
+    ) -> JobStats:
+        stats = JobStats(
+            job_id=job_id,
+            name=name,
+            base_interval=interval_seconds,
+            max_interval=max_interval_seconds,
+        )
+        self.jobs[job_id] = stats
+        return stats
+
+    @asynccontextmanager
+    async def track(self, job_id: str):
+        """记录一次任务执行
+
+        任务抛出的异常在此记录日志并计为失败，不再向调度器抛出。
+        """
+        stats = self.jobs[job_id]
+        stats.running_since = datetime.utcnow()
+        metrics.scheduler_job_running.set(1, job=job_id)
+        self.save_status()
+        started = time.perf_counter()
+        run = JobRun(started_at=stats.running_since, duration=0.0, success=True)
+        try:
+            yield run
+        except Exception as e:
+            run.success = False
+            run.error = f"{e.__class__.__name__}: {e}"[:500]
+            logger.exception("定时任务 %s 执行失败: %s", stats.name, e)
+        finally:
+            run.duration = time.perf_counter() - started
+            stats.running_since = None
+            metrics.scheduler_job_running.set(0, job=job_id)
+            self._finish(stats, run)
+            self.save_status()
+
+    def _finish(self, stats: JobStats, run: JobRun) -> None:
+        stats.history.append(run)
+        stats.runs += 1
+        if not run.success:
+            stats.failures += 1
+
+        if run.duration > stats.interval:
+            stats.overruns += 1
+            metrics.scheduler_job_overruns_total.inc(job=stats.job_id)
+            logger.warning(
+                "定时任务 %s 执行耗时 %.1fs，超出调度间隔 %ss",
+                stats.job_id,
+                run.duration,
+                stats.interval,
+            )
+            self._back_off(stats)
+        elif stats.interval > stats.base_interval and run.duration < stats.base_interval / 2:
+            # 已恢复正常，回到基础间隔
+            self._reschedule(stats, stats.base_interval)
+
+    def _on_skipped(self, event) -> None:
+        stats = self.jobs.get(event.job_id)
+        if stats is None:
+            return
+        if event.code == EVENT_JOB_MAX_INSTANCES:
+            stats.skipped_running += 1
+            metrics.scheduler_job_skipped_total.inc(job=event.job_id, reason="running")
+            logger.warning("定时任务 %s 上次执行尚未结束，本次跳过", event.job_id)
+            self._back_off(stats)
+        else:
+            stats.skipped_missed += 1
+            metrics.scheduler_job_skipped_total.inc(job=event.job_id, reason="missed")
+            logger.warning("定时任务 %s 错过执行时间，本次跳过", event.job_id)
+        self.save_status()
+
+    def _back_off(self, stats: JobStats) -> None:
+        if stats.max_interval is None or stats.interval >= stats.max_interval:
+            return
+        self._reschedule(stats, min(stats.interval * 2, stats.max_interval))
+
+    def _reschedule(self, stats: JobStats, interval: float) -> None:
+        if self.scheduler is None or self.scheduler.get_job(stats.job_id) is None:
+            return
+        logger.info(
+            "定时任务 %s 调度间隔调整为 %ss（基础间隔 %ss）",
+            stats.job_id,
+            interval,
+            stats.base_interval,
+        )
+        stats.interval = interval
+        self.scheduler.reschedule_job(stats.job_id, trigger=IntervalTrigger(seconds=interval))
+
+    def status(self) -> list:
+        jobs = []
+        for job_id, stats in self.jobs.items():
+            job = self.scheduler.get_job(job_id) if self.scheduler else None
+            jobs.append(stats.to_dict(job.next_run_time if job else None))
+        return jobs
+
+    def save_status(self) -> None:
+        """写入状态快照（先写临时文件再替换，读取方不会读到半个文件）"""
+        if not self.status_file:
+            return
+        snapshot = {
+            "pid": os.getpid(),
+            "updated_at": datetime.utcnow().isoformat(),
+            "jobs": self.status(),
+        }
+        temp_path = f"{self.status_file}.{os.getpid()}.tmp"
+        try:
+            directory = os.path.dirname(os.path.abspath(self.status_file))
+            os.makedirs(directory, exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(temp_path, self.status_file)
+        except OSError as e:
+            logger.warning("写入定时任务状态快照失败: %s", e)
+
+    @staticmethod
+    def load_status(status_file: str) -> Optional[dict]:
+        """读取其他进程写入的状态快照，不存在时返回 None"""
+        try:
+            with open(status_file, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+# 全局定时任务监控
+job_monitor = JobMonitor()
@@ -1,30 +1,77 @@
+import asyncio
 import logging
+import os
+import time
 from datetime import datetime
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 
+from app.core import metrics
+from app.core.config import get_settings
+from app.core.profiler import request_profiler
 from app.db.database import AsyncSessionLocal
 from app.services.crud_service import (
     container_service,
     user_service,
     config_service,
     admin_service,
+    billing_summary_service,
 )
 from app.services.ucloud_service import ucloud_service
+from app.services.session_meter import session_meter
+from app.services.archive_service import archive_service
+from app.services.idempotency import idempotency_service
+from app.services.warm_pool import warm_pool_service
+from app.tasks.job_monitor import job_monitor
 from app.models.models import (
     BillingChargeRecord,
     ContainerLog,
 )
 
-scheduler = AsyncIOScheduler()
+try:
+    import fcntl
+except ImportError:  # Windows 无 fcntl，不做进程锁
+    fcntl = None
+
+settings = get_settings()
+
+# 所有任务同一时间只运行一个实例；错过的多次执行合并为一次，
+# 超过宽限时间仍未执行则跳过（由 job_monitor 记录）
+scheduler = AsyncIOScheduler(
+    job_defaults={"max_instances": 1, "coalesce": True}
+)
 logger = logging.getLogger(__name__)
 
+CHARGE_JOB_ID = "charge_task"
+CHARGE_JOB_INTERVAL_SECONDS = 60
+DELETION_JOB_ID = "pending_delete_task"
+DELETION_JOB_INTERVAL_SECONDS = 10
+WARM_POOL_JOB_ID = "warm_pool_task"
+IDEMPOTENCY_CLEANUP_JOB_ID = "idempotency_cleanup_task"
+IDEMPOTENCY_CLEANUP_INTERVAL_SECONDS = 3600
+ARCHIVE_JOB_ID = "archive_task"
+
+# 持有期间其他进程无法再启动调度器
+_scheduler_lock = None
+
 
 async def charge_running_containers():
     """每分钟扣费任务
 
     扣费逻辑：从用户所属的管理员余额中扣除费用
     """
+    async with job_monitor.track(CHARGE_JOB_ID):
+        if request_profiler.should_profile_billing():
+            async with request_profiler.profile("billing_tick"):
+                await _charge_running_containers()
+            return
+
+        await _charge_running_containers()
+
+
+async def _charge_running_containers():
+    started = time.perf_counter()
     async with AsyncSessionLocal() as db:
         try:
             # 获取所有运行中的容器
@@ -69,6 +116,8 @@ async def charge_running_containers():
                         )
                         db.add(log)
                         await db.commit()
+                        session_meter.remove(user.id)
+                        metrics.billing_auto_stops_total.inc()
 
                     continue
 
@@ -82,11 +131,18 @@ async def charge_running_containers():
                 new_user_balance = old_user_balance - container.price_per_minute
                 user.balance = new_user_balance
 
+                # 同一事务内更新用户/代理扣费汇总
+                # 须先于写入扣费记录，首次回填汇总时才不会重复计入本次扣费
+                charge_minute = datetime.utcnow().replace(second=0, microsecond=0)
+                await billing_summary_service.record_charge(
+                    db, user, container.price_per_minute, charge_minute
+                )
+
                 # 创建扣费记录
                 charge_record = BillingChargeRecord(
                     user_id=user.id,
                     container_id=container.id,
-                    charge_minute=datetime.utcnow().replace(second=0, microsecond=0),
+                    charge_minute=charge_minute,
                     price_per_minute=container.price_per_minute,
                     amount=container.price_per_minute,
                     balance_before=old_user_balance,
@@ -99,77 +155,261 @@ async def charge_running_containers():
                 container.total_cost += max(0.0, container.price_per_minute)
 
                 await db.commit()
+                session_meter.update_balance(user.id, new_user_balance)
+                metrics.billing_containers_charged_total.inc()
 
-        except Exception as e:
-            print(f"扣费任务执行失败: {e}")
+        except Exception:
+            metrics.billing_tick_failures_total.inc()
             await db.rollback()
+            raise
+        finally:
+            metrics.billing_tick_duration_seconds.observe(time.perf_counter() - started)
 
 
 async def process_pending_container_deletions():
     """后台推进删除中的容器任务"""
+    async with job_monitor.track(DELETION_JOB_ID):
+        await _process_pending_container_deletions()
+
+
+async def refill_warm_pool():
+    """推进并补充预创建实例池"""
+    async with job_monitor.track(WARM_POOL_JOB_ID):
+        await warm_pool_service.refill()
+
+
+async def purge_expired_idempotency_records():
+    """清理过期的幂等键记录"""
+    async with job_monitor.track(IDEMPOTENCY_CLEANUP_JOB_ID):
+        async with AsyncSessionLocal() as db:
+            deleted = await idempotency_service.purge_expired(db)
+        if deleted:
+            logger.info("已清理过期幂等键记录 %s 条", deleted)
+
+
+async def archive_old_records():
+    """归档超过保留天数的日志与扣费记录"""
+    async with job_monitor.track(ARCHIVE_JOB_ID):
+        results = await archive_service.archive()
+        archived = sum(item["archived"] for item in results)
+        if archived:
+            logger.info("历史记录归档完成，共 %s 个分区 %s 行", len(results), archived)
+
+
+async def _process_pending_container_deletions():
+    if not ucloud_service.available:
+        # 熔断期间跳过本轮，不消耗各容器的重试次数
+        logger.info("UCloud 熔断中，跳过本轮删除补偿")
+        return
+
+    started = time.perf_counter()
     async with AsyncSessionLocal() as db:
         try:
-            deleting_containers = await container_service.list_by_status(db, "deleting")
+            now = datetime.utcnow()
+            containers = await container_service.list_due_deletions(
+                db, now, settings.DELETION_BATCH_SIZE
+            )
 
-            for container in deleting_containers:
-                user = await user_service.get_by_id(db, container.user_id)
-                if not user:
-                    continue
+            # 并发调用云端删除（数量受限），数据库写入在全部返回后统一进行
+            semaphore = asyncio.Semaphore(settings.DELETION_CONCURRENCY)
 
-                result = await ucloud_service.delete_container(
-                    container.ucloud_instance_id
-                )
+            async def delete_instance(container):
+                async with semaphore:
+                    return await ucloud_service.delete_container(
+                        container.ucloud_instance_id
+                    )
+
+            results = await asyncio.gather(
+                *(delete_instance(container) for container in containers)
+            )
+
+            succeeded = [
+                container
+                for container, result in zip(containers, results)
+                if result["success"]
+            ]
+            users = await user_service.get_by_ids(
+                db, [container.user_id for container in succeeded]
+            )
+
+            finished_at = datetime.utcnow()
+            for container, result in zip(containers, results):
                 if not result["success"]:
+                    container_service.record_delete_failure(
+                        container, result.get("error"), finished_at
+                    )
                     logger.warning(
-                        "容器 %s 删除仍在处理中: %s",
+                        "容器 %s 删除失败（第 %s 次），%s 后重试: %s",
                         container.ucloud_instance_id,
-                        result.get("error", "未知错误"),
+                        container.delete_attempts,
+                        container.next_delete_attempt_at.isoformat(timespec="seconds"),
+                        container.last_delete_error,
                     )
                     continue
 
-                await container_service.delete(db, container)
-                user.current_container_id = None
-                await db.commit()
-                await user_service.clear_container_operation(db, user, "deleting")
-
-                log = ContainerLog(
-                    user_id=user.id,
-                    admin_id=user.admin_id,
-                    container_id=container.id,
-                    action="delete",
-                    action_status="success",
-                    error_message="后台自动完成删除任务",
+                container.deleted_at = finished_at
+                container.status = "deleted"
+                container.next_delete_attempt_at = None
+                user = users.get(container.user_id)
+                if not user:
+                    continue
+                if user.current_container_id == container.id:
+                    user.current_container_id = None
+                if user.container_operation_status == "deleting":
+                    user.container_operation_status = None
+                    user.container_operation_started_at = None
+                db.add(
+                    ContainerLog(
+                        user_id=user.id,
+                        admin_id=user.admin_id,
+                        container_id=container.id,
+                        action="delete",
+                        action_status="success",
+                        error_message="后台自动完成删除任务",
+                    )
                 )
-                db.add(log)
-                await db.commit()
 
-        except Exception as e:
-            logger.exception("删除补偿任务执行失败: %s", e)
+            # 本轮所有结果一次提交
+            await db.commit()
+            metrics.container_deletion_attempts_total.inc(len(succeeded), result="success")
+            metrics.container_deletion_attempts_total.inc(
+                len(containers) - len(succeeded), result="failure"
+            )
+
+            backlog = await container_service.get_deletion_backlog(db, datetime.utcnow())
+            metrics.container_deletion_backlog.set(backlog["total"])
+            metrics.container_deletion_due.set(backlog["due"])
+            oldest = backlog["oldest_requested_at"]
+            metrics.container_deletion_oldest_age_seconds.set(
+                max(0.0, (datetime.utcnow() - oldest.replace(tzinfo=None)).total_seconds())
+                if oldest
+                else 0
+            )
+
+        except Exception:
             await db.rollback()
+            raise
+        finally:
+            metrics.container_deletion_tick_duration_seconds.observe(
+                time.perf_counter() - started
+            )
+
+
+def _acquire_scheduler_lock() -> bool:
+    """获取调度器进程锁，同一台机器上已有调度器在运行时返回 False"""
+    global _scheduler_lock
+    if fcntl is None:
+        return True
+
+    path = settings.SCHEDULER_LOCK_FILE
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    lock = open(path, "a+")
+    try:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return False
+    lock.seek(0)
+    lock.truncate()
+    lock.write(str(os.getpid()))
+    lock.flush()
+    _scheduler_lock = lock
+    return True
+
+
+def _release_scheduler_lock() -> None:
+    global _scheduler_lock
+    if _scheduler_lock is not None:
+        _scheduler_lock.close()
+        _scheduler_lock = None
+
 
+def start_scheduler(status_file: str = None) -> bool:
+    """启动定时任务
 
-def start_scheduler():
-    """启动定时任务"""
-    # 每分钟执行一次扣费任务
+    同一台机器上已有调度器在运行（如独立的 run_scheduler.py 进程）时不启动，返回 False，
+    保证扣费等任务只执行一次。status_file 用于向其他进程发布任务状态。
+    """
+    if not _acquire_scheduler_lock():
+        logger.error(
+            "已有定时任务进程在运行（锁文件 %s），本进程不启动定时任务",
+            settings.SCHEDULER_LOCK_FILE,
+        )
+        return False
+    job_monitor.attach(scheduler, status_file)
+
+    # 每分钟执行一次扣费任务；延迟超过半个周期的执行直接跳过，由下一分钟补上
+    job_monitor.register(CHARGE_JOB_ID, "每分钟扣费任务", CHARGE_JOB_INTERVAL_SECONDS)
     scheduler.add_job(
         charge_running_containers,
-        trigger=IntervalTrigger(minutes=1),
-        id="charge_task",
+        trigger=IntervalTrigger(seconds=CHARGE_JOB_INTERVAL_SECONDS),
+        id=CHARGE_JOB_ID,
         name="每分钟扣费任务",
+        misfire_grace_time=CHARGE_JOB_INTERVAL_SECONDS // 2,
         replace_existing=True,
     )
+
+    # 删除补偿任务在上次仍在执行或执行超时时自动退避
+    job_monitor.register(
+        DELETION_JOB_ID,
+        "待删除容器补偿任务",
+        DELETION_JOB_INTERVAL_SECONDS,
+        max_interval_seconds=settings.DELETION_JOB_MAX_INTERVAL_SECONDS,
+    )
     scheduler.add_job(
         process_pending_container_deletions,
-        trigger=IntervalTrigger(seconds=10),
-        id="pending_delete_task",
+        trigger=IntervalTrigger(seconds=DELETION_JOB_INTERVAL_SECONDS),
+        id=DELETION_JOB_ID,
         name="待删除容器补偿任务",
+        misfire_grace_time=DELETION_JOB_INTERVAL_SECONDS // 2,
+        replace_existing=True,
+    )
+
+    job_monitor.register(
+        IDEMPOTENCY_CLEANUP_JOB_ID, "幂等键记录清理任务", IDEMPOTENCY_CLEANUP_INTERVAL_SECONDS
+    )
+    scheduler.add_job(
+        purge_expired_idempotency_records,
+        trigger=IntervalTrigger(seconds=IDEMPOTENCY_CLEANUP_INTERVAL_SECONDS),
+        id=IDEMPOTENCY_CLEANUP_JOB_ID,
+        name="幂等键记录清理任务",
+        misfire_grace_time=IDEMPOTENCY_CLEANUP_INTERVAL_SECONDS // 2,
+        replace_existing=True,
+    )
+
+    if settings.ARCHIVE_ENABLED:
+        # 每天执行一次，在业务低峰的 ARCHIVE_RUN_HOUR 点（UTC）
+        job_monitor.register(ARCHIVE_JOB_ID, "历史记录归档任务", 86400)
+        scheduler.add_job(
+            archive_old_records,
+            trigger=CronTrigger(hour=settings.ARCHIVE_RUN_HOUR, timezone="UTC"),
+            id=ARCHIVE_JOB_ID,
+            name="历史记录归档任务",
+            misfire_grace_time=3600,
+            replace_existing=True,
+        )
+
+    # 关闭实例池后仍需运行，回收池内剩余实例；池为空时直接返回
+    interval = settings.WARM_POOL_REFILL_INTERVAL_SECONDS
+    job_monitor.register(WARM_POOL_JOB_ID, "预创建实例池补充任务", interval)
+    scheduler.add_job(
+        refill_warm_pool,
+        trigger=IntervalTrigger(seconds=interval),
+        id=WARM_POOL_JOB_ID,
+        name="预创建实例池补充任务",
+        misfire_grace_time=max(1, interval // 2),
         replace_existing=True,
     )
     scheduler.start()
-    print("定时任务已启动")
+    job_monitor.save_status()
+    logger.info("定时任务已启动")
+    return True
 
 
 def shutdown_scheduler():
     """关闭定时任务"""
+    if not scheduler.running:
+        return
     scheduler.shutdown()
-    print("定时任务已关闭")
+    _release_scheduler_lock()
+    logger.info("定时任务已关闭")
@@ -0,0 +1,103 @@
+"""历史记录归档运维脚本
+
+用法（在 backend 目录下）：
+    python archive_data.py run [--table balance_log] [--older-than-days 180] [--dry-run] [--vacuum]
+    python archive_data.py list [--table balance_log] [--start 2025-01-01] [--end 2025-01-31]
+    python archive_data.py verify [--table balance_log]
+    python archive_data.py read --table balance_log --start 2025-01-01 --end 2025-01-31 [--limit 20]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import date
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+
+from app.db.database import engine, init_db
+from app.services.archive_service import ARCHIVE_TABLES, archive_service
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="云电脑容器管理系统 - 历史记录归档")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="归档超过保留天数的记录并从数据库删除")
+    run_parser.add_argument("--table", action="append", choices=list(ARCHIVE_TABLES))
+    run_parser.add_argument("--older-than-days", type=int, help="覆盖配置的保留天数")
+    run_parser.add_argument("--dry-run", action="store_true", help="只统计待归档行数")
+    run_parser.add_argument("--vacuum", action="store_true", help="完成后执行 VACUUM 回收空间")
+
+    list_parser = subparsers.add_parser("list", help="列出已归档分区")
+    list_parser.add_argument("--table", choices=list(ARCHIVE_TABLES))
+    list_parser.add_argument("--start", type=date.fromisoformat)
+    list_parser.add_argument("--end", type=date.fromisoformat)
+
+    verify_parser = subparsers.add_parser("verify", help="核对归档文件摘要与汇总")
+    verify_parser.add_argument("--table", choices=list(ARCHIVE_TABLES))
+
+    read_parser = subparsers.add_parser("read", help="按日期范围读取归档记录（NDJSON 输出）")
+    read_parser.add_argument("--table", required=True, choices=list(ARCHIVE_TABLES))
+    read_parser.add_argument("--start", type=date.fromisoformat)
+    read_parser.add_argument("--end", type=date.fromisoformat)
+    read_parser.add_argument("--limit", type=int, default=0, help="最多输出行数，0 为不限")
+    return parser.parse_args()
+
+
+async def run(args) -> None:
+    await init_db()
+    results = await archive_service.archive(
+        tables=args.table,
+        older_than_days=args.older_than_days,
+        dry_run=args.dry_run,
+    )
+    print(f"{'table':<24} {'day':<12} {'archived':>10} {'resumed':>8} {'deleted':>10}")
+    for item in results:
+        print(
+            f"{item['table']:<24} {item['day']:<12} {item['archived']:>10} "
+            f"{item['resumed']:>8} {item['deleted']:>10}"
+        )
+    print(f"\n共 {len(results)} 个分区，{'待归档' if args.dry_run else '已归档'} "
+          f"{sum(item['archived'] for item in results)} 行")
+
+    if args.vacuum and not args.dry_run:
+        print("执行 VACUUM ...")
+        async with engine.connect() as conn:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text("VACUUM"))
+
+
+async def main():
+    args = parse_args()
+    if args.command == "run":
+        await run(args)
+    elif args.command == "list":
+        for item in archive_service.list_partitions(args.table, args.start, args.end):
+            print(
+                f"{item['table']:<24} {item['day']:<12} {item['rollup']['rows']:>10} "
+                f"{item['size_bytes']:>12}  {item['path']}"
+            )
+    elif args.command == "verify":
+        problems = await archive_service.verify(args.table)
+        for problem in problems:
+            print(f"[异常] {problem['file']}: {problem['error']}")
+        print("全部归档文件核对通过" if not problems else f"发现 {len(problems)} 个异常")
+        if problems:
+            sys.exit(1)
+    elif args.command == "read":
+        printed = 0
+        async for batch in archive_service.iter_rows(args.table, args.start, args.end):
+            for row in batch:
+                print(json.dumps(row, ensure_ascii=False))
+                printed += 1
+                if args.limit and printed >= args.limit:
+                    return
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
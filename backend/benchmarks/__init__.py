@@ -0,0 +1,5 @@
+"""压测与基准测试工具
+
+在 backend 目录下以模块方式运行，例如：
+    python -m benchmarks.load_test --users 50 --agents 5 --duration 60
+"""
@@ -0,0 +1,241 @@
+"""管理端与计费接口查询基准
+
+在 seed_dataset 生成的数据集上逐个接口串行计时（每个用例先预热再多轮采样），
+输出各用例 p50/p95/p99 及数据集规模，便于观察接口耗时随数据量的变化。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.seed_dataset --db bench_results/dataset.db
+    python -m benchmarks.bench_admin_endpoints --db bench_results/dataset.db \
+        --output bench_results/admin_endpoints.json
+
+    # 5 万用户规模下的余额日志代理视角
+    python -m benchmarks.seed_dataset --db bench_results/dataset_50k.db --users 50000 --agents 300
+    python -m benchmarks.bench_admin_endpoints --db bench_results/dataset_50k.db \
+        --only "balance logs" --output bench_results/balance_logs_50k.json
+"""
+
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import (
+    ASGIClient,
+    BENCH_PASSWORD,
+    LatencyRecorder,
+    prepare_environment,
+    print_route_table,
+    run_metadata,
+    write_json_report,
+)
+
+DATASET_TABLES = [
+    "m_admin",
+    "m_user",
+    "container_record",
+    "billing_charge_record",
+    "container_log",
+    "user_login_log",
+    "balance_log",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="管理端与计费接口查询基准")
+    parser.add_argument("--db", default="bench_results/dataset.db", help="seed_dataset 生成的数据库")
+    parser.add_argument("--iterations", type=int, default=20, help="每个用例的采样次数")
+    parser.add_argument("--warmup", type=int, default=2, help="每个用例的预热次数")
+    parser.add_argument("--only", default=None, help="仅运行名称包含该关键字的用例")
+    parser.add_argument("--output", default="bench_results/admin_endpoints.json")
+    return parser.parse_args()
+
+
+def inspect_dataset(db_path: str) -> dict:
+    """读取数据集规模及基准使用的代表性账号"""
+    conn = sqlite3.connect(db_path)
+    try:
+        row_counts = {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in DATASET_TABLES
+        }
+        super_username = conn.execute(
+            "SELECT username FROM m_admin WHERE role = 'super_admin' ORDER BY id LIMIT 1"
+        ).fetchone()[0]
+        # 选用户最多的代理，代表最重的代理视角
+        agent_id, agent_username = conn.execute(
+            """
+            SELECT m_admin.id, m_admin.username FROM m_admin
+            JOIN m_user ON m_user.admin_id = m_admin.id
+            WHERE m_admin.role = 'admin'
+            GROUP BY m_admin.id ORDER BY COUNT(*) DESC LIMIT 1
+            """
+        ).fetchone()
+        # 选扣费记录最多的用户，代表最重的用户视角
+        user_id, user_phone = conn.execute(
+            """
+            SELECT m_user.id, m_user.phone FROM m_user
+            JOIN billing_charge_record ON billing_charge_record.user_id = m_user.id
+            GROUP BY m_user.id ORDER BY COUNT(*) DESC LIMIT 1
+            """
+        ).fetchone()
+    finally:
+        conn.close()
+
+    return {
+        "row_counts": row_counts,
+        "super_username": super_username,
+        "agent_id": agent_id,
+        "agent_username": agent_username,
+        "user_id": user_id,
+        "user_phone": user_phone,
+    }
+
+
+def build_cases(dataset: dict) -> list:
+    """基准用例：(名称, 身份, 路径, 参数)"""
+    today = datetime.utcnow().date()
+    week_ago = (today - timedelta(days=7)).isoformat()
+    month_ago = (today - timedelta(days=30)).isoformat()
+    page = {"page": 1, "page_size": 20}
+    deep_page = {"page": 200, "page_size": 20}
+
+    return [
+        ("list_users", "super", "/api/admin/users", page),
+        ("list_users deep page", "super", "/api/admin/users", deep_page),
+        ("list_users keyword", "super", "/api/admin/users", {**page, "keyword": "公司123"}),
+        ("list_users short keyword", "super", "/api/admin/users", {**page, "keyword": "公司"}),
+        (
+            "list_users phone keyword",
+            "super",
+            "/api/admin/users",
+            {**page, "keyword": dataset["user_phone"][-6:]},
+        ),
+        ("list_users", "agent", "/api/admin/users", page),
+        ("get_user_detail", "super", f"/api/admin/users/{dataset['user_id']}", None),
+        ("list_admins", "super", "/api/admin/admins", page),
+        ("list_admins keyword", "super", "/api/admin/admins", {**page, "keyword": "公司1"}),
+        ("get_dashboard", "super", "/api/admin/dashboard", None),
+        ("get_dashboard", "agent", "/api/admin/dashboard", None),
+        ("container logs", "super", "/api/admin/logs/container", page),
+        ("container logs deep page", "super", "/api/admin/logs/container", deep_page),
+        (
+            "container logs last 7d",
+            "super",
+            "/api/admin/logs/container",
+            {**page, "start_date": week_ago},
+        ),
+        ("container logs", "agent", "/api/admin/logs/container", page),
+        ("login logs", "super", "/api/admin/logs/login", page),
+        (
+            "login logs keyword",
+            "super",
+            "/api/admin/logs/login",
+            {**page, "keyword": dataset["user_phone"][-6:]},
+        ),
+        ("login logs", "agent", "/api/admin/logs/login", page),
+        ("balance logs", "super", "/api/admin/balance-logs", page),
+        ("balance logs", "agent", "/api/admin/balance-logs", page),
+        ("balance logs deep page", "agent", "/api/admin/balance-logs", deep_page),
+        (
+            "balance logs users",
+            "agent",
+            "/api/admin/balance-logs",
+            {**page, "account_type": "user"},
+        ),
+        (
+            "balance logs recharge 30d",
+            "agent",
+            "/api/admin/balance-logs",
+            {**page, "change_type": "recharge", "start_date": month_ago},
+        ),
+        ("billing charges", "user", "/api/billing/charges", page),
+        ("billing charges deep page", "user", "/api/billing/charges", deep_page),
+        (
+            "billing charges last 7d",
+            "user",
+            "/api/billing/charges",
+            {**page, "start_date": week_ago},
+        ),
+        ("billing statistics", "user", "/api/billing/statistics", None),
+    ]
+
+
+async def login(client: ASGIClient, dataset: dict) -> dict:
+    async def admin_token(username):
+        response = await client.request(
+            "POST",
+            "/api/auth/admin/login",
+            json_body={"username": username, "password": BENCH_PASSWORD},
+        )
+        return response.json()["data"]["token"]
+
+    response = await client.request(
+        "POST",
+        "/api/auth/login",
+        json_body={"phone": dataset["user_phone"], "password": BENCH_PASSWORD},
+    )
+    return {
+        "super": await admin_token(dataset["super_username"]),
+        "agent": await admin_token(dataset["agent_username"]),
+        "user": response.json()["data"]["token"],
+    }
+
+
+async def run(args, dataset: dict) -> dict:
+    from app.db.database import init_db
+    from app.main import app
+
+    # 与服务启动一致：补齐新增字段并建立搜索索引（旧数据集首次运行时回填）
+    await init_db()
+    client = ASGIClient(app)
+    tokens = await login(client, dataset)
+    recorder = LatencyRecorder()
+
+    for name, role, path, params in build_cases(dataset):
+        label = f"{name} [{role}]"
+        if args.only and args.only not in label:
+            continue
+        headers = {"Authorization": f"Bearer {tokens[role]}"}
+        # 预热（首次访问可能触发汇总回填等一次性开销，不计入统计）
+        for _ in range(args.warmup):
+            await client.request("GET", path, params=params, headers=headers)
+
+        started = time.perf_counter()
+        for _ in range(args.iterations):
+            await recorder.timed(client, label, "GET", path, params=params, headers=headers)
+        print(f"  {label:<40} {time.perf_counter() - started:>8.2f}s")
+
+    summary = recorder.summary()
+    return {
+        "meta": run_metadata(args),
+        "dataset": dataset,
+        "cases": summary["routes"],
+    }
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.db):
+        sys.exit(f"数据集不存在: {args.db}，请先运行 python -m benchmarks.seed_dataset --db {args.db}")
+
+    dataset = inspect_dataset(args.db)
+    prepare_environment(args.db, use_simulator=True, fresh=False)
+
+    print("数据集规模：")
+    for table, count in dataset["row_counts"].items():
+        print(f"  {table:<24} {count:>10}")
+    print()
+
+    report = asyncio.run(run(args, dataset))
+    write_json_report(args.output, report)
+
+    print()
+    print_route_table(report["cases"])
+    print(f"\n结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""中间件开销微基准
+
+对同一个最小接口分别测量：
+- none:   不加任何中间件
+- legacy: 原先的两个 @app.middleware("http")（BaseHTTPMiddleware）实现
+- asgi:   当前的纯 ASGI RequestContextMiddleware
+
+输出每种配置的单请求耗时与相对 none 的额外开销。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_middleware --requests 20000
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+
+from benchmarks.common import (
+    ASGIClient,
+    prepare_environment,
+    run_metadata,
+    summarize_durations,
+    write_json_report,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="中间件开销微基准")
+    parser.add_argument("--requests", type=int, default=20000, help="每种配置的请求数")
+    parser.add_argument("--warmup", type=int, default=500, help="预热请求数")
+    parser.add_argument("--output", default="bench_results/middleware.json")
+    return parser.parse_args()
+
+
+def build_app(mode: str):
+    from fastapi import FastAPI, Request
+
+    from app.core.middleware import RequestContextMiddleware
+
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    if mode == "asgi":
+        app.add_middleware(RequestContextMiddleware)
+    elif mode == "legacy":
+        logger = logging.getLogger("benchmarks.legacy")
+
+        @app.middleware("http")
+        async def add_request_context(request: Request, call_next):
+            request_id = str(uuid.uuid4())[:8]
+            request.state.request_id = request_id
+            request.state.timestamp = datetime.now().isoformat()
+            response = await call_next(request)
+            response.headers["X-Request-ID"] = request_id
+            return response
+
+        @app.middleware("http")
+        async def log_requests(request: Request, call_next):
+            start_time = datetime.now()
+            request_id = getattr(request.state, "request_id", "unknown")
+            logger.info(f"→ 请求 [{request_id}] {request.method} {request.url}")
+            response = await call_next(request)
+            duration = (datetime.now() - start_time).total_seconds()
+            logger.info(f"← 响应 [{request_id}] {response.status_code} - {duration:.3f}s")
+            return response
+
+    return app
+
+
+async def measure(mode: str, args) -> dict:
+    client = ASGIClient(build_app(mode))
+    for _ in range(args.warmup):
+        await client.request("GET", "/ping")
+
+    durations = []
+    started = time.perf_counter()
+    for _ in range(args.requests):
+        request_started = time.perf_counter()
+        response = await client.request("GET", "/ping")
+        durations.append(time.perf_counter() - request_started)
+        if response.status_code != 200:
+            raise RuntimeError(f"{mode}: 非预期状态码 {response.status_code}")
+    elapsed = time.perf_counter() - started
+
+    summary = summarize_durations(durations, elapsed)
+    summary["mean_us"] = round(sum(durations) / len(durations) * 1_000_000, 2)
+    return summary
+
+
+async def run(args) -> dict:
+    results = {}
+    for mode in ("none", "legacy", "asgi"):
+        results[mode] = await measure(mode, args)
+
+    baseline = results["none"]["mean_us"]
+    for summary in results.values():
+        summary["overhead_us"] = round(summary["mean_us"] - baseline, 2)
+    return results
+
+
+def main():
+    args = parse_args()
+    prepare_environment("bench_results/middleware.db", use_simulator=True)
+    # 与生产一致：INFO 日志开启但不输出到终端，避免 I/O 干扰测量
+    logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+
+    results = asyncio.run(run(args))
+    write_json_report(args.output, {"meta": run_metadata(args), "results": results})
+
+    print(f"{'mode':<8} {'mean_us':>10} {'p50_ms':>9} {'p99_ms':>9} {'rps':>10} {'overhead_us':>12}")
+    for mode, summary in results.items():
+        print(
+            f"{mode:<8} {summary['mean_us']:>10.2f} {summary['p50_ms']:>9.3f} "
+            f"{summary['p99_ms']:>9.3f} {summary['rps']:>10.1f} {summary['overhead_us']:>12.2f}"
+        )
+    print(f"\n结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""服务冷启动耗时基准
+
+每次测量都启动一个全新的 Python 进程，分别记录：
+- import:   导入 app.main（FastAPI、路由、模型与各服务模块）
+- startup:  执行 lifespan 启动阶段（init_db、容器创建 worker、定时任务）
+- shutdown: 执行 lifespan 关闭阶段
+- total:    进程从启动到完成启动阶段的总耗时（含解释器自身启动）
+
+对比两种场景：
+- first_start: 数据库没有结构指纹（新库或升级后首次启动），完整执行建表、补字段与搜索索引检查
+- restart:     结构指纹与代码一致，跳过结构检查
+
+默认使用真实 UCloud 客户端配置（不连接网络），用于确认 SDK 客户端在启动阶段未被加载。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.bench_startup --runs 10
+    python -m benchmarks.bench_startup --db bench_results/dataset.db --runs 5   # 使用造数脚本生成的数据集
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import (
+    BACKEND_DIR,
+    run_metadata,
+    summarize_durations,
+    write_json_report,
+)
+
+SCENARIOS = ("first_start", "restart")
+PHASES = ("import", "startup", "shutdown", "total")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="服务冷启动耗时基准")
+    parser.add_argument("--db", default=None, help="源数据库（会复制后使用），默认新建空库")
+    parser.add_argument("--runs", type=int, default=10, help="每种场景的进程启动次数")
+    parser.add_argument("--simulator", action="store_true", help="使用 UCloud 模拟器")
+    parser.add_argument("--output", default="bench_results/startup.json")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def child_main() -> None:
+    """子进程：测量导入与 lifespan 各阶段耗时，结果以一行 JSON 输出"""
+    import asyncio
+
+    started = time.perf_counter()
+    from app.main import app
+
+    imported = time.perf_counter()
+
+    async def run_lifespan() -> dict:
+        lifespan = app.router.lifespan_context(app)
+        startup_started = time.perf_counter()
+        await lifespan.__aenter__()
+        startup_finished = time.perf_counter()
+        ready_at = time.time()
+        # 启动阶段结束时各模块的加载情况
+        ucloud_client_loaded = "ucloud.client" in sys.modules
+        await lifespan.__aexit__(None, None, None)
+        return {
+            "startup": startup_finished - startup_started,
+            "shutdown": time.perf_counter() - startup_finished,
+            "ready_at": ready_at,
+            "ucloud_client_loaded": ucloud_client_loaded,
+        }
+
+    result = asyncio.run(run_lifespan())
+    process_started = float(os.environ["BENCH_PROCESS_STARTED"])
+    print(
+        json.dumps(
+            {
+                "import": imported - started,
+                "startup": result["startup"],
+                "shutdown": result["shutdown"],
+                "total": result["ready_at"] - process_started,
+                "ucloud_client_loaded": result["ucloud_client_loaded"],
+            }
+        )
+    )
+
+
+def clear_fingerprint(db_path: str) -> None:
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("DELETE FROM schema_meta")
+        conn.commit()
+    except sqlite3.OperationalError:
+        pass  # 旧版数据库尚无 schema_meta 表
+    finally:
+        conn.close()
+
+
+def run_child(env: dict) -> dict:
+    env = {**env, "BENCH_PROCESS_STARTED": repr(time.time())}
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"启动测量进程失败:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run(args, workdir: str) -> dict:
+    db_path = os.path.join(workdir, "startup.db")
+    if args.db:
+        shutil.copyfile(args.db, db_path)
+
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{db_path}",
+        "DEBUG": "false",
+        "SQL_ECHO": "false",
+        "LOG_FILE": "",
+        "SCHEDULER_LOCK_FILE": os.path.join(workdir, "scheduler.lock"),
+        "SCHEDULER_STATUS_FILE": os.path.join(workdir, "scheduler_status.json"),
+        "UCLOUD_SIMULATOR": "true" if args.simulator else "false",
+    }
+
+    # 预热一次：建表/迁移数据集，并让操作系统缓存 Python 模块文件
+    run_child(env)
+
+    results = {}
+    for scenario in SCENARIOS:
+        samples = {phase: [] for phase in PHASES}
+        ucloud_client_loaded = False
+        for _ in range(args.runs):
+            if scenario == "first_start":
+                clear_fingerprint(db_path)
+            sample = run_child(env)
+            for phase in PHASES:
+                samples[phase].append(sample[phase])
+            ucloud_client_loaded = ucloud_client_loaded or sample["ucloud_client_loaded"]
+        results[scenario] = {
+            phase: summarize_durations(durations) for phase, durations in samples.items()
+        }
+        results[scenario]["ucloud_client_loaded"] = ucloud_client_loaded
+    return results
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        child_main()
+        return
+
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as workdir:
+        results = run(args, workdir)
+    write_json_report(args.output, {"meta": run_metadata(args), "results": results})
+
+    print(f"{'scenario':<12} {'phase':<9} {'p50_ms':>9} {'p95_ms':>9} {'max_ms':>9}")
+    for scenario, phases in results.items():
+        for phase in PHASES:
+            summary = phases[phase]
+            print(
+                f"{scenario:<12} {phase:<9} {summary['p50_ms']:>9.1f} "
+                f"{summary['p95_ms']:>9.1f} {summary['max_ms']:>9.1f}"
+            )
+        print(f"{scenario:<12} UCloud SDK 客户端在启动阶段加载: {phases['ucloud_client_loaded']}")
+    print(f"\n结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
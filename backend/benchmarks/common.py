@@ -0,0 +1,292 @@
+"""压测与基准测试公共工具
+
+注意：app 的配置在首次导入时读取环境变量，
+因此必须先调用 prepare_environment()，再导入任何 app.* 模块。
+"""
+
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlencode
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# 压测账号统一使用的密码
+BENCH_PASSWORD = "Bench123@"
+
+
+def prepare_environment(
+    db_path: str,
+    use_simulator: bool = True,
+    simulator_config: Optional[str] = None,
+    fresh: bool = True,
+) -> None:
+    """设置压测所需的环境变量（需在导入 app 之前调用）"""
+    db_path = os.path.abspath(db_path)
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    if fresh:
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+    os.environ["DEBUG"] = "false"
+    if use_simulator:
+        os.environ["UCLOUD_SIMULATOR"] = "true"
+        if simulator_config:
+            os.environ["UCLOUD_SIMULATOR_CONFIG"] = os.path.abspath(simulator_config)
+
+
+def fast_password_hash(password: str = BENCH_PASSWORD) -> str:
+    """生成低成本 bcrypt 哈希，避免批量造号时耗时过长"""
+    from app.core.security import pwd_context
+
+    return pwd_context.hash(password, rounds=4)
+
+
+@dataclass
+class ASGIResponse:
+    status_code: int
+    headers: Dict[str, str]
+    body: bytes
+
+    def json(self):
+        return json.loads(self.body or b"null")
+
+
+class ASGIClient:
+    """进程内 ASGI 客户端
+
+    直接调用 app，不经过网络栈，测得的是应用自身的处理耗时。
+    """
+
+    def __init__(self, app, client_host: str = "127.0.0.1"):
+        self.app = app
+        self.client_host = client_host
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[dict] = None,
+        json_body=None,
+        headers: Optional[dict] = None,
+    ) -> ASGIResponse:
+        body = b""
+        raw_headers = [(b"host", b"bench.local")]
+        if json_body is not None:
+            body = json.dumps(json_body).encode("utf-8")
+            raw_headers.append((b"content-type", b"application/json"))
+            raw_headers.append((b"content-length", str(len(body)).encode()))
+        for key, value in (headers or {}).items():
+            raw_headers.append((key.lower().encode(), str(value).encode()))
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method.upper(),
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": urlencode(params or {}, doseq=True).encode(),
+            "root_path": "",
+            "headers": raw_headers,
+            "client": (self.client_host, 50000),
+            "server": ("bench.local", 80),
+        }
+
+        request_sent = False
+        response_status = 500
+        response_headers: Dict[str, str] = {}
+        chunks: List[bytes] = []
+        response_complete = asyncio.Event()
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # BaseHTTPMiddleware 会监听断开事件，响应发送完毕前不能提前返回
+            await response_complete.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal response_status
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+                for key, value in message.get("headers", []):
+                    response_headers[key.decode().lower()] = value.decode()
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    response_complete.set()
+
+        try:
+            await self.app(scope, receive, send)
+        except Exception:
+            # ServerErrorMiddleware 在返回 500 后会继续抛出异常
+            if response_status < 500:
+                response_status = 500
+        finally:
+            response_complete.set()
+
+        return ASGIResponse(response_status, response_headers, b"".join(chunks))
+
+
+def percentile(values: List[float], q: float) -> float:
+    """线性插值百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    weight = position - lower
+    return ordered[lower] * (1 - weight) + ordered[upper] * weight
+
+
+def summarize_durations(durations: List[float], elapsed: float = None) -> dict:
+    """汇总耗时样本（秒）为毫秒统计"""
+    summary = {
+        "count": len(durations),
+        "mean_ms": round(sum(durations) / len(durations) * 1000, 3)
+        if durations
+        else 0.0,
+        "p50_ms": round(percentile(durations, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(durations, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 3),
+        "max_ms": round(max(durations) * 1000, 3) if durations else 0.0,
+    }
+    if elapsed:
+        summary["rps"] = round(len(durations) / elapsed, 3)
+    return summary
+
+
+# 未指定预期状态码时视为正常的 4xx：未登录/Token 过期与并发操作冲突
+EXPECTED_CLIENT_ERRORS = frozenset({401, 409})
+
+
+def is_unexpected_status(status_code: int, expected: Optional[Iterable[int]] = None) -> bool:
+    """判断状态码是否不符合场景预期（计为错误）"""
+    if expected is not None:
+        return status_code not in expected
+    if status_code >= 500:
+        return True
+    return status_code >= 400 and status_code not in EXPECTED_CLIENT_ERRORS
+
+
+@dataclass
+class RouteStats:
+    durations: List[float] = field(default_factory=list)
+    status_counts: Dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+
+
+class LatencyRecorder:
+    """按路由记录请求耗时与状态码
+
+    5xx 与非预期的 4xx（401/409 以外，或不在调用方给出的 expected 中）计为错误。
+    """
+
+    def __init__(self):
+        self.routes: Dict[str, RouteStats] = {}
+        self.started_at = time.perf_counter()
+
+    def record(
+        self,
+        route: str,
+        duration: float,
+        status_code: int,
+        expected: Optional[Iterable[int]] = None,
+    ) -> None:
+        stats = self.routes.setdefault(route, RouteStats())
+        stats.durations.append(duration)
+        stats.status_counts[status_code] = stats.status_counts.get(status_code, 0) + 1
+        if is_unexpected_status(status_code, expected):
+            stats.errors += 1
+
+    async def timed(
+        self,
+        client: ASGIClient,
+        route: str,
+        method: str,
+        path: str,
+        expected: Optional[Iterable[int]] = None,
+        **kwargs,
+    ):
+        started = time.perf_counter()
+        response = await client.request(method, path, **kwargs)
+        self.record(route, time.perf_counter() - started, response.status_code, expected)
+        return response
+
+    def summary(self, elapsed: float = None) -> dict:
+        elapsed = elapsed or (time.perf_counter() - self.started_at)
+        routes = {}
+        for route, stats in sorted(self.routes.items()):
+            routes[route] = {
+                **summarize_durations(stats.durations, elapsed),
+                "errors": stats.errors,
+                "status_counts": {
+                    str(status): count
+                    for status, count in sorted(stats.status_counts.items())
+                },
+            }
+        total = sum(len(stats.durations) for stats in self.routes.values())
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "total_requests": total,
+            "total_errors": sum(stats.errors for stats in self.routes.values()),
+            "throughput_rps": round(total / elapsed, 3) if elapsed else 0.0,
+            "routes": routes,
+        }
+
+
+def run_metadata(args) -> dict:
+    """记录本次运行的环境信息，便于跨版本对比"""
+    try:
+        commit = (
+            subprocess.check_output(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=BACKEND_DIR,
+                stderr=subprocess.DEVNULL,
+            )
+            .decode()
+            .strip()
+        )
+    except Exception:
+        commit = None
+
+    return {
+        "started_at": datetime.utcnow().isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": vars(args),
+    }
+
+
+def write_json_report(path: str, report: dict) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def print_route_table(routes: dict) -> None:
+    header = f"{'route':<42} {'count':>7} {'err':>5} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for route, stats in routes.items():
+        print(
+            f"{route:<42} {stats['count']:>7} {stats.get('errors', 0):>5} "
+            f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+        )
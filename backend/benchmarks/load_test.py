@@ -0,0 +1,370 @@
+"""端到端压测脚本
+
+在进程内驱动 app.main:app（UCloud 使用本地模拟器），
+登录 N 个模拟用户与代理并产生真实流量：状态轮询、启停循环、
+管理端列表/日志浏览与仪表盘刷新，同时按固定间隔执行扣费任务。
+输出各路由吞吐与 p50/p95/p99 延迟、扣费任务耗时，并保存为 JSON 便于跨版本对比。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.load_test --users 50 --agents 5 --duration 60 \
+        --output bench_results/load_test.json
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import (
+    ASGIClient,
+    BENCH_PASSWORD,
+    LatencyRecorder,
+    fast_password_hash,
+    prepare_environment,
+    print_route_table,
+    run_metadata,
+    summarize_durations,
+    write_json_report,
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="后端端到端压测")
+    parser.add_argument("--users", type=int, default=50, help="模拟用户数")
+    parser.add_argument("--agents", type=int, default=5, help="模拟代理数")
+    parser.add_argument("--duration", type=float, default=60.0, help="压测时长（秒）")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    parser.add_argument("--poll-interval", type=float, default=3.0, help="用户状态轮询间隔（秒）")
+    parser.add_argument("--agent-think", type=float, default=2.0, help="代理操作间隔（秒）")
+    parser.add_argument(
+        "--cycle-probability",
+        type=float,
+        default=0.05,
+        help="每次轮询后执行一次停止/启动循环的概率",
+    )
+    parser.add_argument(
+        "--billing-interval",
+        type=float,
+        default=10.0,
+        help="扣费任务执行间隔（秒），默认加速为10秒一次",
+    )
+    parser.add_argument("--db", default="bench_results/load_test.db", help="压测数据库路径")
+    parser.add_argument("--sim-config", default=None, help="UCloud 模拟器配置文件")
+    parser.add_argument(
+        "--sim-time-scale",
+        type=float,
+        default=0.05,
+        help="模拟器延迟与状态切换的时间缩放（1 为真实耗时）",
+    )
+    parser.add_argument("--output", default="bench_results/load_test.json")
+    return parser.parse_args()
+
+
+async def seed_accounts(args) -> tuple:
+    """创建超级管理员、代理与用户"""
+    from app.core.container_configs import VALID_CONTAINER_CONFIG_CODES
+    from app.db.database import AsyncSessionLocal, init_db
+    from app.models.models import Admin, User
+
+    await init_db()
+    password_hash = fast_password_hash()
+
+    async with AsyncSessionLocal() as db:
+        super_admin = Admin(
+            username="bench_root",
+            password_hash=password_hash,
+            role="super_admin",
+            balance=10_000_000.0,
+            max_users=0,
+        )
+        db.add(super_admin)
+
+        agents = [
+            Admin(
+                username=f"bench_agent_{index}",
+                password_hash=password_hash,
+                role="admin",
+                balance=1_000_000.0,
+                max_users=args.users,
+            )
+            for index in range(args.agents)
+        ]
+        db.add_all(agents)
+        await db.flush()
+
+        users = []
+        for index in range(args.users):
+            agent = agents[index % len(agents)]
+            users.append(
+                User(
+                    company_name=f"压测公司{index}",
+                    contact_name=f"联系人{index}",
+                    phone=f"199{index:08d}",
+                    password_hash=password_hash,
+                    balance=100_000.0,
+                    admin_id=agent.id,
+                    created_by=agent.id,
+                )
+            )
+        db.add_all(users)
+        await db.commit()
+
+        return (
+            super_admin.username,
+            [agent.username for agent in agents],
+            [user.phone for user in users],
+            list(VALID_CONTAINER_CONFIG_CODES),
+        )
+
+
+async def login_all(client, recorder, super_username, agent_usernames, phones) -> tuple:
+    async def admin_login(username):
+        response = await recorder.timed(
+            client,
+            "POST /api/auth/admin/login",
+            "POST",
+            "/api/auth/admin/login",
+            json_body={"username": username, "password": BENCH_PASSWORD},
+        )
+        return response.json()["data"]["token"]
+
+    async def user_login(phone):
+        response = await recorder.timed(
+            client,
+            "POST /api/auth/login",
+            "POST",
+            "/api/auth/login",
+            json_body={"phone": phone, "password": BENCH_PASSWORD},
+        )
+        return response.json()["data"]["token"]
+
+    super_token = await admin_login(super_username)
+    agent_tokens = [await admin_login(username) for username in agent_usernames]
+    user_tokens = [await user_login(phone) for phone in phones]
+    return super_token, agent_tokens, user_tokens
+
+
+async def create_container(client, recorder, headers, rng, config_codes, deadline) -> bool:
+    """提交创建任务并长轮询至完成，返回是否创建成功"""
+    response = await recorder.timed(
+        client,
+        "POST /api/container",
+        "POST",
+        "/api/container",
+        json_body={
+            "instance_name": f"bench-{rng.randrange(10**6)}",
+            "config_code": rng.choice(config_codes),
+        },
+        headers=headers,
+    )
+    if response.status_code != 202:
+        return False
+
+    job_id = response.json()["data"]["job_id"]
+    while time.monotonic() < deadline:
+        response = await recorder.timed(
+            client,
+            "GET /api/container/jobs/{job_id}",
+            "GET",
+            f"/api/container/jobs/{job_id}",
+            params={"wait": 10},
+            headers=headers,
+        )
+        if response.status_code != 200:
+            return False
+        job_status = response.json()["data"]["status"]
+        if job_status == "succeeded":
+            return True
+        if job_status == "failed":
+            return False
+    return False
+
+
+async def user_scenario(client, recorder, token, rng, args, config_codes, deadline):
+    """单个用户：创建云电脑后持续轮询状态，偶尔停止/启动"""
+    headers = {"Authorization": f"Bearer {token}"}
+
+    await recorder.timed(client, "GET /api/container/config-options", "GET",
+                         "/api/container/config-options", headers=headers)
+
+    # 模拟器注入的故障可能导致创建失败，与真实客户端一样重新提交
+    while time.monotonic() < deadline:
+        if await create_container(client, recorder, headers, rng, config_codes, deadline):
+            break
+        await asyncio.sleep(args.poll_interval * rng.uniform(0.8, 1.2))
+    else:
+        return
+
+    running = True
+    while time.monotonic() < deadline:
+        await asyncio.sleep(args.poll_interval * rng.uniform(0.8, 1.2))
+        await recorder.timed(client, "GET /api/container/my/status", "GET",
+                             "/api/container/my/status", headers=headers)
+
+        roll = rng.random()
+        if roll < args.cycle_probability:
+            if running:
+                response = await recorder.timed(client, "POST /api/container/stop", "POST",
+                                                "/api/container/stop", headers=headers)
+                running = response.status_code != 200
+            else:
+                response = await recorder.timed(client, "POST /api/container/start", "POST",
+                                                "/api/container/start", headers=headers)
+                running = response.status_code == 200
+        elif roll < args.cycle_probability + 0.05:
+            await recorder.timed(client, "GET /api/container/my", "GET",
+                                 "/api/container/my", headers=headers)
+        elif roll < args.cycle_probability + 0.08:
+            await recorder.timed(client, "GET /api/billing/statistics", "GET",
+                                 "/api/billing/statistics", headers=headers)
+        elif roll < args.cycle_probability + 0.10:
+            await recorder.timed(client, "GET /api/billing/charges", "GET",
+                                 "/api/billing/charges", headers=headers)
+
+
+ADMIN_PAGES = [
+    ("GET /api/admin/dashboard", "/api/admin/dashboard", None),
+    ("GET /api/admin/users", "/api/admin/users", {"page": 1, "page_size": 20}),
+    ("GET /api/admin/logs/container", "/api/admin/logs/container", {"page": 1, "page_size": 20}),
+    ("GET /api/admin/logs/login", "/api/admin/logs/login", {"page": 1, "page_size": 20}),
+    ("GET /api/admin/balance-logs", "/api/admin/balance-logs", {"page": 1, "page_size": 20}),
+]
+
+
+async def admin_scenario(client, recorder, token, rng, args, deadline, is_super=False):
+    """代理/超级管理员：刷新仪表盘，浏览用户列表与日志"""
+    headers = {"Authorization": f"Bearer {token}"}
+    pages = list(ADMIN_PAGES)
+    if is_super:
+        pages.append(("GET /api/admin/admins", "/api/admin/admins", {"page": 1, "page_size": 20}))
+
+    while time.monotonic() < deadline:
+        route, path, params = rng.choice(pages)
+        await recorder.timed(client, route, "GET", path, params=params, headers=headers)
+        await asyncio.sleep(args.agent_think * rng.uniform(0.5, 1.5))
+
+
+async def billing_loop(args, deadline) -> dict:
+    """按加速间隔执行扣费与删除补偿任务并计时"""
+    from app.tasks.job_monitor import job_monitor
+    from app.tasks.scheduler import (
+        CHARGE_JOB_ID,
+        DELETION_JOB_ID,
+        charge_running_containers,
+        process_pending_container_deletions,
+    )
+
+    # 不启动调度器，直接调用任务函数，需先登记到任务监控
+    job_monitor.register(CHARGE_JOB_ID, "每分钟扣费任务", args.billing_interval)
+    job_monitor.register(DELETION_JOB_ID, "待删除容器补偿任务", args.billing_interval)
+
+    charge_durations = []
+    delete_durations = []
+    while time.monotonic() < deadline:
+        await asyncio.sleep(args.billing_interval)
+        started = time.perf_counter()
+        await charge_running_containers()
+        charge_durations.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await process_pending_container_deletions()
+        delete_durations.append(time.perf_counter() - started)
+
+    return {
+        "charge_running_containers": summarize_durations(charge_durations),
+        "process_pending_container_deletions": summarize_durations(delete_durations),
+    }
+
+
+async def run(args) -> dict:
+    from app.main import app
+    from app.services.container_jobs import container_create_worker
+    from app.services.ucloud_service import ucloud_service
+
+    simulator = getattr(ucloud_service.client, "simulator", None)
+    if simulator is not None:
+        simulator.config.time_scale = args.sim_time_scale
+        # 模拟器随客户端创建时已按配置初始化随机数，需重新设置种子
+        simulator.reseed(args.seed)
+
+    super_username, agent_usernames, phones, config_codes = await seed_accounts(args)
+
+    # ASGIClient 不执行 lifespan，创建任务的后台 worker 需要在这里启动
+    await container_create_worker.start()
+    try:
+        return await run_traffic(args, app, simulator, super_username, agent_usernames,
+                                 phones, config_codes)
+    finally:
+        await container_create_worker.stop()
+
+
+async def run_traffic(args, app, simulator, super_username, agent_usernames, phones,
+                      config_codes) -> dict:
+    client = ASGIClient(app)
+    login_recorder = LatencyRecorder()
+    login_started = time.perf_counter()
+    super_token, agent_tokens, user_tokens = await login_all(
+        client, login_recorder, super_username, agent_usernames, phones
+    )
+    login_elapsed = time.perf_counter() - login_started
+
+    recorder = LatencyRecorder()
+    deadline = time.monotonic() + args.duration
+    rng = random.Random(args.seed)
+
+    tasks = [
+        user_scenario(
+            client, recorder, token, random.Random(rng.random()), args, config_codes, deadline
+        )
+        for token in user_tokens
+    ]
+    tasks += [
+        admin_scenario(client, recorder, token, random.Random(rng.random()), args, deadline)
+        for token in agent_tokens
+    ]
+    tasks.append(
+        admin_scenario(
+            client, recorder, super_token, random.Random(rng.random()), args, deadline, True
+        )
+    )
+
+    started = time.perf_counter()
+    billing_task = asyncio.create_task(billing_loop(args, deadline))
+    await asyncio.gather(*tasks)
+    billing = await billing_task
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "meta": run_metadata(args),
+        "login": login_recorder.summary(login_elapsed),
+        "traffic": recorder.summary(elapsed),
+        "billing_tick": billing,
+    }
+    if simulator is not None:
+        report["ucloud_simulator"] = simulator.stats()
+    return report
+
+
+def main():
+    args = parse_args()
+    prepare_environment(args.db, use_simulator=True, simulator_config=args.sim_config)
+
+    report = asyncio.run(run(args))
+    write_json_report(args.output, report)
+
+    traffic = report["traffic"]
+    print(
+        f"\n请求总数: {traffic['total_requests']}  错误: {traffic['total_errors']}  "
+        f"吞吐: {traffic['throughput_rps']} req/s"
+    )
+    print_route_table(traffic["routes"])
+    charge = report["billing_tick"]["charge_running_containers"]
+    print(
+        f"\n扣费任务: {charge['count']} 次  p50 {charge['p50_ms']}ms  "
+        f"p95 {charge['p95_ms']}ms  max {charge['max_ms']}ms"
+    )
+    print(f"\n结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
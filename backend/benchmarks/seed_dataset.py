@@ -0,0 +1,589 @@
+"""合成数据集生成器
+
+按真实比例向 SQLite 数据库批量写入数据：数万用户分布在数百个代理下，
+数百万条扣费记录，以及大体量的容器操作日志、登录日志与余额变动日志，
+用于评估管理端与计费接口在数据增长后的表现。
+
+表结构由 init_db() 创建，数据写入使用标准库 sqlite3 的 executemany 分批插入。
+
+用法（在 backend 目录下）：
+    python -m benchmarks.seed_dataset --db bench_results/dataset.db \
+        --users 20000 --agents 200 --charges 2000000
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import fast_password_hash, prepare_environment
+
+# 与 SQLAlchemy 在 SQLite 中保存 DateTime 的格式保持一致
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+BATCH_SIZE = 10000
+
+USER_AGENTS = [
+    "CloudDesktopClient/1.3 (Windows NT 10.0; Win64; x64)",
+    "CloudDesktopClient/1.3 (Windows NT 11.0; Win64; x64)",
+    "CloudDesktopClient/1.2 (Windows NT 10.0; Win64; x64)",
+]
+
+LOGIN_FAILURE_REASONS = ["密码错误", "账号已被禁用", "账号不存在"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="生成压测数据集")
+    parser.add_argument("--db", default="bench_results/dataset.db", help="数据库路径（会被覆盖）")
+    parser.add_argument("--agents", type=int, default=200, help="代理数")
+    parser.add_argument("--users", type=int, default=20000, help="用户数")
+    parser.add_argument("--charges", type=int, default=2_000_000, help="扣费记录数")
+    parser.add_argument("--container-logs", type=int, default=300_000, help="容器操作日志数")
+    parser.add_argument("--login-logs", type=int, default=500_000, help="登录日志数")
+    parser.add_argument("--balance-logs", type=int, default=300_000, help="余额变动日志条目数（代理为用户充值时另计一条代理扣减记录）")
+    parser.add_argument("--days", type=int, default=90, help="数据覆盖的天数（截止到当前时间）")
+    parser.add_argument(
+        "--running-ratio",
+        type=float,
+        default=0.1,
+        help="当前处于运行状态的云电脑比例",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="随机种子")
+    return parser.parse_args()
+
+
+def fmt(value: datetime) -> str:
+    return value.strftime(DATETIME_FORMAT)
+
+
+class DatasetGenerator:
+    """按批次生成各表数据"""
+
+    def __init__(self, args, conn: sqlite3.Connection, password_hash: str):
+        from app.core.container_configs import FIXED_CONTAINER_CONFIGS
+
+        self.args = args
+        self.conn = conn
+        self.password_hash = password_hash
+        self.rng = random.Random(args.seed)
+        self.now = datetime.utcnow().replace(second=0, microsecond=0)
+        self.window_start = self.now - timedelta(days=args.days)
+        self.configs = FIXED_CONTAINER_CONFIGS
+        self.super_admin_id = 1
+        # 代理 ID 从 2 开始；用户 i 的容器 ID 同为 i
+        self.agent_ids = list(range(2, args.agents + 2))
+        self.user_admin = {}
+        self.user_phone = {}
+        self.container_price = {}
+        self.container_totals = {}
+        self.row_counts = {}
+
+    def random_time(self) -> datetime:
+        offset = self.rng.random() * self.args.days * 86400
+        return self.window_start + timedelta(seconds=offset)
+
+    def insert(self, table: str, columns: list, rows) -> int:
+        """分批写入，rows 可以是生成器"""
+        placeholders = ", ".join("?" for _ in columns)
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        total = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                self.conn.executemany(sql, batch)
+                total += len(batch)
+                batch.clear()
+        if batch:
+            self.conn.executemany(sql, batch)
+            total += len(batch)
+        self.conn.commit()
+        self.row_counts[table] = self.row_counts.get(table, 0) + total
+        return total
+
+    def seed_admins(self) -> None:
+        created_at = fmt(self.window_start - timedelta(days=30))
+        rows = [
+            (
+                self.super_admin_id,
+                "bench_root",
+                self.password_hash,
+                "super_admin",
+                1,
+                None,
+                10_000_000.0,
+                0,
+                "压测总部",
+                "超级管理员",
+                None,
+                created_at,
+            )
+        ]
+        # 代理规模呈长尾分布：少数大代理拥有大量用户
+        users_per_agent = max(1, math.ceil(self.args.users / max(1, self.args.agents)))
+        for index, agent_id in enumerate(self.agent_ids):
+            rows.append(
+                (
+                    agent_id,
+                    f"bench_agent_{index}",
+                    self.password_hash,
+                    "admin",
+                    1,
+                    self.super_admin_id,
+                    round(self.rng.uniform(1_000, 500_000), 2),
+                    users_per_agent * 20,
+                    f"代理公司{index}",
+                    f"代理联系人{index}",
+                    f"188{index:08d}",
+                    created_at,
+                )
+            )
+        self.insert(
+            "m_admin",
+            [
+                "id",
+                "username",
+                "password_hash",
+                "role",
+                "status",
+                "created_by",
+                "balance",
+                "max_users",
+                "company_name",
+                "contact_name",
+                "phone",
+                "created_at",
+            ],
+            rows,
+        )
+
+    def pick_agent(self) -> int:
+        # Pareto 分布模拟少数代理拥有大部分用户
+        index = min(int(self.rng.paretovariate(1.2)) - 1, len(self.agent_ids) - 1)
+        if self.rng.random() < 0.5:
+            index = self.rng.randrange(len(self.agent_ids))
+        return self.agent_ids[index]
+
+    def user_rows(self):
+        for user_id in range(1, self.args.users + 1):
+            admin_id = self.pick_agent()
+            phone = f"199{user_id:08d}"
+            self.user_admin[user_id] = admin_id
+            self.user_phone[user_id] = phone
+            created_at = self.random_time()
+            yield (
+                user_id,
+                f"压测公司{user_id}",
+                f"联系人{user_id}",
+                phone,
+                self.password_hash,
+                round(self.rng.uniform(0, 5_000), 2),
+                None,
+                admin_id,
+                admin_id,
+                0 if self.rng.random() < 0.03 else 1,
+                fmt(created_at),
+                fmt(created_at + timedelta(days=self.rng.randint(0, self.args.days)))
+                if self.rng.random() < 0.8
+                else None,
+            )
+
+    def seed_users(self) -> None:
+        self.insert(
+            "m_user",
+            [
+                "id",
+                "company_name",
+                "contact_name",
+                "phone",
+                "password_hash",
+                "balance",
+                "current_container_id",
+                "admin_id",
+                "created_by",
+                "status",
+                "created_at",
+                "last_login_at",
+            ],
+            self.user_rows(),
+        )
+
+    def container_rows(self):
+        for user_id in range(1, self.args.users + 1):
+            config = self.rng.choice(self.configs)
+            price = round(self.rng.choice([0.05, 0.08, 0.1, 0.15]), 2)
+            self.container_price[user_id] = price
+            created_at = self.random_time()
+            roll = self.rng.random()
+            if roll < self.args.running_ratio:
+                container_status = "running"
+                started_at = self.now - timedelta(minutes=self.rng.randint(1, 600))
+                stopped_at = None
+            elif roll < self.args.running_ratio + 0.05:
+                container_status = "deleted"
+                started_at = None
+                stopped_at = None
+            else:
+                container_status = "stopped"
+                started_at = None
+                stopped_at = self.random_time()
+
+            yield (
+                user_id,
+                user_id,
+                f"uhost-bench{user_id:08d}",
+                f"bench-{user_id}",
+                container_status,
+                config["config_code"],
+                config["config_name"],
+                config["gpu_type"],
+                config["cpu_cores"],
+                config["memory_gb"],
+                config["storage_gb"],
+                price,
+                fmt(created_at),
+                fmt(started_at) if started_at else None,
+                fmt(stopped_at) if stopped_at else None,
+                fmt(self.random_time()) if container_status == "deleted" else None,
+                0,
+                0.0,
+                f"10.0.{user_id // 250 % 256}.{user_id % 250 + 1}",
+                3389,
+                "administrator",
+                "Bench@123",
+            )
+
+    def seed_containers(self) -> None:
+        self.insert(
+            "container_record",
+            [
+                "id",
+                "user_id",
+                "ucloud_instance_id",
+                "instance_name",
+                "status",
+                "config_code",
+                "config_name",
+                "gpu_type",
+                "cpu_cores",
+                "memory_gb",
+                "storage_gb",
+                "price_per_minute",
+                "created_at",
+                "started_at",
+                "stopped_at",
+                "deleted_at",
+                "total_running_minutes",
+                "total_cost",
+                "connection_host",
+                "connection_port",
+                "connection_username",
+                "connection_password",
+            ],
+            self.container_rows(),
+        )
+        self.conn.execute(
+            "UPDATE m_user SET current_container_id = id "
+            "WHERE id IN (SELECT user_id FROM container_record WHERE status != 'deleted')"
+        )
+        self.conn.commit()
+
+    def charge_rows(self):
+        """按会话生成连续分钟的扣费记录"""
+        balances = {}
+        remaining = self.args.charges
+        active_users = max(1, int(self.args.users * 0.6))
+        while remaining > 0:
+            user_id = self.rng.randint(1, active_users)
+            price = self.container_price[user_id]
+            length = min(remaining, max(1, int(self.rng.lognormvariate(4.2, 0.9))))
+            start = self.random_time().replace(second=0, microsecond=0)
+            if start + timedelta(minutes=length) > self.now:
+                start = self.now - timedelta(minutes=length)
+            balance = balances.get(user_id, 5_000.0)
+            for minute in range(length):
+                charge_minute = start + timedelta(minutes=minute)
+                balance_after = round(balance - price, 2)
+                yield (
+                    user_id,
+                    user_id,
+                    fmt(charge_minute),
+                    price,
+                    price,
+                    balance,
+                    balance_after,
+                    fmt(charge_minute + timedelta(seconds=1)),
+                )
+                balance = balance_after if balance_after > 0 else 5_000.0
+            balances[user_id] = balance
+            minutes, cost = self.container_totals.get(user_id, (0, 0.0))
+            self.container_totals[user_id] = (minutes + length, cost + length * price)
+            remaining -= length
+
+    def seed_charges(self) -> None:
+        self.insert(
+            "billing_charge_record",
+            [
+                "user_id",
+                "container_id",
+                "charge_minute",
+                "price_per_minute",
+                "amount",
+                "balance_before",
+                "balance_after",
+                "created_at",
+            ],
+            self.charge_rows(),
+        )
+        # 同步容器累计数据，与扣费任务的维护方式保持一致
+        self.conn.executemany(
+            "UPDATE container_record SET total_running_minutes = ?, total_cost = ? WHERE id = ?",
+            [
+                (minutes, round(cost, 2), container_id)
+                for container_id, (minutes, cost) in self.container_totals.items()
+            ],
+        )
+        self.conn.commit()
+
+    def container_log_rows(self):
+        actions = ["create", "start", "stop", "stop", "start", "delete", "auto_stop"]
+        for _ in range(self.args.container_logs):
+            user_id = self.rng.randint(1, self.args.users)
+            action = self.rng.choice(actions)
+            created_at = self.random_time()
+            failed = self.rng.random() < 0.03
+            started_at = stopped_at = duration = cost = None
+            if action in ("stop", "auto_stop") and not failed:
+                duration = max(1, int(self.rng.lognormvariate(4.2, 0.9)))
+                started_at = created_at - timedelta(minutes=duration)
+                stopped_at = created_at
+                cost = round(duration * self.container_price[user_id], 2)
+            elif action == "start" and not failed:
+                started_at = created_at
+            yield (
+                user_id,
+                user_id,
+                self.user_admin[user_id],
+                action,
+                "failed" if failed else "success",
+                fmt(started_at) if started_at else None,
+                fmt(stopped_at) if stopped_at else None,
+                duration,
+                cost,
+                "UCloud接口调用失败" if failed else None,
+                f"113.{user_id % 256}.{self.rng.randint(0, 255)}.{self.rng.randint(1, 254)}",
+                self.rng.choice(USER_AGENTS),
+                fmt(created_at),
+            )
+
+    def seed_container_logs(self) -> None:
+        self.insert(
+            "container_log",
+            [
+                "user_id",
+                "container_id",
+                "admin_id",
+                "action",
+                "action_status",
+                "started_at",
+                "stopped_at",
+                "duration_minutes",
+                "cost",
+                "error_message",
+                "ip_address",
+                "user_agent",
+                "created_at",
+            ],
+            self.container_log_rows(),
+        )
+
+    def login_log_rows(self):
+        for _ in range(self.args.login_logs):
+            user_id = self.rng.randint(1, self.args.users)
+            failed = self.rng.random() < 0.08
+            yield (
+                user_id,
+                self.user_admin[user_id],
+                self.user_phone[user_id],
+                "failed" if failed else "success",
+                self.rng.choice(LOGIN_FAILURE_REASONS) if failed else None,
+                f"113.{user_id % 256}.{self.rng.randint(0, 255)}.{self.rng.randint(1, 254)}",
+                self.rng.choice(USER_AGENTS),
+                fmt(self.random_time()),
+            )
+
+    def seed_login_logs(self) -> None:
+        self.insert(
+            "user_login_log",
+            [
+                "user_id",
+                "admin_id",
+                "phone",
+                "login_status",
+                "failure_reason",
+                "ip_address",
+                "user_agent",
+                "created_at",
+            ],
+            self.login_log_rows(),
+        )
+
+    def balance_log_rows(self):
+        for _ in range(self.args.balance_logs):
+            roll = self.rng.random()
+            created_at = fmt(self.random_time())
+            before = round(self.rng.uniform(0, 5_000), 2)
+            if roll < 0.15:
+                # 超级管理员给代理充值
+                amount = round(self.rng.choice([1_000, 5_000, 10_000, 50_000]), 2)
+                agent_id = self.rng.choice(self.agent_ids)
+                yield (
+                    "admin",
+                    agent_id,
+                    "recharge",
+                    amount,
+                    before,
+                    round(before + amount, 2),
+                    "manual",
+                    None,
+                    "代理充值",
+                    self.super_admin_id,
+                    created_at,
+                    agent_id,
+                )
+                continue
+
+            user_id = self.rng.randint(1, self.args.users)
+            admin_id = self.user_admin[user_id]
+            if roll < 0.85:
+                amount = round(self.rng.choice([50, 100, 200, 500, 1_000]), 2)
+                yield (
+                    "user",
+                    user_id,
+                    "recharge",
+                    amount,
+                    before,
+                    round(before + amount, 2),
+                    "manual",
+                    None,
+                    "用户充值",
+                    admin_id,
+                    created_at,
+                    admin_id,
+                )
+                # 代理给用户充值时同步扣减代理余额
+                yield (
+                    "admin",
+                    admin_id,
+                    "deduct",
+                    -amount,
+                    before + amount,
+                    before,
+                    "manual",
+                    user_id,
+                    f"为用户 {self.user_phone[user_id]} 充值",
+                    admin_id,
+                    created_at,
+                    admin_id,
+                )
+            else:
+                amount = round(self.rng.uniform(1, 100), 2)
+                yield (
+                    "user",
+                    user_id,
+                    "consume",
+                    -amount,
+                    before + amount,
+                    before,
+                    "system",
+                    user_id,
+                    "云电脑使用扣费",
+                    None,
+                    created_at,
+                    admin_id,
+                )
+
+    def seed_balance_logs(self) -> None:
+        self.insert(
+            "balance_log",
+            [
+                "account_type",
+                "account_id",
+                "change_type",
+                "amount",
+                "balance_before",
+                "balance_after",
+                "source",
+                "related_id",
+                "remark",
+                "operator_id",
+                "created_at",
+                "owner_admin_id",
+            ],
+            self.balance_log_rows(),
+        )
+
+    def run(self) -> dict:
+        steps = [
+            ("m_admin", self.seed_admins),
+            ("m_user", self.seed_users),
+            ("container_record", self.seed_containers),
+            ("billing_charge_record", self.seed_charges),
+            ("container_log", self.seed_container_logs),
+            ("user_login_log", self.seed_login_logs),
+            ("balance_log", self.seed_balance_logs),
+        ]
+        timings = {}
+        for table, step in steps:
+            started = time.perf_counter()
+            step()
+            timings[table] = round(time.perf_counter() - started, 2)
+            print(f"{table:<24} {self.row_counts.get(table, 0):>10} 行  {timings[table]:>8.2f}s")
+
+        started = time.perf_counter()
+        self.conn.execute("ANALYZE")
+        self.conn.commit()
+        timings["analyze"] = round(time.perf_counter() - started, 2)
+        return {"row_counts": self.row_counts, "timings": timings}
+
+
+async def create_schema() -> None:
+    from app.db.database import engine, init_db
+    from app.models import models  # noqa: F401  注册全部模型
+
+    await init_db()
+    await engine.dispose()
+
+
+def seed_dataset(args) -> dict:
+    """创建表结构并写入数据集（调用前需已执行 prepare_environment）"""
+    asyncio.run(create_schema())
+
+    db_path = args.db
+    conn = sqlite3.connect(db_path)
+    # 仅用于一次性灌数：关闭日志与同步写以提高速度
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA cache_size = -200000")
+    try:
+        generator = DatasetGenerator(args, conn, fast_password_hash())
+        return generator.run()
+    finally:
+        conn.close()
+
+
+def main():
+    args = parse_args()
+    prepare_environment(args.db, use_simulator=True)
+
+    started = time.perf_counter()
+    result = seed_dataset(args)
+    print(f"\n数据集已生成: {args.db}  总耗时 {time.perf_counter() - started:.1f}s")
+    return result
+
+
+if __name__ == "__main__":
+    main()
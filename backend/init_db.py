@@ -102,7 +102,7 @@ async def init_database():
     await check_and_fix_container_table()
 
     # 然后初始化其他表
-    await init_db()
+    await init_db(force=True)
     print("数据库初始化完成")
 
 
@@ -1,28 +1,135 @@
-import uvicorn
-import sys
+"""后端服务启动脚本
+
+用法（在 backend 目录下）：
+    python run.py                          # 开发模式：单进程，DEBUG=true 时自动重载，进程内运行定时任务
+    python run.py --prod [--workers 4]     # 生产模式：多 worker 进程 + 独立的定时任务进程
+    python run.py --prod --no-scheduler    # 定时任务进程（run_scheduler.py）由 systemd 等另行托管时
+"""
+
+import argparse
+import asyncio
+import importlib.util
 import os
+import subprocess
+import sys
+
+import uvicorn
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # 添加项目根目录到Python路径
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
 
-from app.core.config import get_settings
 
-settings = get_settings()
+def parse_args():
+    parser = argparse.ArgumentParser(description="云电脑容器管理系统 - 后端服务")
+    parser.add_argument("--prod", action="store_true", help="生产模式：多进程、关闭重载与调试输出")
+    parser.add_argument("--workers", type=int, default=None, help="worker 进程数，默认 WORKERS 配置或 CPU 核数")
+    parser.add_argument("--no-scheduler", action="store_true", help="生产模式下不启动定时任务进程")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    return parser.parse_args()
 
-if __name__ == "__main__":
+
+def print_banner(settings, host: str, port: int, mode: str) -> None:
     print("=" * 50)
     print("云电脑容器管理系统 - 后端服务")
     print("=" * 50)
-    print(f"服务地址: http://localhost:8000")
-    print(f"API文档: http://localhost:8000/docs")
+    print(f"服务地址: http://localhost:{port}（监听 {host}）")
+    print(f"API文档: http://localhost:{port}/docs")
+    print(f"运行模式: {mode}")
     print(f"调试模式: {settings.DEBUG}")
     print("=" * 50)
     print()
 
+
+def run_development(settings, host: str, port: int) -> None:
+    print_banner(settings, host, port, "开发（单进程）")
     uvicorn.run(
         "app.main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=host,
+        port=port,
         reload=settings.DEBUG,
         log_level="info",
     )
+
+
+def clear_metrics_snapshots(directory: str) -> None:
+    """清除上次运行遗留的指标快照（计数器从本次启动重新累计）"""
+    if not directory or not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.startswith("metrics_"):
+            os.remove(os.path.join(directory, name))
+
+
+def run_production(args, settings, host: str, port: int) -> None:
+    from app.db.database import engine, init_db
+
+    async def prepare_database():
+        await init_db()
+        await engine.dispose()
+
+    # 建表、补字段与搜索索引回填只在主进程执行一次，避免多个 worker 同时迁移
+    asyncio.run(prepare_database())
+    clear_metrics_snapshots(settings.METRICS_MULTIPROCESS_DIR)
+
+    workers = args.workers or settings.WORKERS or os.cpu_count() or 1
+    has_uvloop = importlib.util.find_spec("uvloop") is not None
+    has_httptools = importlib.util.find_spec("httptools") is not None
+    print_banner(settings, host, port, f"生产（{workers} 个 worker）")
+
+    scheduler_process = None
+    if not args.no_scheduler:
+        scheduler_process = subprocess.Popen(
+            [sys.executable, os.path.join(BACKEND_DIR, "run_scheduler.py")]
+        )
+
+    try:
+        uvicorn.run(
+            "app.main:app",
+            host=host,
+            port=port,
+            workers=workers,
+            loop="uvloop" if has_uvloop else "auto",
+            http="httptools" if has_httptools else "auto",
+            reload=False,
+            # 访问日志由应用中间件统一输出
+            access_log=False,
+            log_level="info",
+        )
+    finally:
+        if scheduler_process is not None:
+            scheduler_process.terminate()
+            try:
+                scheduler_process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                scheduler_process.kill()
+
+
+def main():
+    args = parse_args()
+    if args.prod:
+        # worker 进程从环境变量读取配置，须在加载配置之前设置
+        os.environ["DEBUG"] = "false"
+        os.environ["SQL_ECHO"] = "false"
+        os.environ["SCHEDULER_ENABLED"] = "false"
+        # 会话快照、指标与采样窗口都是进程内状态：关闭会话快照，指标经共享目录汇总
+        os.environ["SESSION_METER_ENABLED"] = "false"
+        os.environ.setdefault(
+            "METRICS_MULTIPROCESS_DIR", os.path.join(BACKEND_DIR, "metrics_multiproc")
+        )
+
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    host = args.host or settings.HOST
+    port = args.port or settings.PORT
+    if args.prod:
+        run_production(args, settings, host, port)
+    else:
+        run_development(settings, host, port)
+
+
+if __name__ == "__main__":
+    main()
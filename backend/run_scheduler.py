@@ -0,0 +1,71 @@
+"""定时任务独立进程
+
+多 worker 部署时 API 进程不运行定时任务（SCHEDULER_ENABLED=false），
+由本进程单独运行扣费、删除补偿、实例池补充、幂等键清理与归档任务，保证每个任务只执行一次。
+任务状态写入 SCHEDULER_STATUS_FILE，API 进程的 `/api/admin/scheduler` 读取该快照；
+运行指标写入 METRICS_MULTIPROCESS_DIR，由 API 进程的 `/metrics` 汇总输出。
+
+用法（在 backend 目录下）：
+    python run_scheduler.py
+
+`python run.py --prod` 会自动启动本进程；由 systemd 等单独托管时使用 `run.py --prod --no-scheduler`。
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.core.logging_config import setup_logging, shutdown_logging
+from app.db.database import engine, init_db
+from app.tasks.scheduler import shutdown_scheduler, start_scheduler
+
+settings = get_settings()
+logger = logging.getLogger("run_scheduler")
+
+
+async def main() -> int:
+    setup_logging()
+    try:
+        await init_db()
+        if not start_scheduler(status_file=settings.SCHEDULER_STATUS_FILE):
+            return 1
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:  # Windows 仅支持 Ctrl+C（KeyboardInterrupt）
+                pass
+
+        # 扣费、删除补偿等任务指标写入共享目录，由 API 进程的 /metrics 汇总输出
+        snapshot_task = None
+        if settings.METRICS_ENABLED and settings.METRICS_MULTIPROCESS_DIR:
+            snapshot_task = asyncio.create_task(
+                metrics.write_snapshots_periodically(
+                    settings.METRICS_MULTIPROCESS_DIR,
+                    settings.METRICS_SNAPSHOT_INTERVAL_SECONDS,
+                )
+            )
+
+        logger.info("定时任务进程已启动 pid=%s", os.getpid())
+        await stop.wait()
+        shutdown_scheduler()
+        if snapshot_task is not None:
+            snapshot_task.cancel()
+            await asyncio.gather(snapshot_task, return_exceptions=True)
+        return 0
+    finally:
+        await engine.dispose()
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
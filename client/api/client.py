@@ -3,6 +3,7 @@
 import time
 import logging
 import traceback
+import uuid
 from typing import Optional, Dict, Any, Callable
 from functools import wraps
 from dataclasses import dataclass, field
@@ -156,6 +157,11 @@ class APIClient:
             headers["Authorization"] = f"Bearer {self.token}"
         return headers
 
+    @staticmethod
+    def _idempotency_headers() -> Dict[str, str]:
+        """每次操作生成新的幂等键，网络重试沿用同一个键，服务端不会重复执行"""
+        return {"Idempotency-Key": uuid.uuid4().hex}
+
     def _handle_response(self, response: requests.Response) -> Dict[str, Any]:
         """
         处理API响应
@@ -214,9 +220,9 @@ class APIClient:
                 response=detail,
             )
 
-        # 检查业务状态码
+        # 检查业务状态码（202 表示任务已受理）
         code = data.get("code", 200)
-        if code != 200:
+        if code not in (200, 202):
             message = data.get("message", f"业务错误 (Code {code})")
             raise APIError(
                 message,
@@ -409,22 +415,84 @@ class APIClient:
             )
 
     def create_container(
-        self, instance_name: str, config_code: str, force: bool = False
+        self,
+        instance_name: str,
+        config_code: str,
+        force: bool = False,
+        timeout: float = 600,
     ) -> APIResult:
-        """创建云电脑"""
+        """创建云电脑
+
+        服务端受理后返回任务ID，随后长轮询任务直到完成或超过 timeout 秒；
+        超时仍未完成时返回 code=202，可稍后用 wait_container_job 继续查询。
+        """
         try:
             data = self._request(
                 "POST",
                 "/container",
+                headers=self._idempotency_headers(),
                 json={
                     "instance_name": instance_name,
                     "config_code": config_code,
                     "force": force,
                 },
             )
+            job = data.get("data") or {}
+            if not job.get("job_id"):
+                return self._make_api_result(
+                    success=True, data=job, message="创建成功"
+                )
+            return self.wait_container_job(job["job_id"], timeout=timeout)
+        except APIError as e:
             return self._make_api_result(
-                success=True, data=data.get("data"), message="创建成功"
+                success=False,
+                message=e.message,
+                code=e.code,
+                request_id=e.request_id,
+                error_type=e.error_type,
+                error_detail=e.response,
+                exception=e,
             )
+        except Exception as e:
+            return self._make_api_result(
+                success=False,
+                message=f"创建失败: {str(e)}",
+                code=500,
+                error_type="exception",
+                exception=e,
+            )
+
+    def wait_container_job(self, job_id: int, timeout: float = 600) -> APIResult:
+        """轮询创建任务直到完成（单次请求最长等待略小于请求超时）
+
+        timeout 为 0 时只查询一次当前状态，不在服务端等待。
+        """
+        deadline = time.monotonic() + timeout
+        wait_seconds = max(1, min(25, self.config.api_timeout - 5))
+        job: Dict[str, Any] = {"job_id": job_id}
+        try:
+            while True:
+                remaining = max(0, int(deadline - time.monotonic()))
+                data = self._request(
+                    "GET",
+                    f"/container/jobs/{job_id}",
+                    params={"wait": min(wait_seconds, remaining)},
+                )
+                job = data.get("data") or job
+                if job.get("status") == "succeeded":
+                    return self._make_api_result(
+                        success=True, data=job, message="创建成功"
+                    )
+                if job.get("status") == "failed":
+                    return self._make_api_result(
+                        success=False,
+                        data=job,
+                        message=job.get("error_message") or "创建失败",
+                        code=500,
+                        error_type="job_failed",
+                    )
+                if time.monotonic() >= deadline:
+                    break
         except APIError as e:
             return self._make_api_result(
                 success=False,
@@ -438,16 +506,34 @@ class APIClient:
         except Exception as e:
             return self._make_api_result(
                 success=False,
-                message=f"创建失败: {str(e)}",
+                message=f"查询创建任务失败: {str(e)}",
                 code=500,
                 error_type="exception",
                 exception=e,
             )
 
+        return self._make_api_result(
+            success=False,
+            data=job,
+            message="云电脑仍在创建中，请稍后刷新",
+            code=202,
+            error_type="job_pending",
+            error_detail={
+                "operation_in_progress": True,
+                "pending_operation": {
+                    "status": "creating",
+                    "job_id": job_id,
+                    "message": "云电脑正在创建中，请稍候刷新",
+                },
+            },
+        )
+
     def start_container(self) -> APIResult:
         """启动云电脑"""
         try:
-            data = self._request("POST", "/container/start")
+            data = self._request(
+                "POST", "/container/start", headers=self._idempotency_headers()
+            )
             return self._make_api_result(
                 success=True, data=data.get("data"), message="启动成功"
             )
@@ -473,7 +559,9 @@ class APIClient:
     def stop_container(self) -> APIResult:
         """停止云电脑"""
         try:
-            data = self._request("POST", "/container/stop")
+            data = self._request(
+                "POST", "/container/stop", headers=self._idempotency_headers()
+            )
             return self._make_api_result(
                 success=True, data=data.get("data"), message="停止成功"
             )
@@ -500,7 +588,10 @@ class APIClient:
         """删除云电脑"""
         try:
             data = self._request(
-                "DELETE", "/container", json={"confirm": confirm, "reason": reason}
+                "DELETE",
+                "/container",
+                headers=self._idempotency_headers(),
+                json={"confirm": confirm, "reason": reason},
             )
             return self._make_api_result(
                 success=True, data=data.get("data"), message="删除成功"
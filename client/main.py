@@ -930,9 +930,11 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, "提示", "请选择一个套餐后再创建")
                 return
 
+            # 不在界面线程中等待创建完成，任务进行中由 status_timer 轮询跟进
             result = api_client.create_container(
                 instance_name=name,
                 config_code=config_code,
+                timeout=0,
             )
 
             if result.is_ok():
@@ -943,7 +945,7 @@ class MainWindow(QMainWindow):
             error_detail = (
                 result.error_detail if isinstance(result.error_detail, dict) else {}
             )
-            if result.code == 409 and error_detail.get("operation_in_progress"):
+            if result.code in (202, 409) and error_detail.get("operation_in_progress"):
                 pending_message = (
                     (error_detail.get("pending_operation") or {}).get("message")
                     or "云电脑创建任务正在处理中，请稍后刷新"
@@ -976,10 +978,31 @@ class MainWindow(QMainWindow):
                         instance_name=name,
                         config_code=config_code,
                         force=True,
+                        timeout=0,
+                    )
+                    force_detail = (
+                        force_result.error_detail
+                        if isinstance(force_result.error_detail, dict)
+                        else {}
                     )
                     if force_result.is_ok():
                         QMessageBox.information(self, "成功", "云电脑创建成功！")
                         self.refresh_container()
+                    elif force_result.code == 202 and force_detail.get(
+                        "operation_in_progress"
+                    ):
+                        QMessageBox.information(
+                            self,
+                            "处理中",
+                            (force_detail.get("pending_operation") or {}).get("message")
+                            or "云电脑创建任务正在处理中，请稍后刷新",
+                        )
+                        self.pending_operation = force_detail.get("pending_operation")
+                        self.update_no_container_state()
+                        if not self.status_timer.isActive():
+                            self.status_timer.start(
+                                self.config.auto_refresh_interval * 1000
+                            )
                     else:
                         QMessageBox.critical(
                             self,
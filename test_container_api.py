@@ -6,6 +6,7 @@
 import requests
 import json
 import sys
+import time
 
 BASE_URL = "http://localhost:8000"
 
@@ -127,15 +128,14 @@ def create_container(token, instance_name="测试实例", config_code="config_1"
         print(f"响应码: {data.get('code')}")
         print(f"消息: {data.get('message')}")
 
-        if resp.status_code == 200 and data.get("code") == 200:
-            container_data = data.get("data", {})
-            print(f"✅ 容器创建成功!")
-            print(f"容器ID: {container_data.get('container_id')}")
-            print(f"状态: {container_data.get('status')}")
-            print(f"套餐编码: {container_data.get('config_code')}")
-            print(f"套餐名称: {container_data.get('config_name')}")
-            print(f"预计创建时间: {container_data.get('estimated_time')} 秒")
-            return container_data.get("container_id")
+        if resp.status_code == 202 and data.get("code") == 202:
+            job_data = data.get("data", {})
+            print(f"✅ 创建任务已提交!")
+            print(f"任务ID: {job_data.get('job_id')}")
+            print(f"查询地址: {job_data.get('poll_url')}")
+            print(f"套餐编码: {job_data.get('config_code')}")
+            print(f"预计创建时间: {job_data.get('estimated_time')} 秒")
+            return wait_container_job(token, job_data.get("job_id"))
         elif resp.status_code == 400:
             print(f"⚠️ 请求错误: {data.get('detail', data.get('message'))}")
             print("   可能原因: 用户已有容器实例")
@@ -156,6 +156,45 @@ def create_container(token, instance_name="测试实例", config_code="config_1"
         return None
 
 
+def wait_container_job(token, job_id, timeout=600, wait=25):
+    """长轮询创建任务直到成功或失败"""
+    print(f"\n请求: GET {BASE_URL}/api/container/jobs/{job_id}?wait={wait}")
+    deadline = time.monotonic() + timeout
+
+    try:
+        while time.monotonic() < deadline:
+            resp = requests.get(
+                f"{BASE_URL}/api/container/jobs/{job_id}",
+                params={"wait": wait},
+                headers={"Authorization": f"Bearer {token}"},
+                timeout=wait + 10,
+            )
+            data = resp.json()
+            if resp.status_code != 200:
+                print(f"❌ 查询任务失败: {data.get('detail', data.get('message'))}")
+                return None
+
+            job = data.get("data", {})
+            print(f"任务状态: {job.get('status')}，步骤: {job.get('step')}")
+            if job.get("status") == "succeeded":
+                container = job.get("container", {})
+                print(f"✅ 容器创建成功!")
+                print(f"容器ID: {job.get('container_id')}")
+                print(f"状态: {container.get('status')}")
+                print(f"套餐名称: {container.get('config_name')}")
+                return job.get("container_id")
+            if job.get("status") == "failed":
+                print(f"❌ 创建失败: {job.get('error_message')}")
+                return None
+
+        print(f"⚠️ 等待超过 {timeout} 秒任务仍未完成")
+        return None
+
+    except Exception as e:
+        print(f"❌ [错误] {e}")
+        return None
+
+
 def get_my_container(token):
     """获取我的容器信息"""
     print("\n" + "=" * 60)